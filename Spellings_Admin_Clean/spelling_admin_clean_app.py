@@ -1,7 +1,7 @@
 import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv
-from passlib.hash import bcrypt as passlib_bcrypt
+from shared.password_hashing import hash_password
 
 load_dotenv()
 
@@ -9,6 +9,7 @@ from spelling_app.repository.course_repo import get_all_spelling_courses
 from spelling_app.repository.student_repo import (
     assign_courses_to_student,
     approve_spelling_student,
+    approve_spelling_students_bulk,
     get_pending_spelling_students,
     get_student_courses,
     list_registered_spelling_students,
@@ -21,6 +22,7 @@ from Spellings_Admin_Clean.word_manager_clean import (
     get_lesson_words,
     get_lessons_for_course,
 )
+from shared import cache_bus
 from shared.db import fetch_all, engine
 
 
@@ -38,7 +40,7 @@ def ui_get_all_courses():
 
 
 def generate_default_password_hash() -> str:
-    return passlib_bcrypt.hash(DEFAULT_PASSWORD)
+    return hash_password(DEFAULT_PASSWORD)
 
 
 def render_pending_registration_section():
@@ -67,6 +69,15 @@ def render_pending_registration_section():
             st.success(f"Approved {student.get('student_name')} with default password.")
             st.experimental_rerun()
 
+    if st.button(f"Approve all ({len(pending_students)})", key="approve_all_pending"):
+        outcomes = approve_spelling_students_bulk(
+            [s["pending_id"] for s in pending_students],
+            generate_default_password_hash(),
+        )
+        approved = sum(1 for o in outcomes if o["status"] != "not_found")
+        st.success(f"Approved {approved} students with default password.")
+        st.experimental_rerun()
+
 
 def render_words_lessons_section(course_id: int):
     st.subheader("Words & Lessons Overview")
@@ -228,6 +239,7 @@ def main():
         page_title="Spelling Admin Console (Clean Build)",
         layout="wide",
     )
+    cache_bus.start_listener()
 
     st.title("Spelling Admin Console (Clean Build)")
 
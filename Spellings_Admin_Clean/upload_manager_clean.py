@@ -2,6 +2,7 @@ from typing import Dict, List, Any, Optional
 
 import pandas as pd
 
+from shared import cache_bus
 from shared.db import fetch_all
 from spelling_app.repository.spelling_lesson_repo import (
     get_lesson_by_name,
@@ -223,6 +224,12 @@ def process_spelling_csv(
             )
             continue
 
+    # other app processes drop cached lessons/words for this course
+    cache_bus.publish("spelling_course", int(course_id))
+    for lesson in lesson_cache.values():
+        if lesson.get("lesson_id") is not None:
+            cache_bus.publish("spelling_lesson", int(lesson["lesson_id"]))
+
     return {
         "processed": total_rows,
         "created_words": created_words,
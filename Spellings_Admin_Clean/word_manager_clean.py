@@ -1,5 +1,6 @@
 from typing import List, Dict, Optional
 
+from shared import tagged_cache
 from shared.db import fetch_all
 from spelling_app.repository.words_repo import (
     insert_word,
@@ -9,10 +10,12 @@ from spelling_app.repository.words_repo import (
 )
 
 
+@tagged_cache.memoize(lambda course_id: [("spelling_course", int(course_id))], copy=True)
 def get_words_for_course(course_id: int) -> List[Dict]:
     """
     Return all words for a given spelling course.
     Assumes spelling_words has a course_id column.
+    Cached until an upload publishes ("spelling_course", course_id).
     """
     sql = """
         SELECT
@@ -32,9 +35,11 @@ def get_words_for_course(course_id: int) -> List[Dict]:
     return [dict(getattr(r, "_mapping", r)) for r in rows]
 
 
+@tagged_cache.memoize(lambda course_id: [("spelling_course", int(course_id))], copy=True)
 def get_lessons_for_course(course_id: int) -> List[Dict]:
     """
     Lightweight helper to list lessons for a course.
+    Cached until an upload publishes ("spelling_course", course_id).
     """
     sql = """
         SELECT
@@ -53,10 +58,15 @@ def get_lessons_for_course(course_id: int) -> List[Dict]:
     return [dict(getattr(r, "_mapping", r)) for r in rows]
 
 
+@tagged_cache.memoize(
+    lambda course_id, lesson_id: [("spelling_course", int(course_id)), ("spelling_lesson", int(lesson_id))],
+    copy=True,
+)
 def get_lesson_words(course_id: int, lesson_id: int) -> List[Dict]:
     """
     Return all words mapped to a specific lesson.
     Relies on spelling_lesson_words(lesson_id, word_id, pattern_code).
+    Cached until an upload publishes the course or the lesson.
     """
     sql = """
         SELECT
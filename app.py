@@ -6,11 +6,16 @@ import pandas as pd
 from sqlalchemy import text
 from datetime import date
 
+from shared import cache_bus
+from shared.bulk_enrollment import add_links, cross, remove_links
 from shared.db import engine, fetch_all, execute
 from spelling_app.student_ui import render_spelling_student
 from spelling_app.admin_ui import render_spelling_admin
 from grammar_app.grammar_app import render_grammar_student, render_grammar_admin
 
+# spelling help and grammar lessons/questions are cached per process
+cache_bus.start_listener()
+
 
 def user_by_email(email):
     sql = text("SELECT user_id, name, email, role, is_active FROM users WHERE email=:e")
@@ -138,26 +143,14 @@ def assign_students_to_class(class_id: int, student_ids: list[int]):
     if not student_ids:
         return
     with engine.begin() as conn:
-        for sid in student_ids:
-            conn.execute(
-                text(
-                    """INSERT INTO class_students(class_id,user_id)
-                            VALUES (:c,:s)
-                            ON CONFLICT (class_id,user_id) DO NOTHING"""
-                ),
-                {"c": int(class_id), "s": int(sid)},
-            )
+        add_links(conn, "class_students", cross([class_id], student_ids))
 
 
 def unassign_students_from_class(class_id: int, student_ids: list[int]):
     if not student_ids:
         return
     with engine.begin() as conn:
-        for sid in student_ids:
-            conn.execute(
-                text("DELETE FROM class_students WHERE class_id=:c AND user_id=:s"),
-                {"c": int(class_id), "s": int(sid)},
-            )
+        remove_links(conn, "class_students", cross([class_id], student_ids))
 
 
 def set_class_archived(class_id: int, archive: bool):
@@ -0,0 +1,93 @@
+-----------------------------------------------------
+-- Per-user gamification totals for the synonym app
+--
+-- gamification_snapshot used to rebuild XP, counts and both streaks from
+-- word_stats, achievements and attempts on every student render. This
+-- row is kept current instead: update_after_attempt applies each answer's
+-- deltas and grant_badge adds badge XP, in the same transaction as the
+-- writes they summarise. The snapshot is then one primary-key read plus
+-- the badge list.
+--
+-- level follows shared/levels.py LEVEL_BANDS (1: <=99, 2: <=249,
+-- 3: <=499, 4: <=999, 5: above). answer_streak is capped at 200, the
+-- window compute_answer_streak looks at.
+-- The app also creates the table on start-up and rebuilds a missing row
+-- from the same sources; this file backfills every user up front.
+
+CREATE TABLE IF NOT EXISTS gamification_summary (
+    user_id         INTEGER     PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    xp_from_words   INTEGER     NOT NULL DEFAULT 0,
+    xp_from_badges  INTEGER     NOT NULL DEFAULT 0,
+    mastered_words  INTEGER     NOT NULL DEFAULT 0,
+    correct_words   INTEGER     NOT NULL DEFAULT 0,
+    answer_streak   INTEGER     NOT NULL DEFAULT 0,
+    login_streak    INTEGER     NOT NULL DEFAULT 0,
+    last_active_day DATE,
+    level           INTEGER     NOT NULL DEFAULT 1,
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-----------------------------------------------------
+-- Backfill (same query as legacy_app.GAMIFICATION_REBUILD_SQL, all users)
+WITH ws AS (
+    SELECT user_id,
+           COALESCE(SUM(xp_points), 0)                    AS xp,
+           COUNT(*) FILTER (WHERE mastered IS TRUE)       AS mastered,
+           COUNT(*) FILTER (WHERE correct_attempts > 0)   AS correct
+    FROM word_stats
+    GROUP BY user_id
+), ach AS (
+    SELECT user_id, COALESCE(SUM(xp_bonus), 0) AS xp
+    FROM achievements
+    GROUP BY user_id
+), last_wrong AS (
+    SELECT user_id, MAX(id) AS id
+    FROM attempts
+    WHERE NOT COALESCE(is_correct, FALSE)
+    GROUP BY user_id
+), answers AS (
+    SELECT a.user_id, LEAST(COUNT(*), 200) AS streak
+    FROM attempts a
+    LEFT JOIN last_wrong lw ON lw.user_id = a.user_id
+    WHERE a.id > COALESCE(lw.id, 0)
+    GROUP BY a.user_id
+), days AS (
+    SELECT DISTINCT user_id, DATE(ts) AS day
+    FROM attempts
+    WHERE ts IS NOT NULL
+), runs AS (
+    -- days in the run ending on the latest day all have day + row_number = latest + 1
+    SELECT user_id,
+           day + (ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY day DESC))::int AS run_key,
+           MAX(day) OVER (PARTITION BY user_id)                                  AS last_day
+    FROM days
+), logins AS (
+    SELECT user_id, MAX(last_day) AS last_day,
+           COUNT(*) FILTER (WHERE run_key = last_day + 1) AS streak
+    FROM runs
+    GROUP BY user_id
+)
+INSERT INTO gamification_summary (
+    user_id, xp_from_words, xp_from_badges, mastered_words, correct_words,
+    answer_streak, login_streak, last_active_day, level, updated_at
+)
+SELECT u.user_id,
+       COALESCE(ws.xp, 0),
+       COALESCE(ach.xp, 0),
+       COALESCE(ws.mastered, 0),
+       COALESCE(ws.correct, 0),
+       COALESCE(answers.streak, 0),
+       COALESCE(logins.streak, 0),
+       logins.last_day,
+       CASE WHEN COALESCE(ws.xp, 0) + COALESCE(ach.xp, 0) <= 99  THEN 1
+            WHEN COALESCE(ws.xp, 0) + COALESCE(ach.xp, 0) <= 249 THEN 2
+            WHEN COALESCE(ws.xp, 0) + COALESCE(ach.xp, 0) <= 499 THEN 3
+            WHEN COALESCE(ws.xp, 0) + COALESCE(ach.xp, 0) <= 999 THEN 4
+            ELSE 5 END,
+       now()
+FROM users u
+LEFT JOIN ws      ON ws.user_id      = u.user_id
+LEFT JOIN ach     ON ach.user_id     = u.user_id
+LEFT JOIN answers ON answers.user_id = u.user_id
+LEFT JOIN logins  ON logins.user_id  = u.user_id
+ON CONFLICT (user_id) DO NOTHING;
@@ -0,0 +1,31 @@
+-----------------------------------------------------
+-- Latest attempt outcome per (user, lesson, headword) for the synonym app
+--
+-- Maintained on every quiz answer by the attempt event consumer in
+-- synonym_legacy/legacy_app.py (same transaction as the attempts row),
+-- so the missed-words review queue is one indexed read instead of a
+-- "latest attempt per headword" aggregate over attempts.
+-- The app also creates the table on start-up; this file backfills it.
+
+CREATE TABLE IF NOT EXISTS lesson_word_outcomes (
+    user_id      INTEGER     NOT NULL,
+    lesson_id    INTEGER     NOT NULL,
+    headword     TEXT        NOT NULL,
+    is_correct   BOOLEAN,
+    attempted_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, lesson_id, headword)
+);
+
+CREATE INDEX IF NOT EXISTS idx_lesson_word_outcomes_missed
+    ON lesson_word_outcomes (user_id, lesson_id)
+    WHERE is_correct = FALSE;
+
+-----------------------------------------------------
+-- Backfill from attempt history (latest attempt wins)
+INSERT INTO lesson_word_outcomes (user_id, lesson_id, headword, is_correct, attempted_at)
+SELECT DISTINCT ON (user_id, lesson_id, headword)
+       user_id, lesson_id, headword, is_correct, COALESCE(ts, now())
+FROM attempts
+WHERE user_id IS NOT NULL AND lesson_id IS NOT NULL AND headword IS NOT NULL
+ORDER BY user_id, lesson_id, headword, id DESC
+ON CONFLICT (user_id, lesson_id, headword) DO NOTHING;
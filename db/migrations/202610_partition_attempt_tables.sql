@@ -0,0 +1,257 @@
+-----------------------------------------------------
+-- Monthly range partitioning for the attempt tables
+--
+--   attempts, spelling_attempts, math_attempts,
+--   math_practice_attempts, grammar_attempts
+--
+-- Each table is converted in place: the old heap is renamed to
+-- <table>_unpartitioned, a partitioned parent with the same columns,
+-- defaults, CHECK / NOT NULL constraints, identity and serial sequences,
+-- foreign keys and indexes takes its name, and the rows are copied into
+-- monthly partitions <table>_pYYYYMM. A DEFAULT partition
+-- <table>_p_default catches anything outside the created months.
+--
+-- The primary key becomes (old key, time column), as Postgres requires
+-- the partition key in every unique constraint. A table with any other
+-- unique index that lacks the time column, or that other tables
+-- reference by foreign key, is NOT converted (a WARNING names the index
+-- or constraint): its uniqueness could not be enforced any more. Rows
+-- with a NULL timestamp are stamped 1970-01-01 and land in the default
+-- partition.
+--
+-- Safe to re-run: tables that are missing or already partitioned are
+-- skipped. <table>_unpartitioned is kept; drop it once verified.
+--
+-- Future months and cold-partition archival:
+--   python -m shared.attempt_partitions ensure
+--   python -m shared.attempt_partitions archive --keep-months 12
+
+-----------------------------------------------------
+-- Quoted column list of a table, without generated columns (which
+-- INSERT cannot write)
+CREATE OR REPLACE FUNCTION attempt_insert_columns(p_table TEXT)
+RETURNS TEXT
+LANGUAGE sql STABLE AS $$
+    SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum)
+    FROM pg_attribute
+    WHERE attrelid = p_table::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = ''
+$$;
+
+-----------------------------------------------------
+-- Create (or carve out of the default partition) one monthly partition
+CREATE OR REPLACE FUNCTION attempt_month_partition(p_parent TEXT, p_month DATE)
+RETURNS TEXT
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_start   DATE := date_trunc('month', p_month)::DATE;
+    v_end     DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::DATE;
+    v_name    TEXT := p_parent || '_p' || to_char(p_month, 'YYYYMM');
+    v_default TEXT := p_parent || '_p_default';
+    v_col     TEXT;
+    v_cols    TEXT;
+BEGIN
+    IF to_regclass(v_name) IS NOT NULL THEN
+        RETURN v_name;
+    END IF;
+
+    IF to_regclass(v_default) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            v_name, p_parent, v_start, v_end
+        );
+        RETURN v_name;
+    END IF;
+
+    -- rows for this month may already sit in the default partition:
+    -- move them into a standalone table, then attach it (ATTACH needs the
+    -- parent's CHECK constraints; indexes and foreign keys are cloned)
+    v_col := substring(pg_get_partkeydef(p_parent::regclass) FROM '\((.*)\)');
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)',
+        v_name, p_parent
+    );
+    v_cols := attempt_insert_columns(v_name);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM %I WHERE %s >= %L AND %s < %L RETURNING *) '
+        'INSERT INTO %I (%s) SELECT %s FROM moved',
+        v_default, v_col, v_start, v_col, v_end, v_name, v_cols, v_cols
+    );
+    EXECUTE format(
+        'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        p_parent, v_name, v_start, v_end
+    );
+    RETURN v_name;
+END
+$$;
+
+-----------------------------------------------------
+-- Convert one attempt table in place
+CREATE OR REPLACE FUNCTION partition_attempt_table(
+    p_table         TEXT,
+    p_time_columns  TEXT[],
+    p_months_ahead  INTEGER DEFAULT 3
+)
+RETURNS TEXT
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_legacy TEXT := p_table || '_unpartitioned';
+    v_col    TEXT;
+    v_pk     TEXT;
+    v_pkname TEXT;
+    v_first  DATE;
+    v_last   DATE;
+    v_month  DATE;
+    v_rows   BIGINT;
+    v_cols   TEXT;
+    v_bad    TEXT;
+    r        RECORD;
+BEGIN
+    IF to_regclass(p_table) IS NULL THEN
+        RETURN p_table || ': missing, skipped';
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = p_table::regclass) THEN
+        RETURN p_table || ': already partitioned';
+    END IF;
+
+    SELECT t.c INTO v_col
+    FROM unnest(p_time_columns) WITH ORDINALITY AS t(c, ord)
+    WHERE EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = p_table AND column_name = t.c
+    )
+    ORDER BY t.ord
+    LIMIT 1;
+    IF v_col IS NULL THEN
+        RAISE EXCEPTION '%: none of the time columns % exist', p_table, p_time_columns;
+    END IF;
+
+    EXECUTE format('LOCK TABLE %I IN ACCESS EXCLUSIVE MODE', p_table);
+
+    -- uniqueness Postgres cannot enforce across partitions: refuse
+    SELECT string_agg(ic.relname, ', ') INTO v_bad
+    FROM pg_index i
+    JOIN pg_class ic ON ic.oid = i.indexrelid
+    WHERE i.indrelid = p_table::regclass AND i.indisunique AND NOT i.indisprimary
+      AND NOT EXISTS (
+          SELECT 1 FROM pg_attribute a
+          WHERE a.attrelid = i.indrelid AND a.attname = v_col AND a.attnum = ANY (i.indkey)
+      );
+    IF v_bad IS NOT NULL THEN
+        RAISE WARNING '%: not partitioned, unique index(es) % do not include %', p_table, v_bad, v_col;
+        RETURN format('%s: skipped, unique index(es) %s do not include %s', p_table, v_bad, v_col);
+    END IF;
+    SELECT string_agg(format('%s.%s', c.conrelid::regclass, c.conname), ', ') INTO v_bad
+    FROM pg_constraint c
+    WHERE c.confrelid = p_table::regclass AND c.contype = 'f';
+    IF v_bad IS NOT NULL THEN
+        RAISE WARNING '%: not partitioned, referenced by foreign key(s) %', p_table, v_bad;
+        RETURN format('%s: skipped, referenced by foreign key(s) %s', p_table, v_bad);
+    END IF;
+
+    SELECT c.conname,
+           string_agg(quote_ident(a.attname), ', ' ORDER BY k.ord)
+    INTO v_pkname, v_pk
+    FROM pg_constraint c
+    CROSS JOIN unnest(c.conkey) WITH ORDINALITY AS k(attnum, ord)
+    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+    WHERE c.conrelid = p_table::regclass AND c.contype = 'p'
+    GROUP BY c.conname;
+
+    EXECUTE format('ALTER TABLE %I RENAME TO %I', p_table, v_legacy);
+    IF v_pkname IS NOT NULL THEN
+        EXECUTE format('ALTER TABLE %I RENAME CONSTRAINT %I TO %I', v_legacy, v_pkname, v_legacy || '_pkey');
+    END IF;
+
+    EXECUTE format('UPDATE %I SET %I = %L WHERE %I IS NULL', v_legacy, v_col, '1970-01-01', v_col);
+
+    -- everything but indexes, which need the partition key added / are rebuilt below
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE %I INCLUDING ALL EXCLUDING INDEXES) PARTITION BY RANGE (%I)',
+        p_table, v_legacy, v_col
+    );
+    EXECUTE format('ALTER TABLE %I ALTER COLUMN %I SET NOT NULL', p_table, v_col);
+    IF v_pk IS NOT NULL THEN
+        IF NOT (quote_ident(v_col) = ANY (string_to_array(v_pk, ', '))) THEN
+            v_pk := v_pk || ', ' || quote_ident(v_col);
+        END IF;
+        EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (%s)', p_table, v_pk);
+    END IF;
+
+    -- secondary indexes (unique ones all include the time column, checked above)
+    FOR r IN
+        SELECT pg_get_indexdef(i.indexrelid) AS def
+        FROM pg_index i
+        WHERE i.indrelid = v_legacy::regclass AND NOT i.indisprimary
+    LOOP
+        EXECUTE regexp_replace(
+            r.def, '^CREATE (UNIQUE )?INDEX \S+ ON \S+', format('CREATE \1INDEX ON %I', p_table)
+        );
+    END LOOP;
+
+    -- foreign keys to other tables (supported on partitioned tables)
+    FOR r IN
+        SELECT c.conname, pg_get_constraintdef(c.oid) AS def
+        FROM pg_constraint c
+        WHERE c.conrelid = v_legacy::regclass AND c.contype = 'f'
+    LOOP
+        EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I %s', p_table, r.conname, r.def);
+    END LOOP;
+
+    -- serial sequences now belong to the new parent
+    FOR r IN
+        SELECT a.attname, pg_get_serial_sequence(quote_ident(v_legacy), a.attname) AS seq
+        FROM pg_attribute a
+        WHERE a.attrelid = v_legacy::regclass AND a.attnum > 0 AND NOT a.attisdropped
+          AND a.attidentity = ''
+    LOOP
+        IF r.seq IS NOT NULL THEN
+            EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.%I', r.seq, p_table, r.attname);
+        END IF;
+    END LOOP;
+
+    EXECUTE format(
+        'SELECT date_trunc(''month'', MIN(%1$I))::DATE, date_trunc(''month'', MAX(%1$I))::DATE '
+        'FROM %2$I WHERE %1$I > %3$L',
+        v_col, v_legacy, '1970-01-01'
+    ) INTO v_first, v_last;
+    v_first := COALESCE(v_first, date_trunc('month', now())::DATE);
+    v_last := (GREATEST(COALESCE(v_last, v_first), date_trunc('month', now())::DATE)
+               + make_interval(months => p_months_ahead))::DATE;
+
+    v_month := v_first;
+    WHILE v_month <= v_last LOOP
+        PERFORM attempt_month_partition(p_table, v_month);
+        v_month := (v_month + INTERVAL '1 month')::DATE;
+    END LOOP;
+    EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', p_table || '_p_default', p_table);
+
+    v_cols := attempt_insert_columns(p_table);
+    EXECUTE format(
+        'INSERT INTO %I (%s) OVERRIDING SYSTEM VALUE SELECT %s FROM %I',
+        p_table, v_cols, v_cols, v_legacy
+    );
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    -- identity columns got a fresh sequence from LIKE: continue after the copied ids
+    FOR r IN
+        SELECT a.attname
+        FROM pg_attribute a
+        WHERE a.attrelid = p_table::regclass AND a.attidentity <> '' AND NOT a.attisdropped
+    LOOP
+        EXECUTE format(
+            'SELECT setval(pg_get_serial_sequence(%L, %L), COALESCE(MAX(%I), 0) + 1, false) FROM %I',
+            quote_ident(p_table), r.attname, r.attname, p_table
+        );
+    END LOOP;
+
+    RETURN format('%s: partitioned by %s, %s rows, %s .. %s', p_table, v_col, v_rows, v_first, v_last);
+END
+$$;
+
+-----------------------------------------------------
+-- Convert the attempt tables (time column: first one that exists)
+SELECT partition_attempt_table('attempts',               ARRAY['ts', 'taken_at', 'created_at']);
+SELECT partition_attempt_table('spelling_attempts',      ARRAY['attempted_at', 'created_at']);
+SELECT partition_attempt_table('math_attempts',          ARRAY['created_at', 'attempted_on', 'attempted_at']);
+SELECT partition_attempt_table('math_practice_attempts', ARRAY['created_at']);
+SELECT partition_attempt_table('grammar_attempts',       ARRAY['attempted_on', 'attempted_at', 'created_at']);
@@ -0,0 +1,34 @@
+-----------------------------------------------------
+-- Unified attempt event stream (see shared/attempt_events.py)
+--
+-- One append-only row per answer across spelling, maths, grammar and
+-- synonyms. subject / source are small codes (attempt_events.SUBJECTS /
+-- SOURCES). Partitioned by month like the other attempt tables;
+-- requires 202610_partition_attempt_tables.sql (attempt_month_partition).
+-- Same DDL as attempt_events.DDL, which the app also applies on first write.
+
+CREATE TABLE IF NOT EXISTS attempt_events (
+    id           BIGSERIAL,
+    occurred_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+    subject      SMALLINT    NOT NULL,
+    source       SMALLINT    NOT NULL,
+    user_id      INTEGER,
+    course_id    INTEGER,
+    lesson_id    INTEGER,
+    item_id      INTEGER,
+    item_key     TEXT,
+    is_correct   BOOLEAN     NOT NULL,
+    response_ms  INTEGER,
+    answer       TEXT,
+    PRIMARY KEY (id, occurred_at)
+) PARTITION BY RANGE (occurred_at);
+
+CREATE TABLE IF NOT EXISTS attempt_events_p_default PARTITION OF attempt_events DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_attempt_events_user_time ON attempt_events (user_id, occurred_at);
+CREATE INDEX IF NOT EXISTS idx_attempt_events_subject_time ON attempt_events (subject, occurred_at);
+
+-----------------------------------------------------
+-- This month and the next three
+SELECT attempt_month_partition('attempt_events', (date_trunc('month', now()) + make_interval(months => n))::DATE)
+FROM generate_series(0, 3) AS n;
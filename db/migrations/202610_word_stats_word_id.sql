@@ -0,0 +1,127 @@
+-----------------------------------------------------
+-- Integer keys for the synonym app's word_stats (see shared/word_stats_keys.py)
+--
+-- word_stats is keyed by (user_id, headword) text. A headword can appear
+-- in several words rows (words is unique on (headword, synonyms)), so
+-- every headword gets one integer id: words.headword_id, the lowest
+-- word_id spelling it. word_stats.word_id holds that id and progress
+-- queries join lesson_words -> words.headword_id -> word_stats.word_id.
+--
+-- Online: only adds nullable columns and triggers. Writers that still
+-- send a headword alone (update_after_attempt) get word_id filled in by
+-- the trigger; rows whose headword only reaches words later are filled
+-- by a statement trigger on words. Existing word_stats rows are backfilled below in batches
+-- of 5000, one transaction each (run this file outside a transaction;
+-- `python -m shared.word_stats_keys backfill` does the same job). The
+-- app joins on headword until no resolvable row is left without a
+-- word_id (word_stats_keys.word_ids_ready). Build the (user_id, word_id)
+-- index and the partial (headword) WHERE word_id IS NULL index used by
+-- the words trigger CONCURRENTLY afterwards:
+--   python -m shared.word_stats_keys index
+-- Same statements as word_stats_keys.SCHEMA, which the app also applies
+-- on start-up when the triggers are missing.
+
+BEGIN;
+
+ALTER TABLE words      ADD COLUMN IF NOT EXISTS headword_id INTEGER;
+ALTER TABLE word_stats ADD COLUMN IF NOT EXISTS word_id     INTEGER;
+
+-- words is small; hold inserts while ids are assigned
+LOCK TABLE words IN SHARE ROW EXCLUSIVE MODE;
+
+CREATE OR REPLACE FUNCTION headword_word_id(p_headword TEXT)
+RETURNS INTEGER
+LANGUAGE sql STABLE AS $$
+    SELECT MIN(COALESCE(headword_id, word_id)) FROM words WHERE headword = p_headword
+$$;
+
+CREATE OR REPLACE FUNCTION words_set_headword_id()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.headword_id := COALESCE(headword_word_id(NEW.headword), NEW.word_id);
+    RETURN NEW;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION word_stats_set_word_id()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.word_id IS NULL THEN
+        NEW.word_id := headword_word_id(NEW.headword);
+    END IF;
+    RETURN NEW;
+END
+$$;
+
+DROP TRIGGER IF EXISTS words_headword_id ON words;
+CREATE TRIGGER words_headword_id
+    BEFORE INSERT OR UPDATE OF headword ON words
+    FOR EACH ROW EXECUTE FUNCTION words_set_headword_id();
+
+-- word_stats rows written before their headword was imported
+CREATE OR REPLACE FUNCTION words_fill_word_stats()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE word_stats s
+    SET word_id = n.headword_id
+    FROM (SELECT headword, MIN(headword_id) AS headword_id FROM new_words GROUP BY headword) n
+    WHERE s.word_id IS NULL AND s.headword = n.headword;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS word_stats_word_id ON word_stats;
+CREATE TRIGGER word_stats_word_id
+    BEFORE INSERT OR UPDATE ON word_stats
+    FOR EACH ROW EXECUTE FUNCTION word_stats_set_word_id();
+
+DROP TRIGGER IF EXISTS words_word_stats_word_id ON words;
+CREATE TRIGGER words_word_stats_word_id
+    AFTER INSERT ON words
+    REFERENCING NEW TABLE AS new_words
+    FOR EACH STATEMENT EXECUTE FUNCTION words_fill_word_stats();
+
+UPDATE words w
+SET headword_id = m.headword_id
+FROM (SELECT headword, MIN(word_id) AS headword_id FROM words GROUP BY headword) m
+WHERE m.headword = w.headword AND w.headword_id IS NULL;
+
+COMMIT;
+
+-----------------------------------------------------
+-- Backfill existing rows, walking the primary key (same as
+-- word_stats_keys.backfill); needs PostgreSQL 11+ for COMMIT in DO
+DO $$
+DECLARE
+    last_user     INTEGER := -1;
+    last_headword TEXT    := '';
+    batch_rows    INTEGER;
+BEGIN
+    LOOP
+        WITH batch AS (
+            SELECT user_id, headword
+            FROM word_stats
+            WHERE word_id IS NULL AND (user_id, headword) > (last_user, last_headword)
+            ORDER BY user_id, headword
+            LIMIT 5000
+        ), updated AS (
+            UPDATE word_stats ws
+            SET word_id = headword_word_id(ws.headword)
+            FROM batch b
+            WHERE ws.user_id = b.user_id AND ws.headword = b.headword
+            RETURNING ws.user_id, ws.headword
+        )
+        SELECT COUNT(*),
+               (ARRAY_AGG(user_id ORDER BY user_id DESC, headword DESC))[1],
+               (ARRAY_AGG(headword ORDER BY user_id DESC, headword DESC))[1]
+        INTO batch_rows, last_user, last_headword
+        FROM updated;
+
+        EXIT WHEN batch_rows = 0;
+        COMMIT;
+    END LOOP;
+END
+$$;
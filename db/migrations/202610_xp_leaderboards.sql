@@ -0,0 +1,51 @@
+-----------------------------------------------------
+-- XP leaderboards for the synonym app (see shared/leaderboards.py)
+--
+-- All-time XP is gamification_summary.xp_total, a generated column over
+-- the per-user summary row (202610_gamification_summary.sql runs first).
+-- Weekly XP is xp_weekly, credited by update_after_attempt and
+-- grant_badge in the transaction that earns it. Both are indexed
+-- (xp DESC, user_id) so top-K reads K index entries.
+-- Same statements as leaderboards.SCHEMA, which the app also applies on
+-- start-up.
+
+ALTER TABLE gamification_summary
+    ADD COLUMN IF NOT EXISTS xp_total INTEGER
+    GENERATED ALWAYS AS (xp_from_words + xp_from_badges) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_gamification_summary_xp
+    ON gamification_summary (xp_total DESC, user_id);
+
+CREATE TABLE IF NOT EXISTS xp_weekly (
+    user_id    INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    week_start DATE    NOT NULL,
+    xp         INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, week_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_xp_weekly_rank
+    ON xp_weekly (week_start, xp DESC, user_id);
+
+CREATE INDEX IF NOT EXISTS idx_class_students_user ON class_students (user_id);
+
+-----------------------------------------------------
+-- Backfill the current week. word_stats keeps no per-answer XP history,
+-- so this counts 10 XP per correct attempt plus badges awarded this week;
+-- mastery bonuses earned before the deploy are not included.
+INSERT INTO xp_weekly (user_id, week_start, xp)
+SELECT user_id, date_trunc('week', CURRENT_DATE)::date, SUM(xp)
+FROM (
+    SELECT user_id, 10 * COUNT(*) AS xp
+    FROM attempts
+    WHERE is_correct AND ts >= date_trunc('week', CURRENT_DATE)
+    GROUP BY user_id
+    UNION ALL
+    SELECT user_id, SUM(xp_bonus)
+    FROM achievements
+    WHERE awarded_at >= date_trunc('week', CURRENT_DATE)
+    GROUP BY user_id
+) earned
+WHERE user_id IN (SELECT user_id FROM users)
+GROUP BY user_id
+HAVING SUM(xp) > 0
+ON CONFLICT (user_id, week_start) DO NOTHING;
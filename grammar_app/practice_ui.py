@@ -7,6 +7,7 @@ import streamlit as st
 from grammar_app.services.access_service import has_grammar_access
 from grammar_app.services.grammar_service import get_grammar_lesson_questions, submit_grammar_answer
 from shared.auth import get_logged_in_user
+from shared.render_profiler import profile_rerun
 
 GRAMMAR_PAGE_KEY = "grammar_page"
 GRAMMAR_LESSON_ID_KEY = "grammar_selected_lesson_id"
@@ -159,6 +160,7 @@ def _render_question(state: Dict[str, Any], user_email: str) -> None:
         _reset_to_lessons()
 
 
+@profile_rerun("grammar_practice")
 def render_grammar_practice() -> None:
     user = get_logged_in_user()
     if not user:
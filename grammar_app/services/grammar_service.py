@@ -5,6 +5,8 @@ from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import pandas as pd
 
+from shared import attempt_events, cache_bus, progress_cache, tagged_cache
+from shared.attempt_events import AttemptEvent
 from shared.db import execute
 
 DEFAULT_COURSE_NAME = "GrammarSprint v1"
@@ -197,11 +199,18 @@ def get_grammar_course_by_name(course_name: str = DEFAULT_COURSE_NAME) -> Option
 
 
 def list_grammar_lessons(course_id: int, user_id: int | None = None, user_email: str | None = None) -> List[Dict[str, Any]]:
+    return _course_lessons(int(course_id))
+
+
+# Cached until ingest_grammar_csv (in any app process) publishes the
+# course / lesson on shared.cache_bus.
+@tagged_cache.memoize(lambda course_id: [("grammar_course", course_id)], copy=True)
+def _course_lessons(course_id: int) -> List[Dict[str, Any]]:
     sort_col = _preferred_column(LESSON_TABLE, ("sort_order", "order_index", "display_order")) or "lesson_id"
     return _select_all(
         LESSON_TABLE,
         "course_id = :course_id",
-        {"course_id": int(course_id)},
+        {"course_id": course_id},
         order_sql=f"{sort_col}, lesson_code, lesson_name",
     )
 
@@ -331,6 +340,8 @@ def ingest_grammar_csv(uploaded_file) -> Dict[str, Any]:
         "errors": [],
     }
     details: List[Dict[str, Any]] = []
+    touched_courses: set[int] = set()
+    touched_lessons: set[int] = set()
 
     for index, row in cleaned.iterrows():
         row_number = int(index) + 2
@@ -384,6 +395,8 @@ def ingest_grammar_csv(uploaded_file) -> Dict[str, Any]:
         else:
             summary["mappings_existing"] += 1
 
+        touched_courses.add(int(course["course_id"]))
+        touched_lessons.add(int(lesson["lesson_id"]))
         details.append(
             {
                 "row": row_number,
@@ -396,6 +409,12 @@ def ingest_grammar_csv(uploaded_file) -> Dict[str, Any]:
             }
         )
 
+    # rows commit one by one; tell every app process once at the end
+    for course_id in sorted(touched_courses):
+        cache_bus.publish("grammar_course", course_id)
+    for lesson_id in sorted(touched_lessons):
+        cache_bus.publish("grammar_lesson", lesson_id)
+
     return {
         "summary": summary,
         "details": details,
@@ -409,6 +428,11 @@ def ingest_grammar_csv(uploaded_file) -> Dict[str, Any]:
 
 
 def get_lesson_questions(lesson_id: int, user_id: int | None = None) -> List[Dict[str, Any]]:
+    return _lesson_questions(int(lesson_id))
+
+
+@tagged_cache.memoize(lambda lesson_id: [("grammar_lesson", lesson_id)], copy=True)
+def _lesson_questions(lesson_id: int) -> List[Dict[str, Any]]:
     rows = _rows_to_dicts(
         _safe_execute(
             f"""
@@ -446,50 +470,83 @@ def get_next_question(lesson_id: int, user_id: int) -> Optional[Dict[str, Any]]:
     return None
 
 
-def _attempt_stats_for_lesson(user_id: int, lesson_id: int) -> Dict[str, Any]:
+def _progress_payload(lesson_id: int, stats: Dict[str, Any]) -> Dict[str, Any]:
+    total_questions = int(stats.get("total_questions") or 0)
+    total_attempts = int(stats.get("total_attempts") or 0)
+    correct_attempts = int(stats.get("correct_attempts") or 0)
+    attempted_questions = int(stats.get("attempted_questions") or 0)
+    accuracy = round((correct_attempts / total_attempts) * 100, 2) if total_attempts else 0.0
+    completed = total_questions > 0 and attempted_questions >= total_questions
+
+    return {
+        "lesson_id": int(lesson_id),
+        "total_questions": total_questions,
+        "attempted_questions": attempted_questions,
+        "correct_attempts": correct_attempts,
+        "total_attempts": total_attempts,
+        "accuracy_pct": accuracy,
+        "is_completed": completed,
+    }
+
+
+def load_lessons_progress(user_id: int, lesson_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Progress for many lessons of one user in a single grouped query."""
+    ids = [int(lid) for lid in lesson_ids]
+    if not ids:
+        return {}
+
+    params: Dict[str, Any] = {"lesson_ids": ids}
     user_filter_col = _preferred_column(ATTEMPT_TABLE, ("user_id", "user_email", "email"))
-    user_filter_sql = ""
-    params: Dict[str, Any] = {"lesson_id": int(lesson_id)}
     if user_filter_col == "user_id":
         user_filter_sql = " AND user_id = :user_id"
         params["user_id"] = int(user_id)
     elif user_filter_col:
-        return {"total_attempts": 0, "correct_attempts": 0, "attempted_questions": 0}
+        user_filter_sql = " AND FALSE"
+    else:
+        user_filter_sql = ""
 
     rows = _rows_to_dicts(
         _safe_execute(
             f"""
             SELECT
-                COUNT(*) AS total_attempts,
-                COALESCE(SUM(CASE WHEN is_correct THEN 1 ELSE 0 END), 0) AS correct_attempts,
-                COUNT(DISTINCT question_id) AS attempted_questions
-            FROM {ATTEMPT_TABLE}
-            WHERE lesson_id = :lesson_id{user_filter_sql}
+                l.lesson_id,
+                COALESCE(q.total_questions, 0) AS total_questions,
+                COALESCE(a.total_attempts, 0) AS total_attempts,
+                COALESCE(a.correct_attempts, 0) AS correct_attempts,
+                COALESCE(a.attempted_questions, 0) AS attempted_questions
+            FROM UNNEST(CAST(:lesson_ids AS INTEGER[])) AS l(lesson_id)
+            LEFT JOIN (
+                SELECT li.lesson_id, COUNT(*) AS total_questions
+                FROM {LESSON_ITEM_TABLE} li
+                JOIN {QUESTION_TABLE} q ON q.question_id = li.question_id
+                WHERE li.lesson_id = ANY(:lesson_ids)
+                GROUP BY li.lesson_id
+            ) q ON q.lesson_id = l.lesson_id
+            LEFT JOIN (
+                SELECT
+                    lesson_id,
+                    COUNT(*) AS total_attempts,
+                    SUM(CASE WHEN is_correct THEN 1 ELSE 0 END) AS correct_attempts,
+                    COUNT(DISTINCT question_id) AS attempted_questions
+                FROM {ATTEMPT_TABLE}
+                WHERE lesson_id = ANY(:lesson_ids){user_filter_sql}
+                GROUP BY lesson_id
+            ) a ON a.lesson_id = l.lesson_id
             """,
             params,
         )
     )
-    return rows[0] if rows else {"total_attempts": 0, "correct_attempts": 0, "attempted_questions": 0}
+    return {int(row["lesson_id"]): _progress_payload(row["lesson_id"], row) for row in rows}
 
 
 def get_lesson_progress(user_id: int, lesson_id: int) -> Dict[str, Any]:
-    total_questions = len(get_lesson_questions(lesson_id, user_id=user_id))
-    stats = _attempt_stats_for_lesson(user_id, lesson_id)
-    total_attempts = int(stats.get("total_attempts") or 0)
-    correct_attempts = int(stats.get("correct_attempts") or 0)
-    attempted_questions = int(stats.get("attempted_questions") or 0)
-    accuracy = round((correct_attempts / total_attempts) * 100, 2) if total_attempts else 0.0
-    completed = total_questions > 0 and attempted_questions >= total_questions
+    progress = load_lessons_progress(user_id, [lesson_id])
+    return progress.get(int(lesson_id)) or _progress_payload(lesson_id, {})
 
-    return {
-        "lesson_id": int(lesson_id),
-        "total_questions": total_questions,
-        "attempted_questions": attempted_questions,
-        "correct_attempts": correct_attempts,
-        "total_attempts": total_attempts,
-        "accuracy_pct": accuracy,
-        "is_completed": completed,
-    }
+
+def get_lessons_progress(user_id: int, lesson_ids: Iterable[Any]) -> Dict[int, Dict[str, Any]]:
+    """Session-cached progress for a lesson list; invalidated per lesson by record_grammar_attempt."""
+    return progress_cache.get_lessons_progress("grammar", user_id, lesson_ids, load_lessons_progress)
 
 
 def update_grammar_question_stats(user_id: int, question_id: int) -> Dict[str, Any]:
@@ -569,33 +626,72 @@ def record_grammar_attempt(
     selected = _clean_text(selected_option)
     is_correct = _normalize_lower(selected) == _normalize_lower(correct_option)
 
+    event = AttemptEvent(
+        source="grammar_lesson",
+        user_id=int(user_id),
+        is_correct=bool(is_correct),
+        item_id=int(question_id),
+        lesson_id=int(lesson_id),
+        course_id=int(course_id),
+        answer=selected,
+        extra={"time_taken": time_taken, "user_email": user_email},
+    )
+    attempt_events.publish([event])
+    progress = update_grammar_lesson_progress(user_id, course_id, lesson_id)
+    return {
+        "attempt": _attempt_payload(event),
+        "progress": progress,
+        "is_correct": is_correct,
+        "correct_option": correct_option,
+    }
+
+
+def _attempt_payload(event: AttemptEvent) -> Dict[str, Any]:
     payload: Dict[str, Any] = {
-        "user_id": int(user_id),
-        "course_id": int(course_id),
-        "lesson_id": int(lesson_id),
-        "question_id": int(question_id),
-        "selected_option": selected,
-        "is_correct": bool(is_correct),
+        "user_id": event.user_id,
+        "course_id": event.course_id,
+        "lesson_id": event.lesson_id,
+        "question_id": event.item_id,
+        "selected_option": event.answer,
+        "is_correct": event.is_correct,
     }
-    if time_taken is not None and _preferred_column(ATTEMPT_TABLE, ("time_taken",)):
-        payload["time_taken"] = int(time_taken)
-    if user_email and _preferred_column(ATTEMPT_TABLE, ("user_email", "email")):
-        email_col = _preferred_column(ATTEMPT_TABLE, ("user_email", "email"))
-        if email_col:
-            payload[email_col] = _clean_text(user_email)
-
-    attempt = _insert_row(ATTEMPT_TABLE, payload)
-    update_grammar_question_stats(user_id, question_id)
-    progress = update_grammar_lesson_progress(user_id, course_id, lesson_id)
-    return {"attempt": attempt, "progress": progress, "is_correct": is_correct, "correct_option": correct_option}
+    extra = event.extra or {}
+    if extra.get("time_taken") is not None and _preferred_column(ATTEMPT_TABLE, ("time_taken",)):
+        payload["time_taken"] = int(extra["time_taken"])
+    email_col = _preferred_column(ATTEMPT_TABLE, ("user_email", "email"))
+    if extra.get("user_email") and email_col:
+        payload[email_col] = _clean_text(extra["user_email"])
+    return payload
+
+
+@attempt_events.on_write("grammar_lesson")
+def _write_grammar_attempts(executor, events: List[AttemptEvent]) -> None:
+    columns = set(_table_columns(ATTEMPT_TABLE))
+    for event in events:
+        payload = {k: v for k, v in _attempt_payload(event).items() if k in columns and v is not None}
+        attempt_events.run(
+            executor,
+            f"INSERT INTO {ATTEMPT_TABLE} ({', '.join(payload)}) VALUES ({', '.join(['%s'] * len(payload))})",
+            tuple(payload.values()),
+        )
+
+
+@attempt_events.on_commit("grammar_lesson")
+def _refresh_grammar_rollups(events: List[AttemptEvent]) -> None:
+    for event in events:
+        progress_cache.invalidate_lesson("grammar", event.user_id, event.lesson_id)
+    for user_id, question_id in dict.fromkeys((e.user_id, e.item_id) for e in events):
+        update_grammar_question_stats(user_id, question_id)
 
 
 def get_student_grammar_progress(user_id: int, course_id: int) -> List[Dict[str, Any]]:
     lessons = list_grammar_lessons(course_id)
+    progress_by_lesson = get_lessons_progress(user_id, [lesson["lesson_id"] for lesson in lessons])
     results: List[Dict[str, Any]] = []
     next_found = False
     for lesson in lessons:
-        progress = get_lesson_progress(user_id, int(lesson["lesson_id"]))
+        lesson_id = int(lesson["lesson_id"])
+        progress = progress_by_lesson.get(lesson_id) or _progress_payload(lesson_id, {})
         row = {**lesson, **progress}
         row["lesson_id"] = int(lesson["lesson_id"])
         row["is_next_recommended"] = False
@@ -618,6 +714,7 @@ def _normalize_question_row(question: Dict[str, Any]) -> Dict[str, Any]:
     return question
 
 
+@tagged_cache.memoize(lambda lesson_id: [("grammar_lesson", int(lesson_id))], copy=True)
 def get_grammar_lesson_questions(lesson_id: int) -> List[Dict[str, Any]]:
     rows = _rows_to_dicts(
         _safe_execute(
@@ -9,11 +9,12 @@ from grammar_app.services.grammar_service import (
     DEFAULT_COURSE_NAME,
     get_grammar_course_by_name,
     get_grammar_lesson_questions,
-    get_lesson_progress,
+    get_lessons_progress,
     list_grammar_lessons,
     submit_grammar_answer,
 )
 from shared.auth import get_logged_in_user
+from shared.render_profiler import profile_rerun
 
 GRAMMAR_PAGE_KEY = "grammar_page"
 GRAMMAR_LESSON_ID_KEY = "grammar_selected_lesson_id"
@@ -87,6 +88,7 @@ def _load_practice_state(lesson_id: int) -> Optional[Dict[str, Any]]:
     return state
 
 
+@profile_rerun("grammar_lesson_list")
 def render_grammar_lesson_list() -> None:
     user = get_logged_in_user()
     if not user:
@@ -109,9 +111,10 @@ def render_grammar_lesson_list() -> None:
         return
 
     raw_lessons = list_grammar_lessons(int(course["course_id"]))
+    progress_by_lesson = get_lessons_progress(user_id, [lesson["lesson_id"] for lesson in raw_lessons])
     lessons = []
     for lesson in raw_lessons:
-        progress = get_lesson_progress(user_id, int(lesson["lesson_id"]))
+        progress = progress_by_lesson.get(int(lesson["lesson_id"]), {})
         lessons.append({**lesson, **progress})
 
     next_lesson = next((lesson for lesson in lessons if not lesson.get("is_completed")), None)
@@ -226,6 +229,7 @@ def _render_question(state: Dict[str, Any], lesson_id: int, course_id: int, user
         _reset_to_lessons()
 
 
+@profile_rerun("grammar_practice")
 def render_grammar_practice() -> None:
     user = get_logged_in_user()
     if not user:
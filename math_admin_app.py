@@ -11,12 +11,20 @@ from math_app.repository.math_admin_lesson_repo import (
 from math_app.repository.math_practice_ingest_repo import ingest_practice_csv
 from math_app.repository.math_question_repo import insert_question
 from math_app.repository.math_question_bank_repo import (
-    export_latest_question_bank_df,
     ingest_question_bank_csv,
+    write_question_bank_csv,
 )
 from math_app.repository.math_student_repo import get_active_math_students
+from shared.diagnostics_ui import (
+    render_db_diagnostics,
+    render_password_pool_diagnostics,
+    render_rerun_diagnostics,
+)
+from shared import cache_bus
+from shared.exports import spooled_export
 from math_app.repository.math_registration_repo import (
     approve_math_registration,
+    approve_math_registrations_bulk,
     get_pending_math_registrations,
 )
 from math_app.repository.math_student_mgmt_repo import (
@@ -32,6 +40,7 @@ from math_app.repository.math_student_mgmt_repo import (
 )
 
 init_math_tables()
+cache_bus.start_listener()
 
 st.set_page_config(
     page_title="WordSprint Maths — Admin",
@@ -144,8 +153,7 @@ def render_test_admin():
 
     with col_b:
         try:
-            df = export_latest_question_bank_df()
-            csv_data = df.to_csv(index=False)
+            csv_data = spooled_export(write_question_bank_csv).read()
             st.download_button(
                 label="⬇️ Download Current Question Bank (CSV)",
                 data=csv_data,
@@ -190,6 +198,24 @@ with tabs[0]:
                     st.success(f"Approved {name}")
                     st.rerun()
 
+            st.markdown("#### Approve in bulk")
+            labels = {
+                f"{r.get('name') or r.get('student_name') or '—'} ({r.get('email', '—')})": list(r.values())[0]
+                for r in pending
+            }
+            selected = st.multiselect("Registrations", list(labels.keys()), key="bulk_approve_select")
+            c1, c2 = st.columns(2)
+            with c1:
+                approve_selected = st.button("Approve selected", disabled=not selected, use_container_width=True)
+            with c2:
+                approve_all = st.button(f"Approve all ({len(pending)})", use_container_width=True)
+            if approve_selected or approve_all:
+                ids = list(labels.values()) if approve_all else [labels[label] for label in selected]
+                outcomes = approve_math_registrations_bulk(ids)
+                approved = sum(1 for o in outcomes if o["status"] == "approved")
+                st.success(f"Approved {approved} of {len(ids)} registrations")
+                st.rerun()
+
     with subtabs[1]:
         st.markdown("### 🟢 Active Maths Students")
         students = list_active_math_students()
@@ -407,3 +433,10 @@ with tabs[4]:
 with tabs[5]:
     st.subheader("⚙️ Settings")
     st.info("Coming next: defaults for course/tests and auto-assignment.")
+
+    st.markdown("---")
+    render_db_diagnostics(key_prefix="math_admin")
+    st.markdown("---")
+    render_rerun_diagnostics(key_prefix="math_admin")
+    st.markdown("---")
+    render_password_pool_diagnostics()
@@ -0,0 +1,209 @@
+"""
+Item-difficulty calibration over maths attempts.
+
+Streams attempts in chunks, then estimates per question with NumPy
+(no per-row Python loops):
+
+- p_value          share of correct attempts
+- discrimination   point-biserial correlation of the item with the
+                   student's score on their other attempts
+- rasch_difficulty 1PL / Rasch item difficulty (logits, mean 0) from a
+                   joint maximum likelihood fit, with its standard error
+
+Results go to math_question_stats, keyed by (source, question_id):
+
+    practice  math_practice_attempts, persons = students
+    test      math_attempts (test papers), persons = test sessions
+
+Usage:
+    python -m math_app.calibration --source all
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from math_app.db import get_db_connection, init_math_question_stats_table
+from math_app.repository.math_question_stats_repo import save_question_stats
+
+# rows with a NULL person, question or result cannot be calibrated (and would not fit an int array)
+SOURCES = {
+    "practice": (
+        "SELECT student_id, question_id, is_correct FROM math_practice_attempts "
+        "WHERE student_id IS NOT NULL AND question_id IS NOT NULL AND is_correct IS NOT NULL"
+    ),
+    "test": (
+        "SELECT session_id, question_id, is_correct FROM math_attempts "
+        "WHERE session_id IS NOT NULL AND question_id IS NOT NULL AND is_correct IS NOT NULL"
+    ),
+}
+
+CHUNK_SIZE = 200_000
+RASCH_MAX_ITER = 50
+RASCH_TOL = 1e-4
+LOGIT_CLIP = 6.0
+
+
+# ------------------------------------------------------------
+# LOAD
+# ------------------------------------------------------------
+
+def load_attempts(source: str, chunk_size: int = CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(person, question, correct) arrays, fetched chunk by chunk through a server-side cursor."""
+    persons: List[np.ndarray] = []
+    items: List[np.ndarray] = []
+    correct: List[np.ndarray] = []
+
+    with get_db_connection() as conn:
+        with conn.cursor(name=f"calibration_{source}") as cur:
+            cur.itersize = chunk_size
+            cur.execute(SOURCES[source])
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                arr = np.array(rows, dtype=np.int64)
+                persons.append(arr[:, 0])
+                items.append(arr[:, 1])
+                correct.append(arr[:, 2].astype(np.int8))
+
+    if not persons:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.int8)
+    return np.concatenate(persons), np.concatenate(items), np.concatenate(correct)
+
+
+# ------------------------------------------------------------
+# ESTIMATION
+# ------------------------------------------------------------
+
+def _rasch(p_idx, i_idx, n, s, n_persons, n_items):
+    """
+    Joint ML for P(correct) = sigmoid(theta_p - b_i) on aggregated
+    (person, item) cells with n attempts and s correct.
+    Alternating Newton steps; extreme scores are bounded by clipping.
+    """
+    theta = np.zeros(n_persons)
+    b = np.zeros(n_items)
+
+    for _ in range(RASCH_MAX_ITER):
+        prob = 1.0 / (1.0 + np.exp(-(theta[p_idx] - b[i_idx])))
+        info = n * prob * (1 - prob)
+        step = np.bincount(p_idx, s - n * prob, n_persons) / np.maximum(np.bincount(p_idx, info, n_persons), 1e-9)
+        theta = np.clip(theta + step, -LOGIT_CLIP, LOGIT_CLIP)
+
+        prob = 1.0 / (1.0 + np.exp(-(theta[p_idx] - b[i_idx])))
+        info = n * prob * (1 - prob)
+        info_b = np.maximum(np.bincount(i_idx, info, n_items), 1e-9)
+        step_b = np.bincount(i_idx, n * prob - s, n_items) / info_b
+        b = np.clip(b + step_b, -LOGIT_CLIP, LOGIT_CLIP)
+        b -= b.mean()
+
+        if np.max(np.abs(step_b)) < RASCH_TOL:
+            break
+
+    return b, 1.0 / np.sqrt(info_b)
+
+
+def calibrate(person: np.ndarray, item: np.ndarray, correct: np.ndarray) -> Dict[str, np.ndarray]:
+    """Column -> array, one entry per question seen in the attempts."""
+    if not len(item):
+        return {}
+
+    question_ids, i_idx = np.unique(item, return_inverse=True)
+    _, p_idx = np.unique(person, return_inverse=True)
+    n_items, n_persons = len(question_ids), int(p_idx.max()) + 1
+    x = correct.astype(np.float64)
+
+    attempts = np.bincount(i_idx, minlength=n_items)
+    p_value = np.bincount(i_idx, x, n_items) / attempts
+
+    # point-biserial against the rest score (person's accuracy on their other attempts)
+    person_n = np.bincount(p_idx, minlength=n_persons)
+    person_s = np.bincount(p_idx, x, n_persons)
+    others = person_n[p_idx] - 1
+    has_rest = others > 0
+    rest = np.where(has_rest, (person_s[p_idx] - x) / np.maximum(others, 1), 0.0)
+    w = has_rest.astype(np.float64)
+    cnt = np.bincount(i_idx, w, n_items)
+    sx = np.bincount(i_idx, w * x, n_items)
+    sy = np.bincount(i_idx, w * rest, n_items)
+    sxy = np.bincount(i_idx, w * x * rest, n_items)
+    sxx = np.bincount(i_idx, w * x * x, n_items)
+    syy = np.bincount(i_idx, w * rest * rest, n_items)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sy / cnt
+        var = (sxx - sx * sx / cnt) * (syy - sy * sy / cnt)
+        discrimination = np.where(var > 0, cov / np.sqrt(var), np.nan)
+
+    # aggregate to (person, item) cells for the Rasch fit
+    cell, cell_idx = np.unique(p_idx * n_items + i_idx, return_inverse=True)
+    cell_n = np.bincount(cell_idx).astype(np.float64)
+    cell_s = np.bincount(cell_idx, x)
+    b, se = _rasch(cell // n_items, cell % n_items, cell_n, cell_s, n_persons, n_items)
+
+    students = np.bincount(cell % n_items, minlength=n_items)
+
+    return {
+        "question_id": question_ids,
+        "attempts": attempts,
+        "students": students,
+        "p_value": p_value,
+        "discrimination": discrimination,
+        "rasch_difficulty": b,
+        "rasch_se": se,
+    }
+
+
+def _to_db_lists(stats: Dict[str, np.ndarray]) -> Dict[str, list]:
+    out = {}
+    for col, arr in stats.items():
+        if arr.dtype.kind == "f":
+            out[col] = [None if np.isnan(v) else round(float(v), 6) for v in arr.tolist()]
+        else:
+            out[col] = [int(v) for v in arr.tolist()]
+    return out
+
+
+# ------------------------------------------------------------
+# JOB
+# ------------------------------------------------------------
+
+def run(source: str, chunk_size: int = CHUNK_SIZE, dry_run: bool = False) -> Dict[str, float]:
+    t0 = time.perf_counter()
+    person, item, correct = load_attempts(source, chunk_size)
+    t_load = time.perf_counter()
+    stats = calibrate(person, item, correct)
+    t_fit = time.perf_counter()
+    written = 0 if dry_run or not stats else save_question_stats(source, _to_db_lists(stats))
+    t_save = time.perf_counter()
+    return {
+        "source": source,
+        "attempts": len(item),
+        "questions": len(stats.get("question_id", [])),
+        "written": written,
+        "load_s": round(t_load - t0, 2),
+        "fit_s": round(t_fit - t_load, 2),
+        "save_s": round(t_save - t_fit, 2),
+    }
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Calibrate maths question difficulty from attempts.")
+    p.add_argument("--source", choices=(*SOURCES, "all"), default="all")
+    p.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    p.add_argument("--dry-run", action="store_true", help="Estimate but do not write math_question_stats")
+    opts = p.parse_args(argv)
+
+    init_math_question_stats_table()
+    sources = list(SOURCES) if opts.source == "all" else [opts.source]
+    for source in sources:
+        print(run(source, opts.chunk_size, opts.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import os
 import psycopg2
 from dotenv import load_dotenv
 
+from shared.db_instrumentation import psycopg2_cursor_factory
+
 load_dotenv()
 
 
@@ -14,6 +16,9 @@ def get_db_connection():
     if not database_url:
         raise RuntimeError("DATABASE_URL environment variable is not set")
 
+    cursor_factory = psycopg2_cursor_factory()
+    if cursor_factory is not None:
+        return psycopg2.connect(database_url, cursor_factory=cursor_factory)
     return psycopg2.connect(database_url)
 
 
@@ -213,6 +218,7 @@ def init_math_tables():
 
     init_math_pending_registrations_table()
     init_math_student_management_tables()
+    init_math_question_stats_table()
 
 
 def init_math_practice_progress_table():
@@ -231,6 +237,31 @@ def init_math_practice_progress_table():
             );
             """
         )
+        # Latest position per student+lesson, upserted in place (resume = PK lookup).
+        # math_practice_progress above is only the optional audit log.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS math_practice_position (
+                student_id INTEGER NOT NULL,
+                lesson_id INTEGER NOT NULL,
+                question_index INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (student_id, lesson_id)
+            );
+            """
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS math_practice_progress_archive (
+                id INTEGER PRIMARY KEY,
+                student_id INTEGER NOT NULL,
+                lesson_id INTEGER NOT NULL,
+                question_index INTEGER NOT NULL,
+                created_at TIMESTAMP,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            """
+        )
         conn.commit()
 
     init_math_practice_attempts_table()
@@ -260,3 +291,34 @@ def init_math_practice_attempts_table():
     finally:
         if conn:
             conn.close()
+
+
+def init_math_question_stats_table():
+    """
+    Calibrated item statistics, written by math_app.calibration.
+    source: 'practice' (math_questions ids) or 'test' (math_question_bank ids).
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS math_question_stats (
+                    source TEXT NOT NULL,
+                    question_id INTEGER NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    students INTEGER NOT NULL,
+                    p_value DOUBLE PRECISION,
+                    discrimination DOUBLE PRECISION,
+                    rasch_difficulty DOUBLE PRECISION,
+                    rasch_se DOUBLE PRECISION,
+                    calibrated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (source, question_id)
+                );
+                """
+            )
+            conn.commit()
+    finally:
+        if conn:
+            conn.close()
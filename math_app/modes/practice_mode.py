@@ -5,6 +5,7 @@ from math_app.repository.math_practice_repo import (
     get_questions_for_lesson,
     get_resume_index,
     record_attempt,
+    save_practice_position,
 )
 
 
@@ -179,6 +180,11 @@ def render_practice_mode(*, show_back_button: bool = True):
             selected_option=selected_key,
             is_correct=is_correct,
         )
+        save_practice_position(
+            int(student_id),
+            int(lesson_id),
+            st.session_state.practice_q_index + 1,
+        )
 
         st.session_state.practice_submitted = True
         st.session_state.practice_selected_option = selected_key
@@ -0,0 +1,109 @@
+"""
+Maintenance for maths practice progress.
+
+    backfill  build math_practice_position from the old append-only log
+              (math_practice_progress) and math_attempts, in one pass
+    compact   move log rows older than N days into
+              math_practice_progress_archive (or just delete them
+              with --no-archive)
+
+Usage:
+    python -m math_app.practice_progress_maintenance backfill
+    python -m math_app.practice_progress_maintenance compact --older-than-days 30
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from math_app.db import get_db_connection, init_math_practice_progress_table
+
+
+def backfill_positions() -> int:
+    """Upsert the furthest position per student+lesson from both logs; returns rows touched."""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO math_practice_position (student_id, lesson_id, question_index, updated_at)
+                SELECT student_id, lesson_id, MAX(position), CURRENT_TIMESTAMP
+                FROM (
+                    SELECT student_id, lesson_id, MAX(question_index) AS position
+                    FROM math_practice_progress
+                    GROUP BY student_id, lesson_id
+                    UNION ALL
+                    SELECT student_id, lesson_id, COUNT(DISTINCT question_id) AS position
+                    FROM math_attempts
+                    WHERE student_id IS NOT NULL AND lesson_id IS NOT NULL
+                    GROUP BY student_id, lesson_id
+                ) logs
+                GROUP BY student_id, lesson_id
+                ON CONFLICT (student_id, lesson_id) DO UPDATE
+                SET question_index = GREATEST(math_practice_position.question_index, EXCLUDED.question_index),
+                    updated_at = EXCLUDED.updated_at
+                """
+            )
+            return cur.rowcount
+
+
+def compact_log(older_than_days: int, archive: bool = True) -> int:
+    """
+    Remove log rows older than `older_than_days` (after folding them into
+    math_practice_position); returns rows removed.
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO math_practice_position (student_id, lesson_id, question_index, updated_at)
+                SELECT student_id, lesson_id, MAX(question_index), CURRENT_TIMESTAMP
+                FROM math_practice_progress
+                WHERE created_at < NOW() - make_interval(days => %s)
+                GROUP BY student_id, lesson_id
+                ON CONFLICT (student_id, lesson_id) DO UPDATE
+                SET question_index = GREATEST(math_practice_position.question_index, EXCLUDED.question_index)
+                """,
+                (older_than_days,),
+            )
+            if archive:
+                cur.execute(
+                    """
+                    WITH moved AS (
+                        DELETE FROM math_practice_progress
+                        WHERE created_at < NOW() - make_interval(days => %s)
+                        RETURNING id, student_id, lesson_id, question_index, created_at
+                    )
+                    INSERT INTO math_practice_progress_archive
+                        (id, student_id, lesson_id, question_index, created_at)
+                    SELECT id, student_id, lesson_id, question_index, created_at FROM moved
+                    ON CONFLICT (id) DO NOTHING
+                    """,
+                    (older_than_days,),
+                )
+            else:
+                cur.execute(
+                    "DELETE FROM math_practice_progress WHERE created_at < NOW() - make_interval(days => %s)",
+                    (older_than_days,),
+                )
+            return cur.rowcount
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Maths practice progress maintenance.")
+    sub = p.add_subparsers(dest="command", required=True)
+    sub.add_parser("backfill", help="Build math_practice_position from the old logs")
+    compact = sub.add_parser("compact", help="Archive or delete old math_practice_progress rows")
+    compact.add_argument("--older-than-days", type=int, default=30)
+    compact.add_argument("--no-archive", action="store_true", help="Delete instead of archiving")
+    opts = p.parse_args(argv)
+
+    init_math_practice_progress_table()
+    if opts.command == "backfill":
+        print(f"Positions upserted: {backfill_positions()}")
+    else:
+        removed = compact_log(opts.older_than_days, archive=not opts.no_archive)
+        print(f"Log rows {'deleted' if opts.no_archive else 'archived'}: {removed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ from typing import Dict, List, Optional
 import pandas as pd
 
 from math_app.db import get_db_connection
+from shared.exports import spooled_export, write_query_csv
 
 # ---------------------------------------------------------------------------
 # LESSON QUERIES
@@ -82,45 +83,58 @@ def get_math_lessons_by_difficulty(difficulty: Optional[str]) -> List[Dict]:
     ]
 
 
+LESSON_EXPORT_COLUMNS = [
+    "question_id", "topic", "difficulty", "stem",
+    "option_a", "option_b", "option_c", "option_d", "option_e",
+    "correct_option", "explanation", "hint",
+]
+
+LESSON_EXPORT_SQL = """
+    SELECT
+        q.question_id,
+        q.topic,
+        q.difficulty,
+        q.stem,
+        q.option_a,
+        q.option_b,
+        q.option_c,
+        q.option_d,
+        q.option_e,
+        q.correct_option,
+        q.explanation,
+        q.hint
+    FROM math_questions q
+    JOIN math_lesson_questions mlq ON mlq.question_id = q.id
+    WHERE mlq.lesson_id = %s
+    ORDER BY mlq.position, q.id
+"""
+
+
 def get_lesson_questions_df(lesson_id: int) -> pd.DataFrame:
     """
-    Returns all questions for a lesson as a DataFrame (for CSV export).
+    Returns all questions for a lesson as a DataFrame.
     """
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT
-                    q.question_id,
-                    q.topic,
-                    q.difficulty,
-                    q.stem,
-                    q.option_a,
-                    q.option_b,
-                    q.option_c,
-                    q.option_d,
-                    q.option_e,
-                    q.correct_option,
-                    q.explanation,
-                    q.hint
-                FROM math_questions q
-                JOIN math_lesson_questions mlq ON mlq.question_id = q.id
-                WHERE mlq.lesson_id = %s
-                ORDER BY mlq.position, q.id
-                """,
-                (lesson_id,),
-            )
+            cur.execute(LESSON_EXPORT_SQL, (lesson_id,))
             rows = cur.fetchall()
-            cols = [
-                "question_id", "topic", "difficulty", "stem",
-                "option_a", "option_b", "option_c", "option_d", "option_e",
-                "correct_option", "explanation", "hint",
-            ]
     finally:
         conn.close()
 
-    return pd.DataFrame(rows, columns=cols)
+    return pd.DataFrame(rows, columns=LESSON_EXPORT_COLUMNS)
+
+
+def write_lesson_csv(out, lesson_id: int, gzip: bool = False) -> int:
+    """Stream a lesson's questions as CSV onto `out`; returns rows written."""
+    return write_query_csv(
+        out,
+        LESSON_EXPORT_SQL,
+        (lesson_id,),
+        connect=get_db_connection,
+        header=LESSON_EXPORT_COLUMNS,
+        gzip=gzip,
+    )
 
 
 def rename_lesson_display_name(lesson_id: int, new_display_name: str) -> None:
@@ -190,7 +204,4 @@ def build_blank_template_csv(difficulty: str = "basic") -> bytes:
 
 
 def build_lesson_csv(lesson_id: int) -> bytes:
-    df = get_lesson_questions_df(lesson_id)
-    buf = io.BytesIO()
-    df.to_csv(buf, index=False)
-    return buf.getvalue()
+    return spooled_export(write_lesson_csv, lesson_id).read()
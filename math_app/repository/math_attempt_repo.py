@@ -2,7 +2,14 @@
 Math Attempt Repository
 """
 
+from typing import Iterable, List, Optional, Tuple
+
 from math_app.db import get_db_connection
+from shared import attempt_events
+from shared.attempt_events import AttemptEvent
+
+# (question_id, selected_option, is_correct)
+Answer = Tuple[int, str, bool]
 
 
 def record_attempt(
@@ -30,3 +37,72 @@ def record_attempt(
     conn.commit()
     cursor.close()
     conn.close()
+
+
+@attempt_events.on_write("math_test")
+def _write_test_attempts(executor, events):
+    attempt_events.run(
+        executor,
+        """
+        INSERT INTO math_attempts (
+            session_id,
+            question_id,
+            selected_option,
+            is_correct
+        )
+        SELECT * FROM UNNEST(%s::INTEGER[], %s::INTEGER[], %s::TEXT[], %s::BOOLEAN[])
+        """,
+        (
+            [int(e.extra["session_id"]) for e in events],
+            [e.item_id for e in events],
+            [e.answer for e in events],
+            [bool(e.is_correct) for e in events],
+        ),
+    )
+
+
+def test_attempt_events(
+    session_id: int, answers: Iterable[Answer], user_id: Optional[int] = None
+) -> List[AttemptEvent]:
+    return [
+        AttemptEvent(
+            source="math_test",
+            user_id=user_id,
+            is_correct=bool(is_correct),
+            item_id=int(question_id),
+            answer=str(selected),
+            extra={"session_id": int(session_id)},
+        )
+        for question_id, selected, is_correct in answers
+    ]
+
+
+def insert_attempts_with_cursor(
+    cursor, session_id: int, answers: Iterable[Answer], user_id: Optional[int] = None
+) -> List[AttemptEvent]:
+    """
+    Publish buffered test answers on a caller-owned transaction (the
+    math_test consumer writes the math_attempts rows). Returns the events
+    for attempt_events.dispatch_committed once the caller has committed.
+    """
+    events = test_attempt_events(session_id, answers, user_id)
+    if events:
+        attempt_events.publish(events, cursor)
+    return events
+
+
+def record_attempts_bulk(session_id: int, answers: Iterable[Answer], user_id: Optional[int] = None) -> int:
+    """Checkpoint flush: persist a batch of buffered answers in one statement."""
+    answers = list(answers)
+    if not answers:
+        return 0
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            events = insert_attempts_with_cursor(cursor, session_id, answers, user_id)
+        conn.commit()
+    finally:
+        conn.close()
+    attempt_events.dispatch_committed(events)
+    return len(events)
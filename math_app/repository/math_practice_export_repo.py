@@ -1,7 +1,5 @@
-import csv
-from io import StringIO
-
 from math_app.db import get_db_connection
+from shared.exports import spooled_export, write_query_csv
 
 
 EXPORT_COLUMNS = [
@@ -19,13 +17,7 @@ EXPORT_COLUMNS = [
 ]
 
 
-def export_lesson_to_csv(lesson_id: int) -> str:
-    """
-    Export all questions for a lesson into a CSV string.
-    Format matches ingestion contract exactly.
-    """
-
-    sql = """
+LESSON_EXPORT_SQL = """
     SELECT
         q.question_id,
         q.topic,
@@ -42,19 +34,28 @@ def export_lesson_to_csv(lesson_id: int) -> str:
     JOIN math_questions q
       ON q.id = lq.question_id
     WHERE lq.lesson_id = %s
-    ORDER BY lq.position ASC;
-    """
+    ORDER BY lq.position ASC
+"""
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, (lesson_id,))
-            rows = cur.fetchall()
 
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(EXPORT_COLUMNS)
+def write_lesson_to_csv(out, lesson_id: int, gzip: bool = False) -> int:
+    """
+    Stream all questions for a lesson as CSV onto `out` (server-side cursor).
+    Format matches ingestion contract exactly.
+    """
+    return write_query_csv(
+        out,
+        LESSON_EXPORT_SQL,
+        (lesson_id,),
+        connect=get_db_connection,
+        header=EXPORT_COLUMNS,
+        gzip=gzip,
+    )
 
-    for row in rows:
-        writer.writerow(row)
 
-    return output.getvalue()
+def export_lesson_to_csv(lesson_id: int) -> str:
+    """
+    Export all questions for a lesson into a CSV string.
+    Format matches ingestion contract exactly.
+    """
+    return spooled_export(write_lesson_to_csv, lesson_id).read().decode("utf-8")
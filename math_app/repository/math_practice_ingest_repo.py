@@ -4,6 +4,7 @@ from typing import BinaryIO, Dict, List, Optional
 import pandas as pd
 
 from math_app.db import get_db_connection
+from shared import cache_bus
 
 # ------------------------------------------------------------
 # CSV CONTRACT
@@ -85,6 +86,7 @@ def ingest_practice_csv(
     df["correct_option"] = df["correct_option"].str.strip().str.upper()
 
     lessons_seen = set()
+    lesson_ids = set()
     questions_upserted = 0
     mappings_created = 0
 
@@ -212,6 +214,12 @@ def ingest_practice_csv(
                 lesson_id = upsert_lesson(row["topic"])
                 question_id = upsert_question(row)
                 ensure_mapping(lesson_id, question_id, idx + 1)
+                lesson_ids.add(lesson_id)
+
+            # delivered to every app process when this transaction commits
+            cache_bus.publish("math_course", int(course_id), executor=cur)
+            for lesson_id in sorted(lesson_ids):
+                cache_bus.publish("math_lesson", int(lesson_id), executor=cur)
 
         conn.commit()
 
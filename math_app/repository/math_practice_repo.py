@@ -1,5 +1,8 @@
+import os
 from typing import List, Dict, Optional
 from math_app.db import get_db_connection
+from shared import attempt_events
+from shared.attempt_events import AttemptEvent
 
 
 # ------------------------------------------------------------
@@ -85,6 +88,88 @@ def get_questions_for_lesson(lesson_id: int) -> List[Dict]:
     ]
 
 
+# ------------------------------------------------------------
+# PRACTICE POSITION (UPSERTED IN PLACE)
+# ------------------------------------------------------------
+#
+# math_practice_position holds one row per student+lesson with the
+# furthest question index reached. The old append-only
+# math_practice_progress log is only written when
+# MATH_PRACTICE_PROGRESS_AUDIT=1 and is compacted / archived by
+# python -m math_app.practice_progress_maintenance.
+
+AUDIT_LOG_ENABLED = os.getenv("MATH_PRACTICE_PROGRESS_AUDIT", "0") == "1"
+
+_UPSERT_POSITION_SQL = """
+    INSERT INTO math_practice_position (student_id, lesson_id, question_index, updated_at)
+    VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (student_id, lesson_id) DO UPDATE
+    SET question_index = GREATEST(math_practice_position.question_index, EXCLUDED.question_index),
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+def _get_position(cur, student_id: int, lesson_id: int) -> Optional[int]:
+    cur.execute(
+        """
+        SELECT question_index
+        FROM math_practice_position
+        WHERE student_id = %s AND lesson_id = %s
+        """,
+        (student_id, lesson_id),
+    )
+    row = cur.fetchone()
+    return int(row[0]) if row else None
+
+
+def _backfill_position(cur, student_id: int, lesson_id: int) -> int:
+    """First read for a student+lesson with no position row: derive it from the old logs once."""
+    cur.execute(
+        """
+        SELECT GREATEST(
+            (SELECT COALESCE(MAX(question_index), 0)
+               FROM math_practice_progress
+              WHERE student_id = %s AND lesson_id = %s),
+            (SELECT COUNT(DISTINCT question_id)
+               FROM math_attempts
+              WHERE student_id = %s AND lesson_id = %s)
+        )
+        """,
+        (student_id, lesson_id, student_id, lesson_id),
+    )
+    position = int(cur.fetchone()[0] or 0)
+    cur.execute(_UPSERT_POSITION_SQL, (student_id, lesson_id, position))
+    return position
+
+
+def get_practice_position(student_id: int, lesson_id: int) -> int:
+    """
+    Furthest question index (0-based, = next unanswered) reached by the
+    student in this lesson. Primary-key lookup.
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            position = _get_position(cur, student_id, lesson_id)
+            if position is None:
+                position = _backfill_position(cur, student_id, lesson_id)
+    return position
+
+
+def save_practice_position(student_id: int, lesson_id: int, question_index: int) -> None:
+    """Move the student's position forward (never backwards) in place."""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(_UPSERT_POSITION_SQL, (student_id, lesson_id, question_index))
+            if AUDIT_LOG_ENABLED:
+                cur.execute(
+                    """
+                    INSERT INTO math_practice_progress (student_id, lesson_id, question_index)
+                    VALUES (%s, %s, %s)
+                    """,
+                    (student_id, lesson_id, question_index),
+                )
+
+
 # ------------------------------------------------------------
 # RESUME LOGIC
 # ------------------------------------------------------------
@@ -96,25 +181,11 @@ def get_resume_index(student_id: int, lesson_id: int) -> int:
 
     If all questions have been attempted, returns total count.
     """
-    sql = """
-        SELECT
-            COUNT(DISTINCT a.question_id)
-        FROM math_attempts a
-        WHERE a.student_id = %s
-          AND a.lesson_id = %s
-    """
-
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, (student_id, lesson_id))
-            attempted_count = cur.fetchone()[0]
-
-    # Resume index = number of attempted questions
-    return attempted_count or 0
+    return get_practice_position(student_id, lesson_id)
 
 
 # ------------------------------------------------------------
-# PRACTICE PROGRESS (APPEND-ONLY)
+# PRACTICE PROGRESS
 # ------------------------------------------------------------
 
 def get_practice_progress(student_id: int, lesson_id: int) -> int:
@@ -122,90 +193,37 @@ def get_practice_progress(student_id: int, lesson_id: int) -> int:
     Returns last completed question index for this student+lesson.
     Defaults to 0 (start).
     """
-    from math_app.db import get_db_connection
-
-    conn = None
-    try:
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT COALESCE(MAX(question_index), 0)
-                FROM math_practice_progress
-                WHERE student_id = %s AND lesson_id = %s
-                """,
-                (student_id, lesson_id),
-            )
-            row = cur.fetchone()
-            return row[0] if row else 0
-    finally:
-        if conn:
-            conn.close()
+    return get_practice_position(student_id, lesson_id)
 
 
 def save_practice_progress(student_id: int, lesson_id: int, question_index: int):
     """
-    Append-only progress tracking.
+    Upserts the student's position (audit log row only if enabled).
     """
-    from math_app.db import get_db_connection
-
-    conn = None
-    try:
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO math_practice_progress (student_id, lesson_id, question_index)
-                VALUES (%s, %s, %s)
-                """,
-                (student_id, lesson_id, question_index),
-            )
-            conn.commit()
-    finally:
-        if conn:
-            conn.close()
+    save_practice_position(student_id, lesson_id, question_index)
 
 
 # ------------------------------------------------------------
 # ATTEMPTS (APPEND-ONLY)
 # ------------------------------------------------------------
 
-def record_attempt(
-    student_id: int,
-    lesson_id: int,
-    question_id: int,
-    selected_option: str,
-    is_correct: bool,
-) -> None:
-    """
-    Record a student attempt.
-    Append-only. Never updates or deletes history.
-    """
-    sql = """
-        INSERT INTO math_attempts (
-            student_id,
-            lesson_id,
-            question_id,
-            selected_option,
-            is_correct,
-            attempted_at
-        )
-        VALUES (%s, %s, %s, %s, %s, NOW())
-    """
-
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                sql,
-                (
-                    student_id,
-                    lesson_id,
-                    question_id,
-                    selected_option,
-                    is_correct,
-                ),
-            )
-        conn.commit()
+@attempt_events.on_write("math_practice")
+def _write_practice_attempts(executor, events):
+    attempt_events.run(
+        executor,
+        """
+        INSERT INTO math_practice_attempts
+        (student_id, lesson_id, question_id, selected_option, is_correct)
+        SELECT * FROM UNNEST(%s::INTEGER[], %s::INTEGER[], %s::INTEGER[], %s::TEXT[], %s::BOOLEAN[])
+        """,
+        (
+            [e.user_id for e in events],
+            [e.lesson_id for e in events],
+            [e.item_id for e in events],
+            [e.answer for e in events],
+            [bool(e.is_correct) for e in events],
+        ),
+    )
 
 
 def record_practice_attempt(
@@ -216,24 +234,26 @@ def record_practice_attempt(
     is_correct: bool,
 ) -> None:
     """
-    Record a student practice attempt.
+    Record a student practice attempt (attempt event + math_practice_attempts row).
     Append-only. Never updates or deletes history.
     """
-    from math_app.db import get_db_connection
-
-    conn = None
+    event = AttemptEvent(
+        source="math_practice",
+        user_id=student_id,
+        is_correct=is_correct,
+        item_id=question_id,
+        lesson_id=lesson_id,
+        answer=selected_option,
+    )
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO math_practice_attempts
-                (student_id, lesson_id, question_id, selected_option, is_correct)
-                VALUES (%s, %s, %s, %s, %s)
-                """,
-                (student_id, lesson_id, question_id, selected_option, is_correct),
-            )
-            conn.commit()
+            attempt_events.publish([event], cur)
+        conn.commit()
     finally:
-        if conn:
-            conn.close()
+        conn.close()
+    attempt_events.dispatch_committed([event])
+
+
+# older name, kept for math_app/modes/practice_mode.py
+record_attempt = record_practice_attempt
@@ -6,6 +6,9 @@ from typing import BinaryIO, Dict, List
 import pandas as pd
 
 from math_app.db import get_db_connection
+from math_app.test_assembler import invalidate_question_pools
+from shared import cache_bus
+from shared.exports import copy_query_csv
 
 REQUIRED_COLUMNS = [
     "question_code",
@@ -144,60 +147,47 @@ def ingest_question_bank_csv(file_obj: BinaryIO) -> Dict[str, int]:
                 )
                 inserted += 1
 
+            # other app processes drop their pools when this commits
+            cache_bus.publish("math_question_bank", executor=cur)
+
+    # New versions change the test pools
+    invalidate_question_pools()
     return {"rows_inserted": inserted}
 
 
-def export_latest_question_bank_df() -> pd.DataFrame:
-    """
-    Returns latest version per question_code as a DataFrame suitable for CSV download.
-    """
-    sql = """
+# Latest version per question_code, shaped like the upload CSV
+QUESTION_BANK_EXPORT_SQL = """
     SELECT DISTINCT ON (question_code)
         question_code,
         question_text,
-        options_json,
-        correct_option,
+        COALESCE(options_json->>'a', '') AS option_a,
+        COALESCE(options_json->>'b', '') AS option_b,
+        COALESCE(options_json->>'c', '') AS option_c,
+        COALESCE(options_json->>'d', '') AS option_d,
+        CASE correct_option
+            WHEN 'A' THEN 'option_a'
+            WHEN 'B' THEN 'option_b'
+            WHEN 'C' THEN 'option_c'
+            WHEN 'D' THEN 'option_d'
+            ELSE ''
+        END AS correct_option,
         topic,
         difficulty,
-        is_active
+        CASE WHEN is_active THEN 'true' ELSE 'false' END AS is_active
     FROM math_question_bank
-    ORDER BY question_code, version DESC;
+    ORDER BY question_code, version DESC
+"""
+
+
+def write_question_bank_csv(out: BinaryIO, gzip: bool = False) -> int:
+    """Stream the current question bank as CSV onto `out` (COPY, no DataFrame)."""
+    return copy_query_csv(out, QUESTION_BANK_EXPORT_SQL, connect=get_db_connection, gzip=gzip)
+
+
+def export_latest_question_bank_df() -> pd.DataFrame:
+    """
+    Returns latest version per question_code as a DataFrame suitable for CSV download.
+    Prefer write_question_bank_csv for downloads; this loads the whole bank.
     """
     with get_db_connection() as conn:
-        df = pd.read_sql(sql, conn)
-
-    # Expand JSON options
-    def _opt(dfrow, k):
-        try:
-            return (dfrow.get("options_json") or {}).get(k, "")
-        except Exception:
-            return ""
-
-    df["option_a"] = df.apply(lambda r: _opt(r, "a"), axis=1)
-    df["option_b"] = df.apply(lambda r: _opt(r, "b"), axis=1)
-    df["option_c"] = df.apply(lambda r: _opt(r, "c"), axis=1)
-    df["option_d"] = df.apply(lambda r: _opt(r, "d"), axis=1)
-
-    # Map correct letter back to option_* label
-    inv = {"A": "option_a", "B": "option_b", "C": "option_c", "D": "option_d"}
-    df["correct_option"] = df["correct_option"].map(inv).fillna("")
-
-    # Final column order
-    out = df[
-        [
-            "question_code",
-            "question_text",
-            "option_a",
-            "option_b",
-            "option_c",
-            "option_d",
-            "correct_option",
-            "topic",
-            "difficulty",
-            "is_active",
-        ]
-    ].copy()
-
-    # Ensure boolean-style strings
-    out["is_active"] = out["is_active"].apply(lambda x: "true" if bool(x) else "false")
-    return out
+        return pd.read_sql(QUESTION_BANK_EXPORT_SQL, conn)
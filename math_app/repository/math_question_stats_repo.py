@@ -0,0 +1,81 @@
+"""
+Math Question Stats Repository
+
+Read / write side of math_question_stats (see math_app.calibration).
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from math_app.db import get_db_connection
+
+STAT_COLUMNS = (
+    "question_id",
+    "attempts",
+    "students",
+    "p_value",
+    "discrimination",
+    "rasch_difficulty",
+    "rasch_se",
+)
+
+
+def save_question_stats(source: str, stats: Dict[str, List[Any]]) -> int:
+    """
+    Upsert calibrated stats for one source in a single statement.
+    `stats` is column -> list (same length), as produced by the calibration job.
+    """
+    n = len(stats.get("question_id") or [])
+    if not n:
+        return 0
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO math_question_stats (
+                    source, question_id, attempts, students,
+                    p_value, discrimination, rasch_difficulty, rasch_se, calibrated_at
+                )
+                SELECT %s, s.*, CURRENT_TIMESTAMP
+                FROM UNNEST(
+                    %s::INTEGER[], %s::INTEGER[], %s::INTEGER[],
+                    %s::DOUBLE PRECISION[], %s::DOUBLE PRECISION[],
+                    %s::DOUBLE PRECISION[], %s::DOUBLE PRECISION[]
+                ) AS s
+                ON CONFLICT (source, question_id) DO UPDATE SET
+                    attempts = EXCLUDED.attempts,
+                    students = EXCLUDED.students,
+                    p_value = EXCLUDED.p_value,
+                    discrimination = EXCLUDED.discrimination,
+                    rasch_difficulty = EXCLUDED.rasch_difficulty,
+                    rasch_se = EXCLUDED.rasch_se,
+                    calibrated_at = EXCLUDED.calibrated_at;
+                """,
+                (source, *[list(stats[c]) for c in STAT_COLUMNS]),
+            )
+    return n
+
+
+def get_question_stats(
+    source: str,
+    question_ids: Optional[Iterable[int]] = None,
+    min_attempts: int = 0,
+) -> Dict[int, Dict[str, Any]]:
+    """question_id -> stats for one source (optionally only some ids)."""
+    sql = """
+        SELECT question_id, attempts, students, p_value, discrimination,
+               rasch_difficulty, rasch_se, calibrated_at
+        FROM math_question_stats
+        WHERE source = %s AND attempts >= %s
+    """
+    params: List[Any] = [source, min_attempts]
+    if question_ids is not None:
+        sql += " AND question_id = ANY(%s)"
+        params.append([int(q) for q in question_ids])
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, tuple(params))
+            cols = [d[0] for d in cur.description]
+            rows = cur.fetchall()
+    return {int(r[0]): dict(zip(cols, r)) for r in rows}
@@ -1,7 +1,6 @@
 from math_app.db import get_db_connection
 from math_app.repository import math_student_mgmt_repo
-from math_app.repository.math_class_repo import get_class_defaults
-from math_app.repository.math_student_mgmt_repo import enroll_student_in_course
+from math_app.repository.math_class_repo import class_defaults_with_cursor
 
 
 def create_math_registration(name: str, email: str, password_hash: str):
@@ -105,91 +104,151 @@ def approve_math_registration(registration_pk):
     """
     Approves a pending maths registration using dynamic PK handling.
     """
+    outcomes = approve_math_registrations_bulk([registration_pk])
+    return bool(outcomes) and outcomes[0]["status"] == "approved"
+
+
+def approve_math_registrations_bulk(registration_pks):
+    """
+    Approve many pending maths registrations in one transaction.
+
+    Users are created / reactivated with a single INSERT ... SELECT ... ON
+    CONFLICT, the pending rows are marked APPROVED in one UPDATE and class
+    default courses are enrolled in one INSERT (class defaults are read once
+    per distinct class, not per student).
+
+    Returns one dict per requested id, in input order:
+        {"registration_id", "status", "user_id"}
+    status is "approved" or "not_found".
+    """
+    pks = list(dict.fromkeys(registration_pks))
+    if not pks:
+        return []
+
     conn = None
     try:
         conn = get_db_connection()
         with conn.cursor() as cur:
-            # Fetch pending record dynamically
             cur.execute(
                 """
-                SELECT *
-                FROM math_pending_registrations
-                WHERE status = 'PENDING'
-                """,
-            )
-            rows = cur.fetchall()
-            col_names = [desc[0] for desc in cur.description]
-
-            target = None
-            for row in rows:
-                record = dict(zip(col_names, row))
-                if record[col_names[0]] == registration_pk:
-                    target = record
-                    break
-
-            if not target:
-                return False
-
-            name = (
-                target.get("name")
-                or target.get("student_name")
-                or target.get("full_name")
-                or "Student"
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name = 'math_pending_registrations'
+                ORDER BY ordinal_position
+                """
             )
+            cols = [r[0] for r in cur.fetchall()]
+            if not cols or "email" not in cols:
+                raise RuntimeError("Pending registration missing email")
 
-            email = target.get("email")
-            password_hash = target.get("password_hash")
-            class_name = target.get("class_name")
+            pk_col = cols[0]
+            name_cols = [c for c in ("name", "student_name", "full_name") if c in cols]
+            name_expr = f"COALESCE({', '.join(name_cols)}, 'Student')" if name_cols else "'Student'"
+            password_expr = "password_hash" if "password_hash" in cols else "NULL"
+            class_expr = "class_name" if "class_name" in cols else "NULL"
+            status_filter = "AND status = 'PENDING'" if "status" in cols else ""
 
-            if not email:
-                raise RuntimeError("Pending registration missing email")
+            cur.execute(
+                f"""
+                SELECT {pk_col}, email, {class_expr}
+                FROM math_pending_registrations
+                WHERE {pk_col} = ANY(%s) {status_filter}
+                FOR UPDATE
+                """,
+                (pks,),
+            )
+            pending = cur.fetchall()
+            if not pending:
+                conn.rollback()
+                return [{"registration_id": pk, "status": "not_found", "user_id": None} for pk in pks]
+            found_pks = [r[0] for r in pending]
 
-            # Create or activate user
+            # Create or activate users (one row per email, oldest registration wins)
             cur.execute(
-                """
+                f"""
                 INSERT INTO users (name, email, password_hash, role, status, app_source, class_name)
-                VALUES (%s, %s, %s, 'student', 'ACTIVE', 'math', %s)
+                SELECT DISTINCT ON (email)
+                       {name_expr}, email, {password_expr}, 'student', 'ACTIVE', 'math', {class_expr}
+                FROM math_pending_registrations
+                WHERE {pk_col} = ANY(%s) AND email IS NOT NULL
+                ORDER BY email, {pk_col}
                 ON CONFLICT (email)
                 DO UPDATE SET
                     status = 'ACTIVE',
                     app_source = 'math'
+                RETURNING user_id, email
                 """,
-                (name, email, password_hash, class_name),
+                (found_pks,),
             )
+            user_by_email = {email: int(uid) for uid, email in cur.fetchall()}
 
-            cur.execute("SELECT user_id FROM users WHERE email = %s", (email,))
-            user_row = cur.fetchone()
-            user_id = int(user_row[0]) if user_row else None
-
-            # Mark approved (use PK column dynamically)
-            if "status" in target:
+            if "status" in cols:
                 cur.execute(
                     f"""
                     UPDATE math_pending_registrations
                     SET status = 'APPROVED'
-                    WHERE {col_names[0]} = %s
+                    WHERE {pk_col} = ANY(%s)
                     """,
-                    (registration_pk,),
+                    (found_pks,),
                 )
 
             conn.commit()
 
             # --- AUTO ASSIGN ON APPROVAL (SAFE) ---
+            # Own transaction after the approval commit: a missing class
+            # table or a bad default must not undo the approvals.
+            test_assignments = []
             try:
-                if class_name and user_id:
-                    course_id, test_ids = get_class_defaults(class_name)
-
+                defaults_by_class = {
+                    class_name: class_defaults_with_cursor(cur, class_name)
+                    for class_name in {r[2] for r in pending if r[2]}
+                }
+                enroll_users, enroll_courses = [], []
+                for _, email, class_name in pending:
+                    user_id = user_by_email.get(email)
+                    if not class_name or not user_id:
+                        continue
+                    course_id, test_ids = defaults_by_class[class_name]
                     if course_id:
-                        enroll_student_in_course(user_id=user_id, course_id=int(course_id))
-
+                        enroll_users.append(user_id)
+                        enroll_courses.append(int(course_id))
                     if test_ids:
-                        assign_tests = getattr(math_student_mgmt_repo, "assign_tests_to_student", None)
-                        if callable(assign_tests):
-                            assign_tests(student_email=email, test_ids=test_ids)
+                        test_assignments.append((email, test_ids))
+
+                if enroll_users:
+                    cur.execute(
+                        """
+                        INSERT INTO math_enrollments (user_id, course_id)
+                        SELECT * FROM UNNEST(%s::INTEGER[], %s::INTEGER[])
+                        ON CONFLICT DO NOTHING
+                        """,
+                        (enroll_users, enroll_courses),
+                    )
+                conn.commit()
             except Exception:
-                pass
-
-            return True
+                conn.rollback()
+
+        if test_assignments:
+            assign_tests = getattr(math_student_mgmt_repo, "assign_tests_to_student", None)
+            if callable(assign_tests):
+                for email, test_ids in test_assignments:
+                    try:
+                        assign_tests(student_email=email, test_ids=test_ids)
+                    except Exception:
+                        pass
+
+        email_by_pk = {r[0]: r[1] for r in pending}
+        outcomes = []
+        for pk in pks:
+            user_id = user_by_email.get(email_by_pk.get(pk))
+            outcomes.append(
+                {
+                    "registration_id": pk,
+                    "status": "approved" if pk in email_by_pk else "not_found",
+                    "user_id": user_id,
+                }
+            )
+        return outcomes
     finally:
         if conn:
             conn.close()
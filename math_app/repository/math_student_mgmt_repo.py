@@ -1,6 +1,7 @@
 from typing import Any, Dict, List, Optional
 
 from math_app.db import get_db_connection
+from shared.bulk_enrollment import add_links, apply_links, cross, sync_links
 
 
 def _fetchall_dict(cur) -> List[Dict[str, Any]]:
@@ -56,51 +57,71 @@ def approve_pending_registration(pending_id: int) -> bool:
     Uses the shared users table (already present in your platform) but does NOT duplicate users.
     If user does not exist yet, approval fails (registration flow must create the user row first).
     """
-    conn = None
-    try:
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id, name, email
-                FROM math_pending_registrations
-                WHERE id = %s AND status = 'PENDING'
-                """,
-                (pending_id,),
-            )
-            row = cur.fetchone()
-            if not row:
-                return False
-
-            _, _, email = row
+    outcomes = approve_pending_registrations_bulk([pending_id])
+    return bool(outcomes) and outcomes[0]["status"] == "approved"
 
-            cur.execute("SELECT user_id FROM users WHERE email = %s", (email,))
-            urow = cur.fetchone()
-            if not urow:
-                return False
 
-            user_id = int(urow[0])
+def approve_pending_registrations_bulk(pending_ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    Set-based version of approve_pending_registration for a whole cohort,
+    in one transaction. Same rule: registrations without a users row fail.
 
-            cur.execute(
-                """
-                INSERT INTO math_student_access (user_id, status)
-                VALUES (%s, 'ACTIVE')
-                ON CONFLICT (user_id) DO UPDATE SET status = 'ACTIVE'
-                """,
-                (user_id,),
-            )
+    Returns {"pending_id", "status", "user_id"} per id, in input order;
+    status is "approved", "no_user" or "not_found".
+    """
+    ids = list(dict.fromkeys(int(pid) for pid in pending_ids))
+    if not ids:
+        return []
 
+    conn = None
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cur:
             cur.execute(
                 """
-                UPDATE math_pending_registrations
-                SET status = 'APPROVED'
-                WHERE id = %s
+                SELECT p.id, u.user_id
+                FROM math_pending_registrations p
+                LEFT JOIN users u ON u.email = p.email
+                WHERE p.id = ANY(%s) AND p.status = 'PENDING'
+                FOR UPDATE OF p
                 """,
-                (pending_id,),
+                (ids,),
             )
+            found = {int(pid): (int(uid) if uid is not None else None) for pid, uid in cur.fetchall()}
+            approvable = [pid for pid, uid in found.items() if uid is not None]
 
+            if approvable:
+                cur.execute(
+                    """
+                    INSERT INTO math_student_access (user_id, status)
+                    SELECT DISTINCT u.user_id, 'ACTIVE'
+                    FROM math_pending_registrations p
+                    JOIN users u ON u.email = p.email
+                    WHERE p.id = ANY(%s)
+                    ON CONFLICT (user_id) DO UPDATE SET status = 'ACTIVE'
+                    """,
+                    (approvable,),
+                )
+                cur.execute(
+                    """
+                    UPDATE math_pending_registrations
+                    SET status = 'APPROVED'
+                    WHERE id = ANY(%s)
+                    """,
+                    (approvable,),
+                )
             conn.commit()
-            return True
+
+        outcomes = []
+        for pid in ids:
+            if pid not in found:
+                status = "not_found"
+            elif found[pid] is None:
+                status = "no_user"
+            else:
+                status = "approved"
+            outcomes.append({"pending_id": pid, "status": status, "user_id": found.get(pid)})
+        return outcomes
     finally:
         if conn:
             conn.close()
@@ -203,21 +224,32 @@ def add_students_to_class(class_id: int, user_ids: List[int]) -> None:
     try:
         conn = get_db_connection()
         with conn.cursor() as cur:
-            for uid in user_ids:
-                cur.execute(
-                    """
-                    INSERT INTO math_class_students (class_id, user_id)
-                    VALUES (%s, %s)
-                    ON CONFLICT DO NOTHING
-                    """,
-                    (class_id, int(uid)),
-                )
+            add_links(cur, "math_class_students", cross([class_id], user_ids))
             conn.commit()
     finally:
         if conn:
             conn.close()
 
 
+def sync_class_students(class_id: int, user_ids: List[int]) -> Dict[str, int]:
+    """
+    Make the class roster exactly `user_ids` (adds missing, removes extra)
+    in one statement. Returns {"added", "removed", "kept"}.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            counts = sync_links(
+                cur, "math_class_students", cross([class_id], user_ids), "class_id", [class_id]
+            )
+            conn.commit()
+            return counts
+    finally:
+        if conn:
+            conn.close()
+
+
 def set_class_defaults(
     class_id: int,
     default_course_id: Optional[int],
@@ -323,19 +355,69 @@ def auto_assign_course_for_class(class_id: int) -> None:
                 return
             default_course_id = int(d[0])
 
-            cur.execute("SELECT user_id FROM math_class_students WHERE class_id = %s", (class_id,))
-            uids = [int(r[0]) for r in cur.fetchall()]
+            cur.execute(
+                """
+                INSERT INTO math_enrollments (user_id, course_id)
+                SELECT user_id, %s
+                FROM math_class_students
+                WHERE class_id = %s
+                ON CONFLICT DO NOTHING
+                """,
+                (default_course_id, class_id),
+            )
+            conn.commit()
+    finally:
+        if conn:
+            conn.close()
 
-            for uid in uids:
-                cur.execute(
-                    """
-                    INSERT INTO math_enrollments (user_id, course_id)
-                    VALUES (%s, %s)
-                    ON CONFLICT DO NOTHING
-                    """,
-                    (uid, default_course_id),
-                )
+
+def bulk_enroll_math(user_ids: List[int], course_ids: List[int], mode: str = "add") -> Dict[str, int]:
+    """
+    Students x courses in one statement.
+    mode: add | remove | sync (students end up in exactly `course_ids`).
+    Returns {"added", "removed", "kept"}.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            counts = apply_links(
+                cur,
+                "math_enrollments",
+                cross(user_ids, course_ids),
+                mode=mode,
+                scope_column="user_id",
+                scope_ids=user_ids,
+            )
+            conn.commit()
+            return counts
+    finally:
+        if conn:
+            conn.close()
+
+
+def enroll_class_in_courses(class_id: int, course_ids: List[int]) -> int:
+    """Enroll every current member of a class in every course; returns new enrollments."""
+    if not course_ids:
+        return 0
+    conn = None
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO math_enrollments (user_id, course_id)
+                SELECT cs.user_id, c.course_id
+                FROM math_class_students cs
+                CROSS JOIN UNNEST(%s::INTEGER[]) AS c(course_id)
+                WHERE cs.class_id = %s
+                ON CONFLICT DO NOTHING
+                """,
+                ([int(c) for c in course_ids], class_id),
+            )
+            added = max(cur.rowcount or 0, 0)
             conn.commit()
+            return added
     finally:
         if conn:
             conn.close()
@@ -1,5 +1,7 @@
-from typing import List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from math_app.db import get_db_connection
+from math_app.repository.math_attempt_repo import Answer, insert_attempts_with_cursor
+from shared import attempt_events
 from datetime import datetime
 
 
@@ -20,6 +22,88 @@ def get_random_test_questions(limit: int = 50) -> List[int]:
     return [r[0] for r in rows]
 
 
+def _test_question_from_row(row) -> Dict[str, Any]:
+    qid, question_text, options_json, correct_option = row
+    options_json = options_json or {}
+    return {
+        "id": qid,
+        "question_text": question_text,
+        "option_a": options_json.get("a", ""),
+        "option_b": options_json.get("b", ""),
+        "option_c": options_json.get("c", ""),
+        "option_d": options_json.get("d", ""),
+        "correct_option": (correct_option or "").upper(),
+    }
+
+
+def get_random_test_paper(limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Random active questions with text, options and answer, in one query.
+    The test runner keeps these in session and never re-reads them.
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, question_text, options_json, correct_option
+                FROM math_question_bank
+                WHERE is_active = true
+                ORDER BY RANDOM()
+                LIMIT %s;
+                """,
+                (limit,),
+            )
+            rows = cur.fetchall()
+    return [_test_question_from_row(r) for r in rows]
+
+
+def load_question_pools() -> Dict[Tuple[str, str], List[int]]:
+    """
+    Active question ids of the latest bank version, grouped by
+    (topic, difficulty). Missing topic / difficulty become "".
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, COALESCE(topic, ''), COALESCE(difficulty, '')
+                FROM (
+                    SELECT DISTINCT ON (question_code)
+                        id, topic, difficulty, is_active
+                    FROM math_question_bank
+                    ORDER BY question_code, version DESC
+                ) latest
+                WHERE is_active = true
+                ORDER BY id;
+                """
+            )
+            rows = cur.fetchall()
+
+    pools: Dict[Tuple[str, str], List[int]] = {}
+    for qid, topic, difficulty in rows:
+        pools.setdefault((topic.strip(), difficulty.strip()), []).append(int(qid))
+    return pools
+
+
+def get_test_questions_by_ids(question_ids: List[int]) -> List[Dict[str, Any]]:
+    """Questions for an assembled paper in one query, in paper order."""
+    if not question_ids:
+        return []
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, question_text, options_json, correct_option
+                FROM math_question_bank
+                WHERE id = ANY(%s);
+                """,
+                (list(question_ids),),
+            )
+            rows = cur.fetchall()
+    by_id = {r[0]: _test_question_from_row(r) for r in rows}
+    return [by_id[qid] for qid in question_ids if qid in by_id]
+
+
 def create_test_session(total_questions: int) -> int:
     with get_db_connection() as conn:
         with conn.cursor() as cur:
@@ -47,3 +131,28 @@ def end_test_session(session_id: int, correct_count: int):
                 """,
                 (datetime.utcnow(), correct_count, session_id),
             )
+
+
+def complete_test_session(
+    session_id: int,
+    pending_answers: Iterable[Answer],
+    correct_count: int,
+    user_id: Optional[int] = None,
+):
+    """
+    Persist the answers not yet checkpointed and close the session,
+    in one transaction.
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            events = insert_attempts_with_cursor(cur, session_id, pending_answers, user_id)
+            cur.execute(
+                """
+                UPDATE math_sessions
+                SET ended_at = %s,
+                    correct_count = %s
+                WHERE id = %s;
+                """,
+                (datetime.utcnow(), correct_count, session_id),
+            )
+    attempt_events.dispatch_committed(events)
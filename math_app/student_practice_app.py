@@ -1,3 +1,7 @@
+from shared.render_profiler import profile_rerun
+
+
+@profile_rerun("math_practice")
 def render_practice_mode(show_back_button=True):
     import streamlit as st
     import streamlit.components.v1 as components
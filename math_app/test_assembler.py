@@ -0,0 +1,152 @@
+"""
+Blueprint-based maths test assembly.
+
+Question ids of the latest active bank are grouped into per-(topic,
+difficulty) pools, loaded once and cached per process. A paper is drawn
+from the pools in memory according to a blueprint:
+
+    {("Fractions", "easy"): 6, ("Geometry", None): 8, ...}
+
+None matches any topic / difficulty. Cells that cannot be filled are
+topped up from the rest of the bank. The nine "Practice Paper" slots are
+seeded, so a slot gives the same paper until the bank changes.
+
+Pools are also dropped when any app process publishes a maths bank,
+course or lesson change on shared.cache_bus.
+
+Env:
+    MATH_POOL_TTL_SECONDS   how long pools are cached (default 300)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from math_app.repository.math_test_repo import load_question_pools
+from shared import cache_bus
+
+PAPER_SIZE = 50
+PRACTICE_PAPER_SLOTS = 9
+POOL_TTL_SECONDS = float(os.getenv("MATH_POOL_TTL_SECONDS", "300"))
+
+# cache_bus topics that may change the pooled bank ("*": listener reconnected)
+POOL_TOPICS = frozenset({"math_question_bank", "math_course", "math_lesson", "*"})
+
+PoolKey = Tuple[str, str]
+BlueprintKey = Tuple[Optional[str], Optional[str]]
+
+_lock = threading.Lock()
+_pools: Optional[Dict[PoolKey, Tuple[int, ...]]] = None
+_fingerprint = ""
+_loaded_at = 0.0
+
+
+# ------------------------------------------------------------
+# POOLS
+# ------------------------------------------------------------
+
+def get_question_pools(force: bool = False) -> Dict[PoolKey, Tuple[int, ...]]:
+    global _pools, _fingerprint, _loaded_at
+    with _lock:
+        if force or _pools is None or time.monotonic() - _loaded_at > POOL_TTL_SECONDS:
+            loaded = {key: tuple(ids) for key, ids in load_question_pools().items()}
+            _pools = loaded
+            _fingerprint = hashlib.sha1(repr(sorted(loaded.items())).encode("utf-8")).hexdigest()[:12]
+            _loaded_at = time.monotonic()
+        return _pools
+
+
+def pools_fingerprint() -> str:
+    """Changes whenever the pooled bank changes; part of every paper seed."""
+    get_question_pools()
+    return _fingerprint
+
+
+def invalidate_question_pools() -> None:
+    """Call after a question bank upload."""
+    global _pools
+    with _lock:
+        _pools = None
+
+
+@cache_bus.subscribe
+def _on_cache_invalidation(topic: str, key) -> None:
+    if topic in POOL_TOPICS:
+        invalidate_question_pools()
+
+
+# ------------------------------------------------------------
+# ASSEMBLY
+# ------------------------------------------------------------
+
+def proportional_blueprint(
+    pools: Dict[PoolKey, Tuple[int, ...]],
+    total: int = PAPER_SIZE,
+) -> Dict[BlueprintKey, int]:
+    """Default blueprint: `total` questions split across pools by pool size (largest remainder)."""
+    size = sum(len(ids) for ids in pools.values())
+    if not size:
+        return {}
+    total = min(total, size)
+    quotas = {key: total * len(ids) / size for key, ids in pools.items()}
+    counts = {key: int(q) for key, q in quotas.items()}
+    leftover = total - sum(counts.values())
+    for key in sorted(quotas, key=lambda k: (counts[k] - quotas[k], k))[:leftover]:
+        counts[key] += 1
+    return {key: n for key, n in counts.items() if n}
+
+
+def _matches(key: PoolKey, pattern: BlueprintKey) -> bool:
+    topic, difficulty = pattern
+    return (topic is None or key[0] == topic) and (difficulty is None or key[1] == difficulty)
+
+
+def assemble_paper(
+    blueprint: Optional[Dict[BlueprintKey, int]] = None,
+    seed: Optional[str] = None,
+    total: int = PAPER_SIZE,
+) -> List[int]:
+    """
+    Question ids for one paper, in paper order. Same blueprint + seed +
+    bank gives the same paper.
+    """
+    pools = get_question_pools()
+    if blueprint is None:
+        blueprint = proportional_blueprint(pools, total)
+
+    rng = random.Random(seed)
+    chosen: List[int] = []
+    used = set()
+    shortfall = 0
+
+    for pattern, count in sorted(blueprint.items(), key=lambda kv: (str(kv[0][0]), str(kv[0][1]))):
+        candidates = [
+            qid
+            for key in sorted(pools)
+            if _matches(key, pattern)
+            for qid in pools[key]
+            if qid not in used
+        ]
+        picked = rng.sample(candidates, min(count, len(candidates)))
+        shortfall += count - len(picked)
+        chosen.extend(picked)
+        used.update(picked)
+
+    if shortfall:
+        rest = [qid for key in sorted(pools) for qid in pools[key] if qid not in used]
+        chosen.extend(rng.sample(rest, min(shortfall, len(rest))))
+
+    rng.shuffle(chosen)
+    return chosen
+
+
+def practice_paper(slot: int, blueprint: Optional[Dict[BlueprintKey, int]] = None) -> List[int]:
+    """Reproducible paper for "Practice Paper <slot>" (1..PRACTICE_PAPER_SLOTS)."""
+    if not 1 <= slot <= PRACTICE_PAPER_SLOTS:
+        raise ValueError(f"Practice paper slot must be 1..{PRACTICE_PAPER_SLOTS}")
+    return assemble_paper(blueprint, seed=f"{pools_fingerprint()}:practice-paper:{slot}")
@@ -1,18 +1,22 @@
 from datetime import datetime, timedelta
 
 import streamlit as st
-from passlib.hash import bcrypt
 
 from math_app.db import get_db_connection, init_math_practice_progress_table, init_math_tables
 from math_app.repository.math_test_repo import (
-    get_random_test_questions,
+    get_random_test_paper,
+    get_test_questions_by_ids,
+    complete_test_session,
     create_test_session,
-    end_test_session,
 )
+from math_app.test_assembler import PAPER_SIZE, PRACTICE_PAPER_SLOTS, practice_paper
 from math_app.repository.math_question_bank_repo import export_latest_question_bank_df
 from math_app.repository.math_registration_repo import create_math_registration
-from math_app.repository.math_attempt_repo import record_attempt
+from math_app.repository.math_attempt_repo import record_attempts_bulk
 from math_app.student_practice_app import render_practice_mode
+from shared import cache_bus
+from shared.password_hashing import RateLimited, hash_password, verify_password
+from shared.render_profiler import profiled_rerun
 
 DEFAULT_PASSWORD = "Learn1234!"
 MODE_HOME = "HOME"
@@ -21,8 +25,14 @@ MODE_TEST = "TEST"
 MODE_TEST_RUNNER = "TEST_RUNNER"
 MODE_TEST_RESULT = "TEST_RESULT"
 
+# Test answers are graded in memory and written in batches; a crash loses
+# at most this many answers / this much time.
+TEST_CHECKPOINT_EVERY = 5
+TEST_CHECKPOINT_SECONDS = 60
+
 init_math_tables()
 init_math_practice_progress_table()
+cache_bus.start_listener()
 
 st.set_page_config(
     page_title="WordSprint Maths",
@@ -63,6 +73,7 @@ def is_active_math_user(email: str) -> bool:
 
 
 def authenticate_student(email: str, password: str):
+    """Student dict on success, None otherwise; raises RateLimited after too many failures."""
     conn = None
     try:
         conn = get_db_connection()
@@ -80,7 +91,7 @@ def authenticate_student(email: str, password: str):
             if not row:
                 return None
             user_id, name, password_hash = row
-            if not bcrypt.verify(password, password_hash or ""):
+            if not verify_password(password, password_hash, email=email):
                 return None
             return {"user_id": user_id, "name": name}
     finally:
@@ -129,7 +140,11 @@ def render_home():
             submitted = st.form_submit_button("Login")
 
             if submitted:
-                user = authenticate_student(email, password)
+                try:
+                    user = authenticate_student(email, password)
+                except RateLimited:
+                    st.error("Too many failed attempts. Please wait a few minutes and try again.")
+                    return
                 if not user:
                     st.error("Invalid email or password.")
                     return
@@ -153,7 +168,7 @@ def render_home():
             if not name or not email:
                 st.error("Please enter both name and email.")
             else:
-                pw_hash = bcrypt.hash(DEFAULT_PASSWORD)
+                pw_hash = hash_password(DEFAULT_PASSWORD)
                 create_math_registration(name, email, pw_hash)
                 st.session_state["math_registration_submitted"] = True
                 st.rerun()
@@ -182,14 +197,14 @@ def render_test_home():
     st.markdown("## 📝 Test Papers")
     st.caption("50 questions · 55 minutes · No hints")
 
-    papers = [f"Practice Paper {i}" for i in range(1, 10)]
+    papers = [f"Practice Paper {i}" for i in range(1, PRACTICE_PAPER_SLOTS + 1)]
 
     for idx, name in enumerate(papers, start=1):
         with st.container(border=True):
             st.markdown(f"**{name}**")
             st.caption("50 questions · 55 minutes")
             if st.button(f"Start {name}", key=f"start_test_{idx}", use_container_width=True):
-                start_test()
+                start_test(idx)
                 st.rerun()
 
     if st.button("⬅ Back to Home", use_container_width=True):
@@ -197,49 +212,33 @@ def render_test_home():
         st.rerun()
 
 
-def start_test():
-    session_id = create_test_session(50)
-    question_ids = get_random_test_questions(50)
+def start_test(paper_slot: int):
+    question_ids = practice_paper(paper_slot)
+    if question_ids:
+        questions = get_test_questions_by_ids(question_ids)
+    else:
+        questions = get_random_test_paper(PAPER_SIZE)
+    session_id = create_test_session(len(questions))
 
     st.session_state["test"] = {
         "session_id": session_id,
-        "question_ids": question_ids,
+        "paper_slot": paper_slot,
+        "question_ids": [q["id"] for q in questions],
+        # id -> question, served from memory for every render and grading step
+        "questions": {q["id"]: q for q in questions},
         "index": 0,
         "start_time": datetime.utcnow(),
         "answers": {},
         "correct": 0,
+        # (question_id, selected, is_correct) not yet written to math_attempts
+        "pending": [],
+        "last_checkpoint": datetime.utcnow(),
     }
     st.session_state["mode"] = MODE_TEST_RUNNER
 
 
-def _fetch_question_row(question_id: int):
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id, question_text, options_json, correct_option
-                FROM math_question_bank
-                WHERE id = %s
-                LIMIT 1;
-                """,
-                (question_id,),
-            )
-            row = cur.fetchone()
-
-    if not row:
-        return None
-
-    qid, question_text, options_json, correct_option = row
-    options_json = options_json or {}
-    return {
-        "id": qid,
-        "question_text": question_text,
-        "option_a": options_json.get("a", ""),
-        "option_b": options_json.get("b", ""),
-        "option_c": options_json.get("c", ""),
-        "option_d": options_json.get("d", ""),
-        "correct_option": (correct_option or "").upper(),
-    }
+def _test_question(question_id: int):
+    return st.session_state["test"].get("questions", {}).get(question_id)
 
 
 def render_test_runner():
@@ -264,12 +263,14 @@ def render_test_runner():
         st.rerun()
         return
 
+    _checkpoint_test(test)
+
     mins, secs = divmod(int(remaining.total_seconds()), 60)
     st.markdown(f"### ⏱ Time left: {mins:02d}:{secs:02d}")
 
     q_idx = test["index"]
     qid = test["question_ids"][q_idx]
-    row = _fetch_question_row(qid)
+    row = _test_question(qid)
 
     if row is None:
         st.error("Unable to load this question.")
@@ -303,27 +304,51 @@ def render_test_runner():
 
 def submit_test_answer(question_id: int, selected: str):
     test = st.session_state["test"]
-    row = _fetch_question_row(question_id)
+    row = _test_question(question_id)
     if row is None:
         return
 
     correct_opt = row["correct_option"]
     is_correct = selected == correct_opt
 
-    record_attempt(
-        session_id=test["session_id"],
-        question_id=question_id,
-        selected_option=selected,
-        is_correct=is_correct,
-    )
+    test["answers"][question_id] = selected
+    test.setdefault("pending", []).append((question_id, selected, is_correct))
 
     if is_correct:
         test["correct"] += 1
 
+    _checkpoint_test(test)
+
+
+def _checkpoint_test(test, force: bool = False):
+    pending = test.get("pending") or []
+    if not pending:
+        return
+    due = (
+        force
+        or len(pending) >= TEST_CHECKPOINT_EVERY
+        or datetime.utcnow() - test.get("last_checkpoint", test["start_time"])
+        >= timedelta(seconds=TEST_CHECKPOINT_SECONDS)
+    )
+    if not due:
+        return
+    try:
+        record_attempts_bulk(test["session_id"], pending, st.session_state.get("student_id"))
+    except Exception:
+        # keep the buffer; finish_test (or the next checkpoint) retries
+        return
+    test["pending"] = []
+    test["last_checkpoint"] = datetime.utcnow()
+
 
 def finish_test():
     test = st.session_state["test"]
-    end_test_session(test["session_id"], test["correct"])
+    complete_test_session(
+        test["session_id"],
+        test.get("pending") or [],
+        test["correct"],
+        st.session_state.get("student_id"),
+    )
     st.session_state["test_result"] = {
         "score": test["correct"],
         "total": len(test["question_ids"]),
@@ -351,7 +376,11 @@ def render_test_result():
 # ------------------------------------------------------------
 def main():
     mode = st.session_state.get("mode", MODE_HOME)
+    with profiled_rerun(f"math_student:{mode}"):
+        _route(mode)
+
 
+def _route(mode: str):
     if mode == MODE_HOME:
         render_home()
         return
@@ -0,0 +1,394 @@
+"""
+Columnar analytics snapshot of the synonym (legacy) data for teacher
+reporting.
+
+`refresh` copies tables from Postgres into compressed columnar files
+under ANALYTICS_SNAPSHOT_DIR (see shared.columnar), incrementally where
+it can:
+
+    attempts      append, high-water mark = max id (rows younger than
+                  SNAPSHOT_LAG_SECONDS are left for the next run, so
+                  late-committing transactions are not skipped)
+    word_stats    upsert, high-water mark = max last_seen (re-read with
+                  the same lag as overlap, de-duplicated by key on read)
+    enrollments, courses, lessons, lesson_words, words
+                  small; replaced on every run
+
+High-water marks and per-dataset refresh times live in <dir>/_state.json. Segments are compacted into
+one file once a dataset has more than SNAPSHOT_MAX_SEGMENTS.
+
+The query layer below (load + report helpers) reads only the files;
+is_fresh() tells pages whether to use it or fall back to live SQL.
+
+Usage:
+    python -m shared.analytics_snapshot refresh
+    python -m shared.analytics_snapshot refresh --full
+    python -m shared.analytics_snapshot status
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import glob
+import json
+import os
+import shutil
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+
+from shared.columnar import read_columnar, write_columnar, write_frame
+
+SNAPSHOT_DIR = os.getenv("ANALYTICS_SNAPSHOT_DIR", os.path.join("archive", "analytics"))
+MAX_AGE_MINUTES = float(os.getenv("ANALYTICS_SNAPSHOT_MAX_AGE_MINUTES", "60"))
+SNAPSHOT_LAG_SECONDS = 60
+SEGMENT_ROWS = 200_000
+SNAPSHOT_MAX_SEGMENTS = 20
+
+# dataset -> how it is extracted
+DATASETS: Dict[str, Dict[str, Any]] = {
+    "attempts": {
+        "mode": "append",
+        "key": ("id",),
+        "hwm": "id",
+        "full_sql": "SELECT * FROM attempts WHERE (ts IS NULL OR ts < now() - make_interval(secs => :lag)) ORDER BY id",
+        "incremental_sql": (
+            "SELECT * FROM attempts WHERE id > :hwm "
+            "AND (ts IS NULL OR ts < now() - make_interval(secs => :lag)) ORDER BY id"
+        ),
+    },
+    "word_stats": {
+        "mode": "upsert",
+        "key": ("user_id", "headword"),
+        "hwm": "last_seen",
+        "full_sql": "SELECT * FROM word_stats ORDER BY last_seen NULLS FIRST",
+        "incremental_sql": (
+            "SELECT * FROM word_stats "
+            "WHERE last_seen > CAST(:hwm AS TIMESTAMPTZ) - make_interval(secs => :lag) ORDER BY last_seen"
+        ),
+    },
+    "enrollments": {"mode": "replace", "full_sql": "SELECT user_id, course_id FROM enrollments"},
+    "courses": {"mode": "replace", "full_sql": "SELECT course_id, title FROM courses"},
+    "lessons": {
+        "mode": "replace",
+        "full_sql": "SELECT lesson_id, course_id, title, COALESCE(sort_order, 0) AS sort_order FROM lessons",
+    },
+    "lesson_words": {"mode": "replace", "full_sql": "SELECT lesson_id, word_id, sort_order FROM lesson_words"},
+    "words": {"mode": "replace", "full_sql": "SELECT word_id, headword, headword_id, difficulty FROM words"},
+}
+
+_lock = threading.Lock()
+_frames: Dict[str, Tuple[tuple, pd.DataFrame]] = {}
+
+
+# ------------------------------------------------------------
+# STATE
+# ------------------------------------------------------------
+
+def _state_path(base: str) -> str:
+    return os.path.join(base, "_state.json")
+
+
+def read_state(base: str = SNAPSHOT_DIR) -> Dict[str, Any]:
+    try:
+        with open(_state_path(base), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_state(base: str, state: Dict[str, Any]) -> None:
+    os.makedirs(base, exist_ok=True)
+    tmp = _state_path(base) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(state, fh, indent=2, default=str)
+    os.replace(tmp, _state_path(base))
+
+
+def _segments(base: str, dataset: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(base, dataset, "seg-*.npz")))
+
+
+# ------------------------------------------------------------
+# REFRESH
+# ------------------------------------------------------------
+
+def _compact(base: str, dataset: str, run: int) -> None:
+    old = _segments(base, dataset)
+    if len(old) <= SNAPSHOT_MAX_SEGMENTS:
+        return
+    df = _read_dataset(base, dataset)
+    write_frame(os.path.join(base, dataset, f"seg-{run:06d}-0000.npz"), df, {"dataset": dataset, "compacted": len(old)})
+    for path in old:
+        os.remove(path)
+
+
+def _refresh_dataset(conn, base: str, dataset: str, state: Dict[str, Any], run: int) -> int:
+    spec = DATASETS[dataset]
+    folder = os.path.join(base, dataset)
+    entry = state.setdefault("datasets", {}).setdefault(dataset, {})
+    hwm = entry.get("hwm")
+
+    if spec["mode"] == "replace" or hwm is None:
+        sql, params = spec["full_sql"], {"lag": SNAPSHOT_LAG_SECONDS}
+        if spec["mode"] != "replace":
+            shutil.rmtree(folder, ignore_errors=True)
+    else:
+        _compact(base, dataset, run)
+        sql, params = spec["incremental_sql"], {"hwm": hwm, "lag": SNAPSHOT_LAG_SECONDS}
+
+    result = conn.execution_options(stream_results=True).execute(text(sql), params)
+    columns = list(result.keys())
+    meta = {"dataset": dataset, "run": run}
+    rows_total = 0
+
+    if spec["mode"] == "replace":
+        rows = result.fetchall()
+        rows_total = write_columnar(os.path.join(folder, "full.npz"), columns, rows, meta)
+    else:
+        hwm_idx = columns.index(spec["hwm"])
+        top = None
+        for n, part in enumerate(result.partitions(SEGMENT_ROWS), start=1):
+            rows_total += write_columnar(os.path.join(folder, f"seg-{run:06d}-{n:04d}.npz"), columns, part, meta)
+            values = [r[hwm_idx] for r in part if r[hwm_idx] is not None]
+            if values:
+                top = max(values) if top is None else max(top, max(values))
+        if top is not None:  # no new rows: keep the previous mark
+            entry["hwm"] = top.isoformat() if isinstance(top, dt.datetime) else top
+
+    entry["rows_last_run"] = rows_total
+    entry["refreshed_at"] = dt.datetime.now(dt.timezone.utc).isoformat()
+    return rows_total
+
+
+def refresh(full: bool = False, base: str = SNAPSHOT_DIR, datasets: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Bring the snapshot up to date; returns rows extracted per dataset."""
+    from shared.db import engine
+
+    state = {} if full else read_state(base)
+    if full:
+        shutil.rmtree(base, ignore_errors=True)
+    run = int(state.get("run", 0)) + 1
+    state["run"] = run
+
+    done: Dict[str, int] = {}
+    with engine.connect() as conn:
+        for dataset in datasets or DATASETS:
+            done[dataset] = _refresh_dataset(conn, base, dataset, state, run)
+            _write_state(base, state)
+
+    # a --dataset subset leaves the others as old as they were
+    if set(DATASETS) <= set(done):
+        state["refreshed_at"] = dt.datetime.now(dt.timezone.utc).isoformat()
+        _write_state(base, state)
+    return done
+
+
+# ------------------------------------------------------------
+# QUERY LAYER
+# ------------------------------------------------------------
+
+def _files(base: str, dataset: str) -> List[str]:
+    full = os.path.join(base, dataset, "full.npz")
+    return [full] if os.path.exists(full) else _segments(base, dataset)
+
+
+def _read_dataset(
+    base: str,
+    dataset: str,
+    columns: Optional[List[str]] = None,
+    user_ids: Optional[Iterable[Any]] = None,
+) -> pd.DataFrame:
+    """
+    Dataset from its files; with `columns` only those (plus the key) are
+    decoded, with `user_ids` each file is cut down before concatenating.
+    """
+    key = list(DATASETS[dataset].get("key") or ())
+    wanted = None if columns is None else list(dict.fromkeys(list(columns) + key))
+    if user_ids is not None:
+        user_ids = {int(u) for u in user_ids if u is not None}
+    frames = []
+    for path in _files(base, dataset):
+        frame = read_columnar(path, wanted)
+        frames.append(frame if user_ids is None else _for_users(frame, user_ids))
+    frames = [f for f in frames if len(f)] or frames[:1]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if key and len(frames) > 1:
+        df = df.drop_duplicates(subset=key, keep="last").reset_index(drop=True)
+    return df if columns is None else df[list(columns)]
+
+
+def load(dataset: str, base: str = SNAPSHOT_DIR) -> pd.DataFrame:
+    """Whole dataset as a DataFrame; cached per process until its files change."""
+    files = _files(base, dataset)
+    signature = tuple((f, os.path.getmtime(f)) for f in files)
+    with _lock:
+        cached = _frames.get(dataset)
+        if cached and cached[0] == signature:
+            return cached[1]
+    df = _read_dataset(base, dataset)
+    with _lock:
+        _frames[dataset] = (signature, df)
+    return df
+
+
+def refreshed_at(base: str = SNAPSHOT_DIR) -> Optional[dt.datetime]:
+    """When the stalest dataset was last refreshed; None if any never was."""
+    entries = read_state(base).get("datasets", {})
+    stamps = [entries.get(dataset, {}).get("refreshed_at") for dataset in DATASETS]
+    if not all(stamps):
+        return None
+    return min(dt.datetime.fromisoformat(value) for value in stamps)
+
+
+def is_fresh(max_age_minutes: float = MAX_AGE_MINUTES, base: str = SNAPSHOT_DIR) -> bool:
+    """True when a complete snapshot exists and is younger than `max_age_minutes`."""
+    at = refreshed_at(base)
+    if at is None:
+        return False
+    return dt.datetime.now(dt.timezone.utc) - at <= dt.timedelta(minutes=max_age_minutes)
+
+
+def _for_users(df: pd.DataFrame, user_ids: Iterable[Any]) -> pd.DataFrame:
+    uids = {int(u) for u in user_ids if u is not None}
+    if df.empty:
+        return df
+    return df[df["user_id"].isin(uids)]
+
+
+def attempt_totals(user_ids: Iterable[Any]) -> pd.DataFrame:
+    """Per user / course / lesson: total_attempts, correct_attempts, total_time_ms."""
+    cols = ["user_id", "course_id", "lesson_id", "total_attempts", "correct_attempts", "total_time_ms"]
+    # the full history is too big to cache whole: read just these students' rows of five columns
+    df = _read_dataset(
+        SNAPSHOT_DIR,
+        "attempts",
+        columns=["user_id", "course_id", "lesson_id", "is_correct", "response_ms"],
+        user_ids=user_ids,
+    )
+    if df.empty:
+        return pd.DataFrame(columns=cols)
+    df = df.assign(
+        correct=df["is_correct"].fillna(False).astype(int),
+        ms=df["response_ms"].fillna(0).astype("int64"),
+    )
+    out = (
+        df.groupby(["user_id", "course_id", "lesson_id"], dropna=False)
+        .agg(total_attempts=("correct", "size"), correct_attempts=("correct", "sum"), total_time_ms=("ms", "sum"))
+        .reset_index()
+    )
+    return out[cols]
+
+
+def enrollment_lessons(user_ids: Iterable[Any]) -> pd.DataFrame:
+    """Enrolled courses with their lessons (lesson columns empty for courses without lessons)."""
+    cols = ["user_id", "course_id", "course_title", "lesson_id", "lesson_title", "lesson_order"]
+    enroll = _for_users(load("enrollments"), user_ids)
+    if enroll.empty:
+        return pd.DataFrame(columns=cols)
+    courses = load("courses").rename(columns={"title": "course_title"})
+    lessons = load("lessons").rename(columns={"title": "lesson_title", "sort_order": "lesson_order"})
+    df = enroll.merge(courses, on="course_id").merge(lessons, on="course_id", how="left")
+    df["lesson_order"] = df["lesson_order"].fillna(0)
+    return df.sort_values(["user_id", "course_title", "lesson_order", "lesson_id"])[cols].reset_index(drop=True)
+
+
+def lessons_for_courses(course_ids: Iterable[Any]) -> pd.DataFrame:
+    lessons = load("lessons")
+    if lessons.empty:
+        return pd.DataFrame(columns=["lesson_id", "course_id", "title", "sort_order"])
+    return lessons[lessons["course_id"].isin({int(c) for c in course_ids})].reset_index(drop=True)
+
+
+def lesson_word_counts(lesson_ids: Iterable[Any]) -> Dict[int, int]:
+    lw = load("lesson_words")
+    if lw.empty:
+        return {}
+    lw = lw[lw["lesson_id"].isin({int(l) for l in lesson_ids})]
+    return {int(k): int(v) for k, v in lw.groupby("lesson_id")["word_id"].nunique().items()}
+
+
+def lesson_mastery(user_ids: Iterable[Any], lesson_ids: Iterable[Any]) -> pd.DataFrame:
+    """Per user / lesson: mastered_words, attempted_words (word_stats joined on words.headword_id)."""
+    cols = ["user_id", "lesson_id", "mastered_words", "attempted_words"]
+    ws = _for_users(load("word_stats"), user_ids)
+    lw = load("lesson_words")
+    if ws.empty or lw.empty:
+        return pd.DataFrame(columns=cols)
+    lw = lw[lw["lesson_id"].isin({int(l) for l in lesson_ids})]
+    all_words = load("words")
+    # rows written before the word_id backfill (which leaves last_seen, our
+    # high-water mark, alone) still carry only the headword
+    headword_ids = all_words.dropna(subset=["headword_id"]).drop_duplicates("headword")
+    ws = ws.assign(
+        word_id=ws["word_id"].fillna(ws["headword"].map(headword_ids.set_index("headword")["headword_id"]))
+    )
+    words = all_words[["word_id", "headword_id"]].merge(lw, on="word_id")
+    df = ws.merge(words.drop(columns="word_id"), left_on="word_id", right_on="headword_id")
+    if df.empty:
+        return pd.DataFrame(columns=cols)
+    df = df.assign(
+        m=df["mastered"].fillna(False).astype(int),
+        a=(df["total_attempts"].fillna(0) > 0).astype(int),
+    )
+    out = df.groupby(["user_id", "lesson_id"]).agg(mastered_words=("m", "sum"), attempted_words=("a", "sum"))
+    return out.reset_index()[cols]
+
+
+def weak_words(user_ids: Iterable[Any], min_attempts: int = 3, limit: int = 20) -> pd.DataFrame:
+    """Headwords with the lowest accuracy across these students (at least `min_attempts` attempts)."""
+    cols = ["headword", "students", "total_attempts", "correct_attempts", "accuracy"]
+    ws = _for_users(load("word_stats"), user_ids)
+    if ws.empty:
+        return pd.DataFrame(columns=cols)
+    out = (
+        ws.groupby("headword")
+        .agg(
+            students=("user_id", "nunique"),
+            total_attempts=("total_attempts", "sum"),
+            correct_attempts=("correct_attempts", "sum"),
+        )
+        .reset_index()
+    )
+    out = out[out["total_attempts"] >= min_attempts]
+    out["accuracy"] = out["correct_attempts"] / out["total_attempts"]
+    return out.sort_values(["accuracy", "total_attempts"], ascending=[True, False]).head(limit)[cols]
+
+
+def summary_counts() -> Dict[str, int]:
+    return {
+        "courses": len(load("courses")),
+        "lessons": len(load("lessons")),
+        "words": len(load("words")),
+        "enrollments": len(load("enrollments")),
+    }
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Columnar analytics snapshot.")
+    p.add_argument("--dir", default=SNAPSHOT_DIR)
+    sub = p.add_subparsers(dest="command", required=True)
+    ref = sub.add_parser("refresh", help="Extract new rows since the last run")
+    ref.add_argument("--full", action="store_true", help="Discard the snapshot and extract everything")
+    ref.add_argument("--dataset", action="append", choices=list(DATASETS))
+    sub.add_parser("status", help="High-water marks and last run")
+    opts = p.parse_args(argv)
+
+    if opts.command == "refresh":
+        for dataset, rows in refresh(opts.full, opts.dir, opts.dataset).items():
+            print(f"{dataset}: {rows} rows")
+    else:
+        print(json.dumps(read_state(opts.dir), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Unified attempt event stream.
+
+Every answer, whatever the subject, is appended once to attempt_events
+(db/migrations/202610_unified_attempt_events.sql) with one compact shape:
+
+    subject, source, user_id, course_id, lesson_id, item_id / item_key,
+    is_correct, response_ms, answer, occurred_at
+
+Apps do not write their own attempt tables any more; they publish events
+and register consumers that fan the events out to the per-app rollups:
+
+    @attempt_events.on_write("spelling_lesson")
+    def _write_spelling_attempts(executor, events): ...   # same transaction
+
+    @attempt_events.on_commit("grammar_lesson")
+    def _refresh_stats(events): ...                        # after commit
+
+on_write consumers get the executor the event was written with (a
+SQLAlchemy Connection or a psycopg2 cursor, %s placeholders either way),
+so the event row and the app rows commit or fail together. on_commit
+consumers (stats that re-read the tables, cache invalidation) run once
+the transaction is committed; their errors are logged, not raised.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from shared.db import engine
+
+log = logging.getLogger(__name__)
+
+SUBJECTS: Dict[str, int] = {
+    "spelling": 1,
+    "maths": 2,
+    "grammar": 3,
+    "synonyms": 4,
+}
+
+# source -> (code, subject); one source per app write path
+SOURCES: Dict[str, tuple] = {
+    "spelling_lesson": (1, "spelling"),
+    "spelling_practice": (2, "spelling"),
+    "spelling_daily": (3, "spelling"),
+    "spelling_missing": (4, "spelling"),
+    "math_practice": (10, "maths"),
+    "math_test": (11, "maths"),
+    "grammar_lesson": (20, "grammar"),
+    "synonym_quiz": (30, "synonyms"),
+}
+
+
+class AttemptEvent(NamedTuple):
+    source: str
+    user_id: Optional[int]
+    is_correct: bool
+    item_id: Optional[int] = None
+    lesson_id: Optional[int] = None
+    course_id: Optional[int] = None
+    response_ms: Optional[int] = None
+    answer: Optional[str] = None
+    item_key: Optional[str] = None  # items without an integer id (synonym headwords)
+    extra: Optional[Dict[str, Any]] = None  # app-only fields, passed to consumers, not stored
+
+    @property
+    def subject(self) -> str:
+        return SOURCES[self.source][1]
+
+
+DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS attempt_events (
+        id           BIGSERIAL,
+        occurred_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+        subject      SMALLINT    NOT NULL,
+        source       SMALLINT    NOT NULL,
+        user_id      INTEGER,
+        course_id    INTEGER,
+        lesson_id    INTEGER,
+        item_id      INTEGER,
+        item_key     TEXT,
+        is_correct   BOOLEAN     NOT NULL,
+        response_ms  INTEGER,
+        answer       TEXT,
+        PRIMARY KEY (id, occurred_at)
+    ) PARTITION BY RANGE (occurred_at)
+    """,
+    "CREATE TABLE IF NOT EXISTS attempt_events_p_default PARTITION OF attempt_events DEFAULT",
+    "CREATE INDEX IF NOT EXISTS idx_attempt_events_user_time ON attempt_events (user_id, occurred_at)",
+    "CREATE INDEX IF NOT EXISTS idx_attempt_events_subject_time ON attempt_events (subject, occurred_at)",
+)
+
+WriteConsumer = Callable[[Any, List[AttemptEvent]], None]
+CommitConsumer = Callable[[List[AttemptEvent]], None]
+
+_write_consumers: Dict[str, List[WriteConsumer]] = defaultdict(list)
+_commit_consumers: Dict[str, List[CommitConsumer]] = defaultdict(list)
+_table_ready = False
+
+
+# ------------------------------------------------------------
+# CONSUMERS
+# ------------------------------------------------------------
+
+def _register(registry: Dict[str, list], sources: Iterable[str]):
+    sources = list(sources)
+    for source in sources:
+        if source not in SOURCES:
+            raise ValueError(f"Unknown attempt source: {source}")
+
+    def decorator(fn):
+        # Streamlit re-executes app scripts on every rerun, redefining their
+        # consumers; a redefinition replaces the earlier function instead of
+        # registering it twice.
+        name = (fn.__module__, fn.__qualname__)
+        for source in sources:
+            consumers = registry[source]
+            for i, existing in enumerate(consumers):
+                if (existing.__module__, existing.__qualname__) == name:
+                    consumers[i] = fn
+                    break
+            else:
+                consumers.append(fn)
+        return fn
+
+    return decorator
+
+
+def on_write(*sources: str):
+    """Register fn(executor, events) to run inside the writing transaction."""
+    return _register(_write_consumers, sources)
+
+
+def on_commit(*sources: str):
+    """Register fn(events) to run after the events are committed."""
+    return _register(_commit_consumers, sources)
+
+
+def _by_source(events: List[AttemptEvent]) -> Dict[str, List[AttemptEvent]]:
+    grouped: Dict[str, List[AttemptEvent]] = defaultdict(list)
+    for event in events:
+        grouped[event.source].append(event)
+    return grouped
+
+
+# ------------------------------------------------------------
+# WRITER
+# ------------------------------------------------------------
+
+def run(executor, sql: str, params: tuple):
+    """Execute on a SQLAlchemy Connection or a psycopg2 cursor (for consumers)."""
+    if hasattr(executor, "exec_driver_sql"):
+        return executor.exec_driver_sql(sql, params)
+    executor.execute(sql, params)
+    return executor
+
+
+def init_attempt_events_table() -> None:
+    """
+    Create attempt_events if missing (additive, safe to re-run). Monthly
+    partitions come from the migration / `shared.attempt_partitions ensure`;
+    until then rows land in the default partition.
+    """
+    global _table_ready
+    with engine.begin() as conn:
+        for stmt in DDL:
+            conn.exec_driver_sql(stmt)
+    _table_ready = True
+
+
+def _optional_int(value) -> Optional[int]:
+    return int(value) if value is not None else None
+
+
+def _append(executor, events: List[AttemptEvent]) -> List[int]:
+    result = run(
+        executor,
+        """
+        INSERT INTO attempt_events (
+            subject, source, user_id, course_id, lesson_id,
+            item_id, item_key, is_correct, response_ms, answer
+        )
+        SELECT * FROM UNNEST(
+            %s::SMALLINT[], %s::SMALLINT[], %s::INTEGER[], %s::INTEGER[], %s::INTEGER[],
+            %s::INTEGER[], %s::TEXT[], %s::BOOLEAN[], %s::INTEGER[], %s::TEXT[]
+        )
+        RETURNING id
+        """,
+        (
+            [SUBJECTS[e.subject] for e in events],
+            [SOURCES[e.source][0] for e in events],
+            [_optional_int(e.user_id) for e in events],
+            [_optional_int(e.course_id) for e in events],
+            [_optional_int(e.lesson_id) for e in events],
+            [_optional_int(e.item_id) for e in events],
+            [e.item_key for e in events],
+            [bool(e.is_correct) for e in events],
+            [_optional_int(e.response_ms) for e in events],
+            [e.answer for e in events],
+        ),
+    )
+    return [int(r[0]) for r in result.fetchall()]
+
+
+def _fan_out(executor, events: List[AttemptEvent]) -> None:
+    for source, batch in _by_source(events).items():
+        for consumer in _write_consumers[source]:
+            consumer(executor, batch)
+
+
+def dispatch_committed(events: Iterable[AttemptEvent]) -> None:
+    """
+    Run on_commit consumers. publish() does this itself when it owns the
+    transaction; callers passing their own executor call it after commit.
+    """
+    for source, batch in _by_source(list(events)).items():
+        for consumer in _commit_consumers[source]:
+            try:
+                consumer(batch)
+            except Exception:
+                # the attempts are committed; a failed rollup must not undo that
+                log.exception("on_commit consumer %s failed for %s", getattr(consumer, "__name__", consumer), source)
+
+
+def publish(events: Iterable[AttemptEvent], executor=None) -> List[int]:
+    """
+    Append events in one statement and fan them out; returns event ids.
+
+    Without `executor` the write runs in its own transaction and on_commit
+    consumers run afterwards. With one, the caller owns the transaction and
+    calls dispatch_committed() once it has committed.
+    """
+    events = list(events)
+    if not events:
+        return []
+    for event in events:
+        if event.source not in SOURCES:
+            raise ValueError(f"Unknown attempt source: {event.source}")
+
+    if not _table_ready:
+        init_attempt_events_table()
+
+    if executor is not None:
+        ids = _append(executor, events)
+        _fan_out(executor, events)
+        return ids
+
+    with engine.begin() as conn:
+        ids = _append(conn, events)
+        _fan_out(conn, events)
+    dispatch_committed(events)
+    return ids
@@ -0,0 +1,358 @@
+"""
+Monthly partitions of the attempt tables, and archival of cold months.
+
+The tables are converted by db/migrations/202610_partition_attempt_tables.sql
+(which also installs the attempt_month_partition() helper used here).
+
+    migrate   convert any attempt table that is not partitioned yet
+    ensure    create partitions for the next N months
+    list      partitions and archived months per table
+    archive   export months older than --keep-months to compressed
+              columnar files under ATTEMPT_ARCHIVE_DIR, then detach
+              them (and drop with --drop)
+    read      rows of one table for a date range, live + archived, as CSV
+
+Archive format: one .npz per partition (<dir>/<table>/<partition>.npz),
+see shared.columnar.
+read_attempts() merges archived months back in for historical reports;
+queries against the parent table only see attached months.
+
+Usage:
+    python -m shared.attempt_partitions ensure --months-ahead 3
+    python -m shared.attempt_partitions archive --keep-months 12
+    python -m shared.attempt_partitions read math_attempts --start 2024-01-01 --end 2024-07-01
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import os
+import re
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import text
+
+from shared.columnar import read_columnar, read_header, write_columnar
+from shared.db import engine
+
+# table -> candidate time columns, first existing one wins (same order as the migration)
+ATTEMPT_TABLES: Dict[str, Sequence[str]] = {
+    "attempts": ("ts", "taken_at", "created_at"),
+    "spelling_attempts": ("attempted_at", "created_at"),
+    "math_attempts": ("created_at", "attempted_on", "attempted_at"),
+    "math_practice_attempts": ("created_at",),
+    "grammar_attempts": ("attempted_on", "attempted_at", "created_at"),
+    "attempt_events": ("occurred_at",),
+}
+
+ARCHIVE_DIR = os.getenv("ATTEMPT_ARCHIVE_DIR", os.path.join("archive", "attempts"))
+MONTHS_AHEAD = 3
+KEEP_MONTHS = 12
+
+_MONTH_SUFFIX = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def _month_of(partition: str) -> Optional[dt.date]:
+    m = _MONTH_SUFFIX.search(partition)
+    return dt.date(int(m.group(1)), int(m.group(2)), 1) if m else None
+
+
+def add_months(month: dt.date, n: int) -> dt.date:
+    y, m = divmod(month.year * 12 + month.month - 1 + n, 12)
+    return dt.date(y, m + 1, 1)
+
+
+def _this_month() -> dt.date:
+    return dt.date.today().replace(day=1)
+
+
+# ------------------------------------------------------------
+# PARTITIONS
+# ------------------------------------------------------------
+
+def partition_column(conn, table: str) -> Optional[str]:
+    """Partition key column of `table`, or None if it is not partitioned (or missing)."""
+    row = conn.execute(
+        text(
+            """
+            SELECT pg_get_partkeydef(p.partrelid)
+            FROM pg_partitioned_table p
+            WHERE p.partrelid = to_regclass(:t)
+            """
+        ),
+        {"t": table},
+    ).fetchone()
+    if not row:
+        return None
+    m = re.search(r"\((.*)\)", row[0])
+    return m.group(1).strip('"') if m else None
+
+
+def list_partitions(conn, table: str) -> List[Dict[str, Any]]:
+    """Attached partitions of `table`: name, month (None for the default) and estimated rows."""
+    rows = conn.execute(
+        text(
+            """
+            SELECT c.relname, c.reltuples::BIGINT
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(:t)
+            ORDER BY c.relname
+            """
+        ),
+        {"t": table},
+    ).fetchall()
+    return [{"partition": r[0], "month": _month_of(r[0]), "rows_estimate": max(int(r[1]), 0)} for r in rows]
+
+
+def migrate(months_ahead: int = MONTHS_AHEAD) -> List[str]:
+    """Run partition_attempt_table() for every attempt table (no-op for converted ones)."""
+    out = []
+    with engine.begin() as conn:
+        for table, columns in ATTEMPT_TABLES.items():
+            out.append(
+                conn.execute(
+                    text("SELECT partition_attempt_table(:t, :cols, :ahead)"),
+                    {"t": table, "cols": list(columns), "ahead": months_ahead},
+                ).scalar()
+            )
+    return out
+
+
+def ensure_partitions(months_ahead: int = MONTHS_AHEAD) -> Dict[str, List[str]]:
+    """Make sure this month and the next `months_ahead` have a partition on every partitioned table."""
+    months = [add_months(_this_month(), n) for n in range(months_ahead + 1)]
+    created: Dict[str, List[str]] = {}
+    with engine.begin() as conn:
+        for table in ATTEMPT_TABLES:
+            if partition_column(conn, table) is None:
+                continue
+            existing = {p["partition"] for p in list_partitions(conn, table)}
+            for month in months:
+                name = conn.execute(
+                    text("SELECT attempt_month_partition(:t, :m)"), {"t": table, "m": month}
+                ).scalar()
+                if name not in existing:
+                    created.setdefault(table, []).append(name)
+    return created
+
+
+# ------------------------------------------------------------
+# ARCHIVE
+# ------------------------------------------------------------
+
+def archive_path(table: str, partition: str, archive_dir: str = ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, table, f"{partition}.npz")
+
+
+def archived_months(table: str, archive_dir: str = ARCHIVE_DIR) -> Dict[dt.date, str]:
+    """month -> archive file for `table`."""
+    folder = os.path.join(archive_dir, table)
+    if not os.path.isdir(folder):
+        return {}
+    out = {}
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".npz"):
+            month = _month_of(name[: -len(".npz")])
+            if month is not None:
+                out[month] = os.path.join(folder, name)
+    return out
+
+
+def archive_partition(table: str, partition: str, drop: bool = False, archive_dir: str = ARCHIVE_DIR) -> int:
+    """
+    Export one monthly partition, check the file reads back with the same
+    row count, then detach it (and drop it with `drop`). Returns rows archived.
+    """
+    path = archive_path(table, partition, archive_dir)
+    with engine.begin() as conn:
+        conn.execute(text(f'LOCK TABLE "{partition}" IN SHARE MODE'))
+        result = conn.execute(text(f'SELECT * FROM "{partition}"'))
+        columns = list(result.keys())
+        rows = result.fetchall()
+        written = write_columnar(
+            path,
+            columns,
+            rows,
+            {
+                "table": table,
+                "partition": partition,
+                "month": _month_of(partition),
+                "time_column": partition_column(conn, table),
+                "archived_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+            },
+        )
+        if read_header(path)["rows"] != written or len(read_columnar(path, columns[:1])) != written:
+            raise RuntimeError(f"Archive check failed for {partition}; partition left attached.")
+
+        conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{partition}"'))
+        if drop:
+            conn.execute(text(f'DROP TABLE "{partition}"'))
+    return written
+
+
+def archive_cold_partitions(
+    keep_months: int = KEEP_MONTHS,
+    drop: bool = False,
+    archive_dir: str = ARCHIVE_DIR,
+    tables: Optional[Iterable[str]] = None,
+) -> Dict[str, Dict[str, int]]:
+    """Archive every monthly partition older than the last `keep_months` months."""
+    cutoff = add_months(_this_month(), -keep_months)
+    done: Dict[str, Dict[str, int]] = {}
+    for table in tables or ATTEMPT_TABLES:
+        with engine.connect() as conn:
+            if partition_column(conn, table) is None:
+                continue
+            cold = [p["partition"] for p in list_partitions(conn, table) if p["month"] and p["month"] < cutoff]
+        for partition in cold:
+            done.setdefault(table, {})[partition] = archive_partition(table, partition, drop, archive_dir)
+    return done
+
+
+# ------------------------------------------------------------
+# READ-BACK
+# ------------------------------------------------------------
+
+def read_attempts(
+    table: str,
+    start: Optional[dt.date] = None,
+    end: Optional[dt.date] = None,
+    columns: Optional[Sequence[str]] = None,
+    archive_dir: str = ARCHIVE_DIR,
+) -> pd.DataFrame:
+    """
+    Rows of `table` with start <= time < end, from the live table and from
+    archived months. A month that is archived but still attached is read
+    from the database only.
+    """
+    with engine.connect() as conn:
+        time_col = partition_column(conn, table) or detect_time_column(conn, table)
+        attached = {p["month"] for p in list_partitions(conn, table)}
+
+        select = ", ".join(f'"{c}"' for c in columns) if columns else "*"
+        where, params = [], {}
+        if start is not None:
+            where.append(f'"{time_col}" >= :start')
+            params["start"] = start
+        if end is not None:
+            where.append(f'"{time_col}" < :end')
+            params["end"] = end
+        sql = f'SELECT {select} FROM "{table}"' + (" WHERE " + " AND ".join(where) if where else "")
+        frames = [pd.read_sql(text(sql), con=conn, params=params)]
+
+    wanted = list(columns) if columns else None
+    if wanted and time_col not in wanted:
+        wanted.append(time_col)
+    for month, path in sorted(archived_months(table, archive_dir).items()):
+        if month in attached:
+            continue
+        if (start is not None and add_months(month, 1) <= start) or (end is not None and month >= end):
+            continue
+        df = filter_time_range(read_columnar(path, wanted), time_col, start, end)
+        frames.append(df[list(columns)] if columns else df)
+
+    frames = [f for f in frames if len(f)] or frames[:1]
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def detect_time_column(conn, table: str) -> Optional[str]:
+    """First of the table's candidate time columns that exists (for unpartitioned tables)."""
+    for col in ATTEMPT_TABLES[table]:
+        found = conn.execute(
+            text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = :t AND column_name = :c"
+            ),
+            {"t": table, "c": col},
+        ).fetchone()
+        if found:
+            return col
+    return None
+
+
+def filter_time_range(
+    df: pd.DataFrame,
+    time_col: str,
+    start: Optional[dt.date] = None,
+    end: Optional[dt.date] = None,
+) -> pd.DataFrame:
+    """Rows of an archived month with start <= time_col < end."""
+    ts = df[time_col]
+    keep = pd.Series(True, index=df.index)
+    if start is not None:
+        keep &= ts >= _as_bound(start, ts)
+    if end is not None:
+        keep &= ts < _as_bound(end, ts)
+    return df[keep]
+
+
+def _as_bound(value: dt.date, series: pd.Series) -> pd.Timestamp:
+    bound = pd.Timestamp(value)
+    if getattr(series.dt, "tz", None) is not None and bound.tzinfo is None:
+        bound = bound.tz_localize("UTC")
+    return bound
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+
+def _date(value: str) -> dt.date:
+    return dt.date.fromisoformat(value)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Attempt table partitions and archival.")
+    p.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    sub = p.add_subparsers(dest="command", required=True)
+
+    mig = sub.add_parser("migrate", help="Convert attempt tables to monthly partitions")
+    mig.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    ens = sub.add_parser("ensure", help="Create partitions for upcoming months")
+    ens.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    sub.add_parser("list", help="Show partitions and archived months")
+    arc = sub.add_parser("archive", help="Export and detach cold partitions")
+    arc.add_argument("--keep-months", type=int, default=KEEP_MONTHS)
+    arc.add_argument("--table", action="append", choices=list(ATTEMPT_TABLES))
+    arc.add_argument("--drop", action="store_true", help="Drop partitions after detaching")
+    rd = sub.add_parser("read", help="Write live + archived rows for a date range as CSV")
+    rd.add_argument("table", choices=list(ATTEMPT_TABLES))
+    rd.add_argument("--start", type=_date)
+    rd.add_argument("--end", type=_date)
+    rd.add_argument("--out", help="CSV path (default stdout)")
+    opts = p.parse_args(argv)
+
+    if opts.command == "migrate":
+        for line in migrate(opts.months_ahead):
+            print(line)
+    elif opts.command == "ensure":
+        print(ensure_partitions(opts.months_ahead) or "Nothing to create")
+    elif opts.command == "list":
+        with engine.connect() as conn:
+            for table in ATTEMPT_TABLES:
+                col = partition_column(conn, table)
+                parts = list_partitions(conn, table) if col else []
+                archived = sorted(archived_months(table, opts.archive_dir))
+                print(f"{table}: " + (f"by {col}, {len(parts)} partitions" if col else "not partitioned"))
+                for part in parts:
+                    print(f"  {part['partition']:<40} ~{part['rows_estimate']} rows")
+                if archived:
+                    print(f"  archived: {', '.join(m.strftime('%Y-%m') for m in archived)}")
+    elif opts.command == "archive":
+        done = archive_cold_partitions(opts.keep_months, opts.drop, opts.archive_dir, opts.table)
+        for table, parts in done.items():
+            for partition, rows in parts.items():
+                print(f"{table}: {partition} -> {rows} rows")
+        if not done:
+            print("Nothing to archive")
+    else:
+        df = read_attempts(opts.table, opts.start, opts.end, archive_dir=opts.archive_dir)
+        df.to_csv(opts.out or sys.stdout, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Set-based roster / enrollment operations.
+
+Every function applies a whole set of (left, right) links - student x
+course, class x student - in a single statement, whatever its size, and
+returns counts. Works on either DB path:
+
+- a SQLAlchemy Connection (shared.db / legacy engine, inside engine.begin())
+- a psycopg2 cursor (math_app.db)
+
+The caller owns the transaction.
+"""
+
+from __future__ import annotations
+
+from itertools import product
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# link table -> (left column, right column); only these can be targeted
+LINK_TABLES: Dict[str, Tuple[str, str]] = {
+    "spelling_enrollments": ("user_id", "course_id"),
+    "math_enrollments": ("user_id", "course_id"),
+    "enrollments": ("user_id", "course_id"),
+    "class_students": ("class_id", "user_id"),
+    "math_class_students": ("class_id", "user_id"),
+}
+
+Pair = Tuple[int, int]
+
+
+# ------------------------------------------------------------
+# HELPERS
+# ------------------------------------------------------------
+
+def _columns(table: str) -> Tuple[str, str]:
+    try:
+        return LINK_TABLES[table]
+    except KeyError:
+        raise ValueError(f"Not a link table: {table}")
+
+
+def _run(executor, sql: str, params: tuple):
+    """Execute on a SQLAlchemy Connection or a psycopg2 cursor; returns something with fetchone/rowcount."""
+    if hasattr(executor, "exec_driver_sql"):
+        return executor.exec_driver_sql(sql, params)
+    executor.execute(sql, params)
+    return executor
+
+
+def _split(pairs: Iterable[Pair]) -> Tuple[List[int], List[int]]:
+    unique = list(dict.fromkeys((int(a), int(b)) for a, b in pairs))
+    return [a for a, _ in unique], [b for _, b in unique]
+
+
+def cross(left_ids: Iterable[Any], right_ids: Iterable[Any]) -> List[Pair]:
+    """Every left id linked to every right id (students x courses, class x students, ...)."""
+    lefts = [int(x) for x in left_ids if x is not None]
+    rights = [int(x) for x in right_ids if x is not None]
+    return list(product(lefts, rights))
+
+
+# ------------------------------------------------------------
+# OPERATIONS
+# ------------------------------------------------------------
+
+def add_links(executor, table: str, pairs: Iterable[Pair]) -> int:
+    """Insert missing links; returns how many were new."""
+    a, b = _columns(table)
+    lefts, rights = _split(pairs)
+    if not lefts:
+        return 0
+    result = _run(
+        executor,
+        f"""
+        INSERT INTO {table} ({a}, {b})
+        SELECT * FROM UNNEST(%s::INTEGER[], %s::INTEGER[])
+        ON CONFLICT DO NOTHING
+        """,
+        (lefts, rights),
+    )
+    return max(result.rowcount or 0, 0)
+
+
+def remove_links(executor, table: str, pairs: Iterable[Pair]) -> int:
+    """Delete the given links; returns how many existed."""
+    a, b = _columns(table)
+    lefts, rights = _split(pairs)
+    if not lefts:
+        return 0
+    result = _run(
+        executor,
+        f"""
+        DELETE FROM {table} t
+        USING UNNEST(%s::INTEGER[], %s::INTEGER[]) AS d(a, b)
+        WHERE t.{a} = d.a AND t.{b} = d.b
+        """,
+        (lefts, rights),
+    )
+    return max(result.rowcount or 0, 0)
+
+
+def sync_links(
+    executor,
+    table: str,
+    pairs: Iterable[Pair],
+    scope_column: str,
+    scope_ids: Sequence[Any],
+) -> Dict[str, int]:
+    """
+    Diff semantics: make the links of `scope_ids` (values of `scope_column`)
+    exactly `pairs` - add missing, remove extra - in one statement.
+
+    e.g. sync_links(cur, "math_class_students", cross([cid], students), "class_id", [cid])
+    sets a class roster; sync_links(conn, "spelling_enrollments",
+    cross(students, courses), "user_id", students) sets those students' courses.
+
+    Returns {"added", "removed", "kept"}.
+    """
+    a, b = _columns(table)
+    if scope_column not in (a, b):
+        raise ValueError(f"{scope_column} is not a column of {table}")
+    scope = [int(x) for x in scope_ids if x is not None]
+    if not scope:
+        return {"added": 0, "removed": 0, "kept": 0}
+    lefts, rights = _split(pairs)
+
+    row = _run(
+        executor,
+        f"""
+        WITH desired AS (
+            SELECT * FROM UNNEST(%s::INTEGER[], %s::INTEGER[]) AS d(a, b)
+        ),
+        removed AS (
+            DELETE FROM {table} t
+            WHERE t.{scope_column} = ANY(%s)
+              AND NOT EXISTS (
+                  SELECT 1 FROM desired d WHERE d.a = t.{a} AND d.b = t.{b}
+              )
+            RETURNING 1
+        ),
+        added AS (
+            INSERT INTO {table} ({a}, {b})
+            SELECT a, b FROM desired
+            ON CONFLICT DO NOTHING
+            RETURNING 1
+        )
+        SELECT (SELECT COUNT(*) FROM added), (SELECT COUNT(*) FROM removed)
+        """,
+        (lefts, rights, scope),
+    ).fetchone()
+    added, removed = int(row[0]), int(row[1])
+    return {"added": added, "removed": removed, "kept": len(lefts) - added}
+
+
+def apply_links(
+    executor,
+    table: str,
+    pairs: Iterable[Pair],
+    mode: str = "add",
+    scope_column: Optional[str] = None,
+    scope_ids: Optional[Sequence[Any]] = None,
+) -> Dict[str, int]:
+    """Dispatch on mode: add | remove | sync. Always returns {"added", "removed", "kept"}."""
+    pairs = list(pairs)
+    if mode == "add":
+        added = add_links(executor, table, pairs)
+        return {"added": added, "removed": 0, "kept": len(_split(pairs)[0]) - added}
+    if mode == "remove":
+        return {"added": 0, "removed": remove_links(executor, table, pairs), "kept": 0}
+    if mode == "sync":
+        if not scope_column:
+            raise ValueError("sync needs scope_column / scope_ids")
+        return sync_links(executor, table, pairs, scope_column, scope_ids or [])
+    raise ValueError(f"Unknown mode: {mode}")
@@ -0,0 +1,173 @@
+"""
+Cross-process cache invalidation over Postgres LISTEN/NOTIFY.
+
+Every Streamlit replica keeps its own shared.tagged_cache. A write path
+publishes what it changed as (topic, key), e.g. ("course", 12) or
+("spelling_help", "spelling_intro"); each process runs one listener
+thread on CHANNEL that evicts the matching tag, (topic, key), or
+(topic,) when key is None.
+
+    cache_bus.publish("lesson", 40)                 after your commit
+    cache_bus.publish("math_course", 3, executor=cur)   inside it
+
+Without an executor the notification goes out in its own transaction and
+this process evicts at once. With one (a SQLAlchemy Connection or a
+psycopg2 cursor, as for attempt_events.run) Postgres delivers it only if
+that transaction commits, so no replica reloads before the new rows are
+visible; this process evicts when its listener receives it.
+
+A listener that loses its connection reconnects and clears the whole
+local cache, since notifications sent meanwhile are gone. Payloads are
+JSON and must stay under Postgres' 8000-byte NOTIFY limit.
+
+    start_listener()      idempotent; call where a process sets up caches
+    subscribe(fn)         fn(topic, key) for caches outside tagged_cache;
+                          ("*", None) after a reconnect means "drop all"
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import select
+import threading
+import time
+import uuid
+from typing import Any, Callable, List, Optional
+
+from shared import tagged_cache
+
+log = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+RECONNECT_SECONDS = 5.0
+POLL_SECONDS = 30.0
+
+# Identifies this process in payloads, so it can skip its own
+# already-applied notifications.
+ORIGIN = uuid.uuid4().hex
+
+Handler = Callable[[str, Any], None]
+
+_handlers: List[Handler] = []
+_listener: Optional[threading.Thread] = None
+_listener_lock = threading.Lock()
+
+
+def _evict_tagged(topic: str, key: Any) -> None:
+    tagged_cache.invalidate((topic,) if key is None else (topic, key))
+
+
+def subscribe(fn: Handler) -> Handler:
+    """Also call fn(topic, key) for every invalidation (local or remote)."""
+    if fn not in _handlers:
+        _handlers.append(fn)
+    return fn
+
+
+def apply(topic: str, key: Any = None) -> None:
+    """Evict locally; errors in one handler do not stop the others."""
+    for handler in [_evict_tagged, *_handlers]:
+        try:
+            handler(topic, key)
+        except Exception:
+            log.exception("cache invalidation handler failed for %s:%s", topic, key)
+
+
+def _payload(topic: str, key: Any, origin: Optional[str]) -> str:
+    return json.dumps({"topic": str(topic), "key": key, "origin": origin}, default=str)
+
+
+def publish(topic: str, key: Any = None, *, executor=None) -> None:
+    """Invalidate (topic, key) in every process; see the module docstring."""
+    if executor is not None:
+        # delivered at commit, applied here by our own listener
+        _send(executor, _payload(topic, key, None))
+        return
+
+    apply(topic, key)
+    from shared.db import engine
+
+    try:
+        with engine.begin() as conn:
+            _send(conn, _payload(topic, key, ORIGIN))
+    except Exception:
+        log.exception("could not publish cache invalidation %s:%s", topic, key)
+
+
+def _send(executor, payload: str) -> None:
+    sql = "SELECT pg_notify(%s, %s)"
+    if hasattr(executor, "exec_driver_sql"):
+        executor.exec_driver_sql(sql, (CHANNEL, payload))
+    else:
+        executor.execute(sql, (CHANNEL, payload))
+
+
+def _dispatch(raw: str) -> None:
+    try:
+        msg = json.loads(raw)
+    except ValueError:
+        log.warning("ignoring malformed cache invalidation payload: %r", raw)
+        return
+    if msg.get("origin") == ORIGIN:
+        return
+    apply(msg.get("topic", ""), msg.get("key"))
+
+
+def _dsn() -> str:
+    url = os.environ.get("DATABASE_URL", "")
+    # SQLAlchemy-style "postgresql+psycopg2://" -> libpq "postgresql://"
+    scheme, sep, rest = url.partition("://")
+    return f"{scheme.split('+', 1)[0]}{sep}{rest}"
+
+
+def _listen_forever(dsn: str) -> None:
+    import psycopg2
+    import psycopg2.extensions
+
+    first = True
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(dsn)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL}")
+            if not first:
+                # anything published while we were away was missed
+                tagged_cache.CACHE.clear()
+                apply("*")
+            first = False
+            while True:
+                if select.select([conn], [], [], POLL_SECONDS) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    _dispatch(conn.notifies.pop(0).payload)
+        except Exception:
+            log.exception("cache invalidation listener lost its connection; retrying")
+            first = False
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        time.sleep(RECONNECT_SECONDS)
+
+
+def start_listener(dsn: Optional[str] = None) -> bool:
+    """Start this process's listener thread once; True if it is running."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None and _listener.is_alive():
+            return True
+        target = dsn or _dsn()
+        if not target:
+            return False
+        _listener = threading.Thread(
+            target=_listen_forever, args=(target,), name="cache-bus-listener", daemon=True
+        )
+        _listener.start()
+        return True
@@ -0,0 +1,405 @@
+"""
+End-of-term progress reports for a whole classroom (synonym app).
+
+collect_class_metrics() reads every student's numbers for a class in a
+handful of grouped queries over the roster, instead of running
+gamification_snapshot / course_progress per student. render_student()
+turns one student's metrics into a CSV and an HTML page; it is a plain
+function of its arguments so build_class_report() can fan students out
+over a process pool and bundle everything into one zip:
+
+    class_summary.csv           one row per student
+    index.html                  class overview linking to each student
+    students/<name>-<id>.csv    course progress
+    students/<name>-<id>.html   full report
+
+Usage:
+    python -m shared.class_reports 12 --out term1-class12.zip
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import datetime as dt
+import html
+import io
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from shared import word_stats_keys
+from shared.levels import level_for_xp
+
+# classes smaller than this are rendered in-process (pool start-up costs more)
+POOL_MIN_STUDENTS = 8
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "0")) or None  # None = os.cpu_count()
+ANSWER_STREAK_LIMIT = 200  # same window as compute_answer_streak
+
+# progress(done, total, message)
+Progress = Callable[[int, int, str], None]
+
+SUMMARY_COLUMNS = [
+    "user_id", "name", "email", "is_active", "level", "level_name", "xp_total",
+    "mastered_words", "correct_words", "attempted_words", "total_attempts",
+    "correct_attempts", "accuracy_pct", "time_minutes", "answer_streak",
+    "login_streak", "badges", "last_active",
+]
+COURSE_COLUMNS = ["course", "mastered_words", "attempted_words", "total_words", "percent"]
+
+
+# ------------------------------------------------------------
+# METRICS (grouped queries)
+# ------------------------------------------------------------
+
+ROSTER_SQL = """
+    SELECT c.name AS class_name, u.user_id, u.name, u.email, u.is_active
+    FROM classes c
+    JOIN class_students cs ON cs.class_id = c.class_id
+    JOIN users u ON u.user_id = cs.user_id
+    WHERE c.class_id = :cid
+    ORDER BY u.name
+"""
+
+WORD_STATS_SQL = """
+    SELECT user_id,
+           COALESCE(SUM(xp_points), 0)                        AS xp_from_words,
+           COUNT(*) FILTER (WHERE mastered IS TRUE)           AS mastered_words,
+           COUNT(*) FILTER (WHERE correct_attempts > 0)       AS correct_words,
+           COUNT(*) FILTER (WHERE total_attempts > 0)         AS attempted_words
+    FROM word_stats
+    WHERE user_id = ANY(:uids)
+    GROUP BY user_id
+"""
+
+BADGES_SQL = """
+    SELECT user_id,
+           COALESCE(SUM(xp_bonus), 0) AS xp_from_badges,
+           ARRAY_AGG(emoji || ' ' || badge_name ORDER BY awarded_at DESC) AS badges
+    FROM achievements
+    WHERE user_id = ANY(:uids)
+    GROUP BY user_id
+"""
+
+# answer streak = correct answers since the user's last wrong one
+ATTEMPTS_SQL = """
+    WITH last_wrong AS (
+        SELECT user_id, MAX(id) AS id
+        FROM attempts
+        WHERE user_id = ANY(:uids) AND NOT COALESCE(is_correct, FALSE)
+        GROUP BY user_id
+    )
+    SELECT a.user_id,
+           COUNT(*)                                      AS total_attempts,
+           COUNT(*) FILTER (WHERE a.is_correct)          AS correct_attempts,
+           COALESCE(SUM(a.response_ms), 0)               AS time_ms,
+           MAX(a.ts)                                     AS last_active,
+           LEAST(COUNT(*) FILTER (WHERE a.id > COALESCE(w.id, 0)), :streak_limit) AS answer_streak
+    FROM attempts a
+    LEFT JOIN last_wrong w ON w.user_id = a.user_id
+    WHERE a.user_id = ANY(:uids)
+    GROUP BY a.user_id
+"""
+
+ACTIVE_DAYS_SQL = """
+    SELECT DISTINCT user_id, DATE(ts) AS day
+    FROM attempts
+    WHERE user_id = ANY(:uids) AND ts IS NOT NULL
+    ORDER BY user_id, day DESC
+"""
+
+# course_progress() for every (student, enrolled course) at once;
+# {stats_match} is word_stats_keys.stats_match("ws", "cw")
+COURSES_SQL = """
+    WITH course_words AS (
+        SELECT DISTINCT l.course_id, w.headword_id, w.headword
+        FROM lessons l
+        JOIN lesson_words lw ON lw.lesson_id = l.lesson_id
+        JOIN words w ON w.word_id = lw.word_id
+        WHERE l.course_id IN (SELECT course_id FROM enrollments WHERE user_id = ANY(:uids))
+    )
+    SELECT e.user_id,
+           c.course_id,
+           c.title,
+           COUNT(cw.headword_id)                               AS total_words,
+           COUNT(*) FILTER (WHERE ws.mastered)                 AS mastered_words,
+           COUNT(*) FILTER (WHERE ws.total_attempts > 0)       AS attempted_words
+    FROM enrollments e
+    JOIN courses c ON c.course_id = e.course_id
+    LEFT JOIN course_words cw ON cw.course_id = e.course_id
+    LEFT JOIN word_stats ws ON ws.user_id = e.user_id AND {stats_match}
+    WHERE e.user_id = ANY(:uids)
+    GROUP BY e.user_id, c.course_id, c.title
+    ORDER BY e.user_id, c.title
+"""
+
+
+def _login_streak(days: List[dt.date]) -> int:
+    """compute_login_streak over one user's distinct days (newest first)."""
+    if not days:
+        return 0
+    streak, last_day = 1, days[0]
+    for day in days[1:]:
+        if (last_day - day) == dt.timedelta(days=1):
+            streak += 1
+            last_day = day
+        else:
+            break
+    return streak
+
+
+def _course_percent(mastered: int, attempted: int, total: int) -> int:
+    """Same rule as course_progress: mastered% once anything is mastered, else attempted%."""
+    if not total:
+        return 0
+    basis = mastered if mastered > 0 else attempted
+    return int(round(100 * min(basis, total) / total))
+
+
+def collect_class_metrics(class_id: int, engine=None) -> Tuple[str, List[Dict[str, Any]]]:
+    """(class name, per-student metrics) for `class_id`, in six queries."""
+    if engine is None:
+        from shared.db import engine
+
+    with engine.connect() as conn:
+        roster = conn.execute(text(ROSTER_SQL), {"cid": int(class_id)}).mappings().all()
+        if not roster:
+            name = conn.execute(
+                text("SELECT name FROM classes WHERE class_id = :cid"), {"cid": int(class_id)}
+            ).scalar()
+            return name or f"Class {class_id}", []
+
+        uids = [int(r["user_id"]) for r in roster]
+        params = {"uids": uids}
+        words = {r["user_id"]: r for r in conn.execute(text(WORD_STATS_SQL), params).mappings()}
+        badges = {r["user_id"]: r for r in conn.execute(text(BADGES_SQL), params).mappings()}
+        attempts = {
+            r["user_id"]: r
+            for r in conn.execute(
+                text(ATTEMPTS_SQL), {**params, "streak_limit": ANSWER_STREAK_LIMIT}
+            ).mappings()
+        }
+        days: Dict[int, List[dt.date]] = {}
+        for user_id, day in conn.execute(text(ACTIVE_DAYS_SQL), params):
+            days.setdefault(user_id, []).append(day)
+        courses: Dict[int, List[Dict[str, Any]]] = {}
+        courses_sql = COURSES_SQL.format(stats_match=word_stats_keys.stats_match("ws", "cw", engine))
+        for r in conn.execute(text(courses_sql), params).mappings():
+            total, mastered, attempted = int(r["total_words"]), int(r["mastered_words"]), int(r["attempted_words"])
+            courses.setdefault(r["user_id"], []).append(
+                {
+                    "course": r["title"],
+                    "mastered_words": mastered,
+                    "attempted_words": attempted,
+                    "total_words": total,
+                    "percent": _course_percent(mastered, attempted, total),
+                }
+            )
+
+    students = []
+    for r in roster:
+        uid = int(r["user_id"])
+        w, b, a = words.get(uid, {}), badges.get(uid, {}), attempts.get(uid, {})
+        xp_words, xp_badges = int(w.get("xp_from_words") or 0), int(b.get("xp_from_badges") or 0)
+        band = level_for_xp(xp_words + xp_badges)
+        total_attempts, correct_attempts = int(a.get("total_attempts") or 0), int(a.get("correct_attempts") or 0)
+        students.append(
+            {
+                "user_id": uid,
+                "name": r["name"],
+                "email": r["email"],
+                "is_active": bool(r["is_active"]),
+                "xp_total": xp_words + xp_badges,
+                "xp_from_words": xp_words,
+                "xp_from_badges": xp_badges,
+                "level": band["level"],
+                "level_name": band["title"],
+                "mastered_words": int(w.get("mastered_words") or 0),
+                "correct_words": int(w.get("correct_words") or 0),
+                "attempted_words": int(w.get("attempted_words") or 0),
+                "total_attempts": total_attempts,
+                "correct_attempts": correct_attempts,
+                "accuracy_pct": round(100 * correct_attempts / total_attempts, 1) if total_attempts else 0.0,
+                "time_minutes": round(int(a.get("time_ms") or 0) / 60000, 1),
+                "answer_streak": int(a.get("answer_streak") or 0),
+                "login_streak": _login_streak(days.get(uid, [])),
+                "last_active": a.get("last_active"),
+                "badges": list(b.get("badges") or []),
+                "courses": courses.get(uid, []),
+            }
+        )
+    return roster[0]["class_name"], students
+
+
+# ------------------------------------------------------------
+# RENDERING (runs in worker processes)
+# ------------------------------------------------------------
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", (value or "").lower()).strip("-") or "student"
+
+
+def student_basename(student: Dict[str, Any]) -> str:
+    return f"students/{_slug(student['name'])}-{student['user_id']}"
+
+
+def _csv_bytes(header: List[str], rows: List[List[Any]]) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+
+def _summary_row(student: Dict[str, Any]) -> List[Any]:
+    row = dict(student, badges="; ".join(student["badges"]))
+    return [row.get(col) for col in SUMMARY_COLUMNS]
+
+
+_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+  body {{ font-family: sans-serif; margin: 2rem; color: #111827; }}
+  table {{ border-collapse: collapse; margin: 1rem 0; }}
+  th, td {{ border: 1px solid #d1d5db; padding: .35rem .7rem; text-align: left; }}
+  th {{ background: #f3f4f6; }}
+</style></head>
+<body>{body}</body></html>
+"""
+
+
+def _html_table(header: List[str], rows: List[List[Any]]) -> str:
+    head = "".join(f"<th>{html.escape(str(h))}</th>" for h in header)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{html.escape('' if v is None else str(v))}</td>" for v in row) + "</tr>"
+        for row in rows
+    )
+    return f"<table><tr>{head}</tr>{body}</table>"
+
+
+def render_student(student: Dict[str, Any], class_name: str, generated_at: str) -> List[Tuple[str, bytes]]:
+    """[(archive name, bytes)] for one student's CSV and HTML report."""
+    base = student_basename(student)
+    course_rows = [[c[col] for col in COURSE_COLUMNS] for c in student["courses"]]
+
+    facts = [
+        ["Level", f"{student['level']} – {student['level_name']} ({student['xp_total']} XP)"],
+        ["Words mastered", student["mastered_words"]],
+        ["Words answered correctly", student["correct_words"]],
+        ["Words attempted", student["attempted_words"]],
+        ["Answers", f"{student['correct_attempts']} / {student['total_attempts']} correct ({student['accuracy_pct']}%)"],
+        ["Time practising", f"{student['time_minutes']} min"],
+        ["Current answer streak", student["answer_streak"]],
+        ["Day streak", student["login_streak"]],
+        ["Last active", student["last_active"] or "—"],
+    ]
+    badges = "".join(f"<li>{html.escape(b)}</li>" for b in student["badges"]) or "<li>None yet</li>"
+    body = (
+        f"<h1>{html.escape(student['name'])}</h1>"
+        f"<p>{html.escape(class_name)} · generated {html.escape(generated_at)}</p>"
+        + _html_table(["", ""], facts)
+        + "<h2>Courses</h2>"
+        + (_html_table(COURSE_COLUMNS, course_rows) if course_rows else "<p>No enrolments.</p>")
+        + f"<h2>Badges</h2><ul>{badges}</ul>"
+    )
+    page = _PAGE.format(title=html.escape(f"{student['name']} – {class_name}"), body=body)
+    return [
+        (base + ".csv", _csv_bytes(COURSE_COLUMNS, course_rows)),
+        (base + ".html", page.encode("utf-8")),
+    ]
+
+
+def render_index(class_name: str, students: List[Dict[str, Any]], generated_at: str) -> bytes:
+    rows = [
+        [
+            f'<a href="{html.escape(student_basename(s))}.html">{html.escape(s["name"])}</a>',
+            s["level_name"], s["xp_total"], s["mastered_words"], f"{s['accuracy_pct']}%", s["login_streak"],
+        ]
+        for s in students
+    ]
+    head = "".join(f"<th>{h}</th>" for h in ["Student", "Level", "XP", "Mastered", "Accuracy", "Day streak"])
+    body = "".join("<tr>" + "".join(f"<td>{v}</td>" for v in row) + "</tr>" for row in rows)
+    page = _PAGE.format(
+        title=html.escape(class_name),
+        body=(
+            f"<h1>{html.escape(class_name)}</h1><p>{len(students)} students · generated {html.escape(generated_at)}</p>"
+            f"<table><tr>{head}</tr>{body}</table>"
+        ),
+    )
+    return page.encode("utf-8")
+
+
+# ------------------------------------------------------------
+# ARCHIVE
+# ------------------------------------------------------------
+
+def _rendered(students, class_name, generated_at, workers):
+    if len(students) < POOL_MIN_STUDENTS or workers == 1:
+        for s in students:
+            yield render_student(s, class_name, generated_at)
+        return
+    # spawn rather than fork the Streamlit server (its threads and held
+    # locks); render_student only takes plain, picklable arguments
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(render_student, s, class_name, generated_at) for s in students]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def build_class_report(
+    out,
+    class_id: int,
+    *,
+    workers: Optional[int] = REPORT_WORKERS,
+    progress: Optional[Progress] = None,
+    engine=None,
+) -> int:
+    """Write the class report zip to binary `out`; returns the number of students."""
+    report = progress or (lambda done, total, message: None)
+    report(0, 1, "Collecting metrics…")
+    class_name, students = collect_class_metrics(class_id, engine)
+    generated_at = dt.datetime.now().strftime("%Y-%m-%d %H:%M")
+    total = len(students)
+
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("class_summary.csv", _csv_bytes(SUMMARY_COLUMNS, [_summary_row(s) for s in students]))
+        zf.writestr("index.html", render_index(class_name, students, generated_at))
+        for done, files in enumerate(_rendered(students, class_name, generated_at, workers), start=1):
+            for name, data in files:
+                zf.writestr(name, data)
+            report(done, total, f"Rendered {done} of {total} students")
+    report(total, total, f"{class_name}: {total} student reports ready")
+    return total
+
+
+def report_filename(class_name: str) -> str:
+    return f"{_slug(class_name)}-report-{dt.date.today():%Y%m%d}.zip"
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Bulk per-class progress reports.")
+    p.add_argument("class_id", type=int)
+    p.add_argument("--out", required=True, help="Output .zip path")
+    p.add_argument("--workers", type=int, default=REPORT_WORKERS)
+    opts = p.parse_args(argv)
+
+    def show(done, total, message):
+        print(f"[{done}/{total}] {message}")
+
+    tmp = opts.out + ".part"
+    with open(tmp, "wb") as fh:
+        build_class_report(fh, opts.class_id, workers=opts.workers, progress=show)
+    os.replace(tmp, opts.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Compressed columnar files for offline data (attempt archives, analytics
+snapshots).
+
+One .npz per file: a compressed array per column ("v<i>"), a null mask
+per column ("n<i>") and a JSON header (column names / kinds, row count,
+caller metadata). Needs only NumPy; nothing is pickled.
+
+    write_columnar(path, columns, rows, meta)   rows = DB tuples
+    write_frame(path, df, meta)                 from a DataFrame
+    read_columnar(path, columns=None)           -> DataFrame
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import decimal
+import io
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def _column_kind(values: List[Any]) -> str:
+    sample = next((v for v in values if v is not None), None)
+    if isinstance(sample, (bool, np.bool_)):
+        return "bool"
+    if isinstance(sample, (int, np.integer)):
+        return "int"
+    if isinstance(sample, (float, np.floating, decimal.Decimal)):
+        return "float"
+    if isinstance(sample, dt.datetime):
+        return "datetime_tz" if sample.tzinfo is not None else "datetime"
+    if isinstance(sample, dt.date):
+        return "date"
+    if isinstance(sample, (list, dict)):
+        return "json"
+    return "str"
+
+
+def _encode_column(values: List[Any], kind: str) -> np.ndarray:
+    if kind == "bool":
+        return np.array([bool(v) if v is not None else False for v in values], dtype=np.bool_)
+    if kind == "int":
+        return np.array([v if v is not None else 0 for v in values], dtype=np.int64)
+    if kind == "float":
+        return np.array([float(v) if v is not None else np.nan for v in values], dtype=np.float64)
+    if kind == "datetime_tz":
+        utc = [v.astimezone(dt.timezone.utc).replace(tzinfo=None) if v is not None else None for v in values]
+        return np.array(utc, dtype="datetime64[us]")
+    if kind == "datetime":
+        return np.array(values, dtype="datetime64[us]")
+    if kind == "date":
+        return np.array(values, dtype="datetime64[D]")
+    if kind == "json":
+        return np.array([json.dumps(v) if v is not None else "" for v in values], dtype=np.str_)
+    return np.array([str(v) if v is not None else "" for v in values], dtype=np.str_)
+
+
+def _decode_column(arr: np.ndarray, nulls: np.ndarray, kind: str) -> pd.Series:
+    has_nulls = bool(nulls.any())
+    if kind == "int":
+        s = pd.Series(arr, dtype="Int64" if has_nulls else "int64")
+    elif kind == "bool":
+        s = pd.Series(arr, dtype="boolean" if has_nulls else "bool")
+    elif kind in ("datetime", "date", "datetime_tz"):
+        s = pd.Series(arr.astype("datetime64[us]"))
+        if kind == "datetime_tz":
+            s = s.dt.tz_localize("UTC")
+    elif kind == "json":
+        s = pd.Series([json.loads(v) if v else None for v in arr.tolist()], dtype=object)
+    elif kind == "str":
+        s = pd.Series(arr.tolist(), dtype=object)
+    else:
+        s = pd.Series(arr)
+    if has_nulls:
+        s = s.where(~pd.Series(nulls), None) if s.dtype == object else s.mask(pd.Series(nulls))
+    return s
+
+
+def write_columnar(path: str, columns: List[str], rows: List[Sequence[Any]], meta: Dict[str, Any]) -> int:
+    """Write rows as one compressed .npz (atomically); returns the row count."""
+    arrays: Dict[str, np.ndarray] = {}
+    kinds = []
+    for i, col in enumerate(columns):
+        values = [r[i] for r in rows]
+        kind = _column_kind(values)
+        kinds.append(kind)
+        arrays[f"v{i}"] = _encode_column(values, kind)
+        arrays[f"n{i}"] = np.array([v is None for v in values], dtype=np.bool_)
+
+    header = dict(meta, rows=len(rows), columns=[{"name": c, "kind": k} for c, k in zip(columns, kinds)])
+    arrays["header"] = np.array(json.dumps(header, default=str))
+
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **arrays)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(buf.getvalue())
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+    return len(rows)
+
+
+def write_frame(path: str, df: pd.DataFrame, meta: Dict[str, Any]) -> int:
+    """write_columnar for a DataFrame (nulls kept as nulls)."""
+    rows = list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+    return write_columnar(path, [str(c) for c in df.columns], rows, meta)
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    with np.load(path, allow_pickle=False) as npz:
+        return json.loads(str(npz["header"]))
+
+
+def read_columnar(path: str, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """DataFrame from an archive file (optionally only some columns)."""
+    with np.load(path, allow_pickle=False) as npz:
+        header = json.loads(str(npz["header"]))
+        wanted = set(columns) if columns is not None else None
+        data = {}
+        for i, col in enumerate(header["columns"]):
+            if wanted is not None and col["name"] not in wanted:
+                continue
+            data[col["name"]] = _decode_column(npz[f"v{i}"], npz[f"n{i}"], col["kind"])
+    return pd.DataFrame(data)
@@ -2,6 +2,8 @@ import os
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError
 
+from shared.db_instrumentation import install_sqlalchemy
+
 # Load database URL from environment variable
 DATABASE_URL = os.getenv("DATABASE_URL")
 
@@ -14,6 +16,9 @@ engine = create_engine(
     pool_pre_ping=True,
 )
 
+# Per-statement timing / N+1 detection for every SQLAlchemy engine
+install_sqlalchemy()
+
 # --------------------------------------------------------------------
 # fetch_all() — Always return list of rows (for SELECT queries)
 # --------------------------------------------------------------------
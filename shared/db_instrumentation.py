@@ -0,0 +1,284 @@
+"""
+SQL instrumentation for both DB paths.
+
+- SQLAlchemy engines (shared.db, legacy app) via cursor-execute events
+- psycopg2 connections (math_app.db) via an instrumented cursor factory
+
+For every (statement fingerprint, calling function) we keep call count,
+total / max latency, rows returned and errors. Statements repeated many
+times inside one Streamlit rerun are flagged as N+1 suspects.
+
+Disable with SQL_INSTRUMENTATION=0.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+ENABLED = os.getenv("SQL_INSTRUMENTATION", "1") != "0"
+
+# Same fingerprint this many times in one rerun => N+1 suspect
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10"))
+
+# Frames from these modules are skipped when looking for the caller
+_SKIP_MODULE_PREFIXES = (
+    "shared.db",
+    "math_app.db",
+    "sqlalchemy",
+    "psycopg2",
+    "pandas",
+    "contextlib",
+    "streamlit",
+    "functools",
+)
+
+_lock = threading.Lock()
+_stats: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_n_plus_one: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_local = threading.local()
+
+
+# ------------------------------------------------------------
+# FINGERPRINT + CALLER
+# ------------------------------------------------------------
+
+_RE_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_PARAM = re.compile(r"%\([^)]+\)s|%s|(?<!:):[A-Za-z_][A-Za-z0-9_]*")
+_RE_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_WS = re.compile(r"\s+")
+
+
+def fingerprint(sql: Any) -> str:
+    """Normalise a statement so calls differing only in literals/params group together."""
+    s = str(sql)
+    s = _RE_COMMENT.sub(" ", s)
+    s = _RE_STRING.sub("?", s)
+    s = _RE_PARAM.sub("?", s)
+    s = _RE_NUMBER.sub("?", s)
+    s = _RE_IN_LIST.sub("(?...)", s)
+    s = _RE_WS.sub(" ", s).strip().rstrip(";").strip()
+    return s.lower()
+
+
+def _caller() -> str:
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module != __name__ and not module.startswith(_SKIP_MODULE_PREFIXES):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "<unknown>"
+
+
+# ------------------------------------------------------------
+# RERUN SCOPE
+# ------------------------------------------------------------
+
+def current_scope() -> Optional[Dict[str, Any]]:
+    """The rerun scope active on this thread, if any."""
+    return getattr(_local, "scope", None)
+
+
+@contextmanager
+def rerun_scope(page: str):
+    """
+    Marks one Streamlit rerun of `page` so repeated statements inside it can
+    be detected. Yields a dict with per-rerun query totals.
+    """
+    scope = {"page": page, "counts": {}, "queries": 0, "rows": 0, "db_seconds": 0.0}
+    previous = getattr(_local, "scope", None)
+    _local.scope = scope
+    try:
+        yield scope
+    finally:
+        _local.scope = previous
+        _flag_n_plus_one(scope)
+
+
+def _flag_n_plus_one(scope: Dict[str, Any]) -> None:
+    suspects = [(k, n) for k, n in scope["counts"].items() if n >= N_PLUS_ONE_THRESHOLD]
+    if not suspects:
+        return
+    with _lock:
+        for key, n in suspects:
+            entry = _n_plus_one.setdefault(
+                key, {"reruns_flagged": 0, "max_in_rerun": 0, "last_page": "", "last_seen": None}
+            )
+            entry["reruns_flagged"] += 1
+            entry["max_in_rerun"] = max(entry["max_in_rerun"], n)
+            entry["last_page"] = scope["page"]
+            entry["last_seen"] = datetime.utcnow().isoformat(timespec="seconds")
+
+
+# ------------------------------------------------------------
+# RECORDING
+# ------------------------------------------------------------
+
+def record(sql: Any, seconds: float, rows: Optional[int], error: bool = False) -> None:
+    key = (fingerprint(sql), _caller())
+    rows = rows if rows is not None and rows > 0 else 0
+
+    with _lock:
+        entry = _stats.get(key)
+        if entry is None:
+            entry = _stats[key] = {"count": 0, "total_s": 0.0, "max_s": 0.0, "rows": 0, "errors": 0}
+        entry["count"] += 1
+        entry["total_s"] += seconds
+        entry["max_s"] = max(entry["max_s"], seconds)
+        entry["rows"] += rows
+        if error:
+            entry["errors"] += 1
+
+    scope = getattr(_local, "scope", None)
+    if scope is not None:
+        scope["counts"][key] = scope["counts"].get(key, 0) + 1
+        scope["queries"] += 1
+        scope["rows"] += rows
+        scope["db_seconds"] += seconds
+
+
+def get_stats() -> List[Dict[str, Any]]:
+    """Per (fingerprint, caller) stats, slowest total first."""
+    with _lock:
+        items = [(k, dict(v)) for k, v in _stats.items()]
+        flagged = {k: dict(v) for k, v in _n_plus_one.items()}
+
+    rows = []
+    for (fp, caller), v in items:
+        nplus = flagged.get((fp, caller))
+        rows.append(
+            {
+                "caller": caller,
+                "statement": fp,
+                "count": v["count"],
+                "total_ms": round(v["total_s"] * 1000, 2),
+                "avg_ms": round(v["total_s"] * 1000 / v["count"], 2) if v["count"] else 0.0,
+                "max_ms": round(v["max_s"] * 1000, 2),
+                "rows": v["rows"],
+                "errors": v["errors"],
+                "n_plus_one": bool(nplus),
+            }
+        )
+    rows.sort(key=lambda r: r["total_ms"], reverse=True)
+    return rows
+
+
+def get_n_plus_one() -> List[Dict[str, Any]]:
+    with _lock:
+        items = [(k, dict(v)) for k, v in _n_plus_one.items()]
+    rows = [{"caller": caller, "statement": fp, **v} for (fp, caller), v in items]
+    rows.sort(key=lambda r: r["max_in_rerun"], reverse=True)
+    return rows
+
+
+def reset_stats() -> None:
+    with _lock:
+        _stats.clear()
+        _n_plus_one.clear()
+
+
+def dump_stats(path: str) -> str:
+    """Write current stats as JSON and return the path."""
+    payload = {
+        "generated_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "pid": os.getpid(),
+        "n_plus_one_threshold": N_PLUS_ONE_THRESHOLD,
+        "statements": get_stats(),
+        "n_plus_one": get_n_plus_one(),
+    }
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, indent=2, default=str)
+    return path
+
+
+# ------------------------------------------------------------
+# SQLALCHEMY HOOKS
+# ------------------------------------------------------------
+
+_sqlalchemy_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_sqli_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("_sqli_t0")
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    record(statement, elapsed, getattr(cursor, "rowcount", None))
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    stack = conn.info.get("_sqli_t0") if conn is not None else None
+    elapsed = time.perf_counter() - stack.pop() if stack else 0.0
+    record(exception_context.statement or "<error>", elapsed, 0, error=True)
+
+
+def install_sqlalchemy() -> None:
+    """Hook every SQLAlchemy Engine in the process (idempotent)."""
+    global _sqlalchemy_installed
+    if not ENABLED or _sqlalchemy_installed:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _sqlalchemy_installed = True
+
+
+# ------------------------------------------------------------
+# PSYCOPG2 HOOKS
+# ------------------------------------------------------------
+
+_cursor_class = None
+
+
+def psycopg2_cursor_factory():
+    """
+    Cursor class for psycopg2.connect(..., cursor_factory=...).
+    Returns None when instrumentation is disabled.
+    """
+    global _cursor_class
+    if not ENABLED:
+        return None
+    if _cursor_class is None:
+        import psycopg2.extensions
+
+        class InstrumentedCursor(psycopg2.extensions.cursor):
+            def execute(self, query, vars=None):
+                t0 = time.perf_counter()
+                try:
+                    result = super().execute(query, vars)
+                except Exception:
+                    record(query, time.perf_counter() - t0, 0, error=True)
+                    raise
+                record(query, time.perf_counter() - t0, self.rowcount)
+                return result
+
+            def executemany(self, query, vars_list):
+                t0 = time.perf_counter()
+                try:
+                    result = super().executemany(query, vars_list)
+                except Exception:
+                    record(query, time.perf_counter() - t0, 0, error=True)
+                    raise
+                record(query, time.perf_counter() - t0, self.rowcount)
+                return result
+
+        _cursor_class = InstrumentedCursor
+    return _cursor_class
@@ -0,0 +1,112 @@
+"""
+Admin-only diagnostics panels.
+"""
+
+import json
+
+import pandas as pd
+import streamlit as st
+
+from shared.db_instrumentation import (
+    ENABLED as SQL_INSTRUMENTATION_ENABLED,
+    N_PLUS_ONE_THRESHOLD,
+    dump_stats,
+    get_n_plus_one,
+    get_stats,
+    reset_stats,
+)
+from shared.password_hashing import get_pool_metrics
+from shared.render_profiler import (
+    ENABLED as RENDER_PROFILER_ENABLED,
+    clear_samples,
+    get_samples,
+    summarize,
+)
+
+
+def render_db_diagnostics(key_prefix: str = "diag"):
+    st.markdown("### 🩺 SQL Diagnostics")
+
+    if not SQL_INSTRUMENTATION_ENABLED:
+        st.info("SQL instrumentation is disabled (SQL_INSTRUMENTATION=0).")
+        return
+
+    st.caption(
+        "Per statement and calling function, for this server process. "
+        f"N+1 = same statement run {N_PLUS_ONE_THRESHOLD}+ times in one rerun."
+    )
+
+    stats = get_stats()
+    n_plus_one = get_n_plus_one()
+
+    if not stats:
+        st.info("No statements recorded yet.")
+    else:
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Statements", len(stats))
+        c2.metric("Calls", sum(r["count"] for r in stats))
+        c3.metric("DB time (s)", round(sum(r["total_ms"] for r in stats) / 1000, 2))
+
+        st.markdown("#### Top statements")
+        st.dataframe(pd.DataFrame(stats), use_container_width=True, hide_index=True)
+
+    st.markdown("#### N+1 suspects")
+    if not n_plus_one:
+        st.success("No N+1 patterns detected.")
+    else:
+        st.dataframe(pd.DataFrame(n_plus_one), use_container_width=True, hide_index=True)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("Reset counters", key=f"{key_prefix}_sql_reset"):
+            reset_stats()
+            st.rerun()
+    with col2:
+        st.download_button(
+            "Download JSON",
+            data=json.dumps({"statements": stats, "n_plus_one": n_plus_one}, indent=2, default=str),
+            file_name="sql_stats.json",
+            mime="application/json",
+            key=f"{key_prefix}_sql_download",
+        )
+    with col3:
+        path = st.text_input("Dump to file", value="sql_stats.json", key=f"{key_prefix}_sql_path")
+        if st.button("Write file", key=f"{key_prefix}_sql_dump"):
+            try:
+                st.success(f"Written to {dump_stats(path)}")
+            except OSError as e:
+                st.error(f"Could not write file: {e}")
+
+
+def render_rerun_diagnostics(key_prefix: str = "diag"):
+    st.markdown("### ⏱ Rerun Profiler")
+
+    if not RENDER_PROFILER_ENABLED:
+        st.info("Render profiler is disabled (RENDER_PROFILER=0).")
+        return
+
+    samples = get_samples()
+    if not samples:
+        st.info("No reruns recorded yet.")
+        return
+
+    st.caption(f"Last {len(samples)} profiled reruns in this server process.")
+    st.dataframe(pd.DataFrame(summarize(samples)), use_container_width=True, hide_index=True)
+
+    with st.expander("Recent samples"):
+        st.dataframe(pd.DataFrame(samples[-200:][::-1]), use_container_width=True, hide_index=True)
+
+    if st.button("Clear samples", key=f"{key_prefix}_rerun_clear"):
+        clear_samples()
+        st.rerun()
+
+
+def render_password_pool_diagnostics():
+    st.markdown("### 🔐 Password Hashing Pool")
+    m = get_pool_metrics()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("In flight", m["in_flight"], help=f"Max seen: {m['max_in_flight']} (limit {m['max_queue']})")
+    c2.metric("Avg wait (ms)", m["avg_wait_ms"], help=f"Max: {m['max_wait_ms']} ms")
+    c3.metric("Verifications", m["verify_calls"], help=f"Failed: {m['verify_failures']}")
+    c4.metric("Rate limited", m["rate_limited"])
+    st.caption(f"{m['workers']} worker processes · {m['hash_calls']} hashes · {m['inline_fallbacks']} inline fallbacks")
@@ -0,0 +1,304 @@
+"""
+Streaming CSV exports.
+
+Rows go straight from the database to a binary file object, chunk by
+chunk, so memory stays flat whatever the export size:
+
+- write_query_csv   server-side (named) cursor + fetchmany, optional
+                    per-row transform
+- copy_query_csv    COPY (query) TO STDOUT, written by the server as CSV
+
+Either can be wrapped with gzip. Destinations:
+
+- export_to_file    a path (gzip when it ends in .gz), written atomically
+- spooled_export    a rewound temp file (in memory up to EXPORT_SPOOL_BYTES,
+                    then on disk); st.download_button takes its .read()
+
+Attempt history by date range (live partitions + archived months, see
+shared.attempt_partitions) streams through export_attempts.
+
+Usage:
+    python -m shared.exports attempts math_attempts --start 2025-01-01 --end 2025-07-01 --out attempts.csv.gz
+    python -m shared.exports query "SELECT * FROM attempt_events" --out events.csv.gz --copy
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import datetime as dt
+import gzip as gzip_lib
+import io
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+SPOOL_BYTES = int(os.getenv("EXPORT_SPOOL_BYTES", str(8 * 1024 * 1024)))
+
+# () -> psycopg2 connection (math_app.db.get_db_connection, engine.raw_connection, ...)
+Connect = Callable[[], Any]
+Transform = Callable[[Sequence[Any]], Sequence[Any]]
+
+
+def _default_connect():
+    from shared.db import engine
+
+    return engine.raw_connection()
+
+
+def sqlalchemy_connect(engine) -> Connect:
+    """Connect callable for another SQLAlchemy engine (e.g. the legacy app's)."""
+    return engine.raw_connection
+
+
+@contextmanager
+def _connection(connect: Optional[Connect]):
+    conn = (connect or _default_connect)()
+    try:
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@contextmanager
+def _maybe_gzip(out, gzip: bool):
+    if not gzip:
+        yield out
+        return
+    zipped = gzip_lib.GzipFile(fileobj=out, mode="wb")
+    try:
+        yield zipped
+    finally:
+        zipped.close()  # leaves `out` open
+
+
+# ------------------------------------------------------------
+# WRITERS
+# ------------------------------------------------------------
+
+def write_rows_csv(
+    out,
+    rows: Iterator[Sequence[Any]],
+    header: Optional[Sequence[str]] = None,
+    gzip: bool = False,
+) -> int:
+    """CSV-encode an iterator of rows onto binary `out`; returns rows written."""
+    n = 0
+    with _maybe_gzip(out, gzip) as raw:
+        text_out = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        try:
+            writer = csv.writer(text_out)
+            if header is not None:
+                writer.writerow(header)
+            for row in rows:
+                writer.writerow(row)
+                n += 1
+            text_out.flush()
+        finally:
+            text_out.detach()
+    return n
+
+
+def iter_query_rows(
+    sql: str,
+    params: Sequence[Any] = (),
+    connect: Optional[Connect] = None,
+    chunk_rows: int = CHUNK_ROWS,
+    on_header: Optional[Callable[[list], None]] = None,
+) -> Iterator[Sequence[Any]]:
+    """Rows of `sql` through a server-side cursor, `chunk_rows` at a time."""
+    with _connection(connect) as conn:
+        with conn.cursor(name="export_stream") as cur:
+            cur.itersize = chunk_rows
+            cur.execute(sql, tuple(params))
+            first = cur.fetchmany(chunk_rows)
+            if on_header is not None:
+                on_header([d[0] for d in cur.description])
+            chunk = first
+            while chunk:
+                yield from chunk
+                chunk = cur.fetchmany(chunk_rows)
+
+
+def write_query_csv(
+    out,
+    sql: str,
+    params: Sequence[Any] = (),
+    *,
+    connect: Optional[Connect] = None,
+    header: Optional[Sequence[str]] = None,
+    transform: Optional[Transform] = None,
+    gzip: bool = False,
+    chunk_rows: int = CHUNK_ROWS,
+) -> int:
+    """
+    Stream a query to CSV. Header defaults to the query's column names;
+    `transform` reshapes each row on the way out. Returns rows written.
+    """
+    columns: list = []
+    rows = iter_query_rows(sql, params, connect, chunk_rows, on_header=columns.extend)
+    if transform is not None:
+        rows = (transform(r) for r in rows)
+
+    # the header is only known once the cursor has run
+    first = next(rows, None)
+    if header is None:
+        header = columns
+    if first is None:
+        return write_rows_csv(out, iter(()), header, gzip)
+    return write_rows_csv(out, _prepend(first, rows), header, gzip)
+
+
+def _prepend(first, rows):
+    yield first
+    yield from rows
+
+
+def copy_query_csv(
+    out,
+    sql: str,
+    params: Sequence[Any] = (),
+    *,
+    connect: Optional[Connect] = None,
+    gzip: bool = False,
+) -> int:
+    """COPY (sql) TO STDOUT as CSV with header; the server formats every value."""
+    with _connection(connect) as conn:
+        with conn.cursor() as cur:
+            query = cur.mogrify(sql.strip().rstrip(";"), tuple(params)).decode("utf-8")
+            with _maybe_gzip(out, gzip) as raw:
+                cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)", raw)
+            return cur.rowcount
+
+
+# ------------------------------------------------------------
+# DESTINATIONS
+# ------------------------------------------------------------
+
+def export_to_file(path: str, writer: Callable[..., int], *args, **kwargs) -> int:
+    """
+    Run `writer(out, *args, **kwargs)` into `path` (gzip if it ends in .gz),
+    via a temp file renamed into place. Returns the writer's row count.
+    """
+    kwargs.setdefault("gzip", path.endswith(".gz"))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".part"
+    try:
+        with open(tmp, "wb") as fh:
+            n = writer(fh, *args, **kwargs)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return n
+
+
+def spooled_export(writer: Callable[..., int], *args, **kwargs):
+    """
+    Run `writer` into a spooled temp file and return it rewound, with the
+    row count as `.rows`. st.download_button only accepts bytes / BytesIO,
+    so UI callers pass `.read()`.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES, mode="w+b")
+    rows = writer(spool, *args, **kwargs)
+    spool.seek(0)
+    spool.rows = rows
+    return spool
+
+
+# ------------------------------------------------------------
+# ATTEMPT HISTORY
+# ------------------------------------------------------------
+
+def export_attempts(
+    out,
+    table: str,
+    start: Optional[dt.date] = None,
+    end: Optional[dt.date] = None,
+    *,
+    gzip: bool = False,
+    chunk_rows: int = CHUNK_ROWS,
+) -> int:
+    """
+    Attempts of `table` with start <= time < end as CSV: live rows through
+    a server-side cursor, then archived months one file at a time.
+    """
+    from shared import attempt_partitions as parts
+    from shared.db import engine
+
+    with engine.connect() as conn:
+        time_col = parts.partition_column(conn, table) or parts.detect_time_column(conn, table)
+        attached = {p["month"] for p in parts.list_partitions(conn, table)}
+
+    where, params = [], []
+    if start is not None:
+        where.append(f'"{time_col}" >= %s')
+        params.append(start)
+    if end is not None:
+        where.append(f'"{time_col}" < %s')
+        params.append(end)
+    sql = f'SELECT * FROM "{table}"' + (" WHERE " + " AND ".join(where) if where else "") + f' ORDER BY "{time_col}"'
+
+    columns: list = []
+    live = iter_query_rows(sql, params, chunk_rows=chunk_rows, on_header=columns.extend)
+    first = next(live, None)  # runs the query, so `columns` is filled
+
+    def rows():
+        if first is not None:
+            yield first
+            yield from live
+        for month, path in sorted(parts.archived_months(table).items()):
+            if month in attached:
+                continue
+            if (start is not None and parts.add_months(month, 1) <= start) or (end is not None and month >= end):
+                continue
+            df = parts.read_columnar(path)
+            df = parts.filter_time_range(df, time_col, start, end).reindex(columns=columns)
+            yield from df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+    return write_rows_csv(out, rows(), columns, gzip)
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+
+def _date(value: str) -> dt.date:
+    return dt.date.fromisoformat(value)
+
+
+def main(argv=None):
+    from shared.attempt_partitions import ATTEMPT_TABLES
+
+    p = argparse.ArgumentParser(description="Streaming CSV exports.")
+    sub = p.add_subparsers(dest="command", required=True)
+    att = sub.add_parser("attempts", help="Attempt history for a date range")
+    att.add_argument("table", choices=list(ATTEMPT_TABLES))
+    att.add_argument("--start", type=_date)
+    att.add_argument("--end", type=_date)
+    att.add_argument("--out", help="Output path (.gz = gzip); default stdout")
+    qry = sub.add_parser("query", help="Any SELECT")
+    qry.add_argument("sql")
+    qry.add_argument("--out", help="Output path (.gz = gzip); default stdout")
+    qry.add_argument("--copy", action="store_true", help="Use COPY ... TO STDOUT")
+    opts = p.parse_args(argv)
+
+    if opts.command == "attempts":
+        writer, args = export_attempts, (opts.table, opts.start, opts.end)
+    else:
+        writer, args = (copy_query_csv if opts.copy else write_query_csv), (opts.sql,)
+
+    if opts.out:
+        n = export_to_file(opts.out, writer, *args)
+        print(f"{n} rows -> {opts.out}", file=sys.stderr)
+    else:
+        writer(sys.stdout.buffer, *args)
+        sys.stdout.buffer.flush()
+
+
+if __name__ == "__main__":
+    main()
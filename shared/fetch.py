@@ -0,0 +1,161 @@
+"""
+Row fetches without pandas, for small queries on per-rerun paths.
+
+pd.read_sql builds a DataFrame (dtype inference, index, block manager)
+even for a one-row aggregate, and reading it back through .iloc adds
+more; on the student question path that overhead is larger than the
+query itself. These return SQLAlchemy Row tuples (index and attribute
+access, e.g. row.headword) straight from the cursor:
+
+    rows(bind, sql, params)     list of Row
+    one(bind, sql, params)      first Row or None
+    scalar(bind, sql, params)   first column of the first row
+    column(bind, sql, params)   first column of every row
+
+`bind` is an Engine or an open Connection. SQL strings are parsed into
+text() clauses once and reused. Keep pd.read_sql for admin and export
+pages, where a DataFrame is what the page shows.
+
+Microbenchmark (in-memory SQLite unless --url is given):
+    python -m shared.fetch bench --calls 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, List, Mapping, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Row
+
+
+@lru_cache(maxsize=512)
+def _clause(sql: str):
+    return text(sql)
+
+
+@contextmanager
+def _connection(bind):
+    if isinstance(bind, Connection):
+        yield bind
+    else:
+        with bind.connect() as conn:
+            yield conn
+
+
+def rows(bind, sql: str, params: Optional[Mapping[str, Any]] = None) -> List[Row]:
+    with _connection(bind) as conn:
+        return conn.execute(_clause(sql), params or {}).all()
+
+
+def one(bind, sql: str, params: Optional[Mapping[str, Any]] = None) -> Optional[Row]:
+    with _connection(bind) as conn:
+        return conn.execute(_clause(sql), params or {}).first()
+
+
+def scalar(bind, sql: str, params: Optional[Mapping[str, Any]] = None) -> Any:
+    with _connection(bind) as conn:
+        return conn.execute(_clause(sql), params or {}).scalar()
+
+
+def column(bind, sql: str, params: Optional[Mapping[str, Any]] = None) -> List[Any]:
+    with _connection(bind) as conn:
+        return conn.execute(_clause(sql), params or {}).scalars().all()
+
+
+# ------------------------------------------------------------
+# MICROBENCHMARK
+# ------------------------------------------------------------
+
+# recent_stats / lesson_progress shapes: a few rows, and one aggregate row
+_BENCH_RECENT = """
+    SELECT is_correct, response_ms
+    FROM attempts
+    WHERE user_id=:u AND course_id=:c AND lesson_id=:l
+    ORDER BY id DESC LIMIT :n
+"""
+_BENCH_TOTALS = """
+    SELECT COUNT(*) AS total,
+           SUM(CASE WHEN is_correct THEN 1 ELSE 0 END) AS correct
+    FROM attempts
+    WHERE user_id=:u AND lesson_id=:l
+"""
+
+
+def _bench_engine(url: Optional[str]):
+    if url:
+        return create_engine(url)
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE attempts (id INTEGER PRIMARY KEY, user_id INT, course_id INT, "
+            "lesson_id INT, is_correct INT, response_ms INT)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO attempts (user_id, course_id, lesson_id, is_correct, response_ms) "
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 5000) "
+            "SELECT i % 50, 1, i % 10, i % 3 > 0, 2000 + i % 7000 FROM n"
+        )
+        conn.exec_driver_sql("CREATE INDEX attempts_ucl ON attempts (user_id, course_id, lesson_id)")
+    return engine
+
+
+def _time(fn, calls: int) -> float:
+    fn()  # warm up (connection pool, compiled cache)
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def bench(calls: int = 2000, url: Optional[str] = None) -> List[tuple]:
+    """[(case, pandas µs/call, fetch µs/call)] on the same engine and queries."""
+    import pandas as pd
+
+    engine = _bench_engine(url)
+    p_recent = {"u": 7, "c": 1, "l": 7, "n": 10}
+    p_totals = {"u": 7, "l": 7}
+
+    def recent_pandas():
+        df = pd.read_sql(text(_BENCH_RECENT), con=engine, params=p_recent)
+        return float(df["is_correct"].mean()), float(df["response_ms"].mean())
+
+    def recent_fetch():
+        got = rows(engine, _BENCH_RECENT, p_recent)
+        n = len(got) or 1
+        return sum(r[0] for r in got) / n, sum(r[1] for r in got) / n
+
+    def totals_pandas():
+        row = pd.read_sql(text(_BENCH_TOTALS), con=engine, params=p_totals).iloc[0]
+        return int(row["total"]), int(row["correct"] or 0)
+
+    def totals_fetch():
+        row = one(engine, _BENCH_TOTALS, p_totals)
+        return int(row.total), int(row.correct or 0)
+
+    if url is None:
+        assert recent_pandas() == recent_fetch() and totals_pandas() == totals_fetch()
+    return [
+        ("recent rows (10)", _time(recent_pandas, calls), _time(recent_fetch, calls)),
+        ("aggregate (1 row)", _time(totals_pandas, calls), _time(totals_fetch, calls)),
+    ]
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="pd.read_sql vs tuple fetch.")
+    sub = p.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("bench", help="Per-call overhead of both paths")
+    b.add_argument("--calls", type=int, default=2000)
+    b.add_argument("--url", help="SQLAlchemy URL with an attempts table (default: in-memory SQLite)")
+    opts = p.parse_args(argv)
+
+    print(f"{'case':<20}{'read_sql µs':>14}{'fetch µs':>12}{'saved µs':>12}")
+    for case, slow, fast in bench(opts.calls, opts.url):
+        print(f"{case:<20}{slow:>14.1f}{fast:>12.1f}{slow - fast:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+XP leaderboards for the synonym (legacy) app.
+
+Totals are never summed from word_stats and achievements at read time:
+
+    gamification_summary.xp_total   all-time XP, a generated column over
+                                    the summary row legacy_app keeps
+                                    current on every answer and badge
+    xp_weekly (user_id, week_start) XP earned per ISO week (Monday),
+                                    bumped in the same transactions
+
+Both carry (xp DESC, user_id) indexes, so a global top-K is an index scan
+of K rows and a user's rank counts only the users above them. Class
+boards rank the class_students of one class, which is bounded by class
+size whatever the number of users.
+
+    top(bind, k, weekly=False)             global top-K
+    rank_of(bind, user_id, weekly=False)   one user's global rank
+    class_standings(bind, class_id, k, user_id=None, weekly=False)
+                                           class top-K, plus the user's
+                                           own row when outside it
+
+Ties share a rank (1, 2, 2, 4). Only student accounts are ranked.
+Same DDL as db/migrations/202610_xp_leaderboards.sql; legacy_app applies
+SCHEMA on start-up unless is_installed() finds it already in place.
+
+Usage:
+    python -m shared.leaderboards top --k 20 [--weekly]
+    python -m shared.leaderboards class 3 --k 10 [--weekly]
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Row
+
+from shared import fetch
+
+SCHEMA = (
+    """
+    ALTER TABLE gamification_summary
+        ADD COLUMN IF NOT EXISTS xp_total INTEGER
+        GENERATED ALWAYS AS (xp_from_words + xp_from_badges) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_gamification_summary_xp
+        ON gamification_summary (xp_total DESC, user_id)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS xp_weekly (
+      user_id    INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+      week_start DATE    NOT NULL,
+      xp         INTEGER NOT NULL DEFAULT 0,
+      PRIMARY KEY (user_id, week_start)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_xp_weekly_rank
+        ON xp_weekly (week_start, xp DESC, user_id)
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_class_students_user ON class_students (user_id)",
+)
+
+# attempts.ts and CURRENT_DATE agree on the day, so weeks line up with
+# the login streak in gamification_summary
+_THIS_WEEK = "date_trunc('week', CURRENT_DATE)::date"
+
+_ADD_WEEKLY_SQL = f"""
+    INSERT INTO xp_weekly (user_id, week_start, xp)
+    VALUES (:u, {_THIS_WEEK}, :xp)
+    ON CONFLICT (user_id, week_start) DO UPDATE SET xp = xp_weekly.xp + EXCLUDED.xp
+"""
+
+# (table alias, xp column, extra join condition) per board
+_SOURCES = {
+    False: ("gamification_summary g", "g.xp_total", ""),
+    True: ("xp_weekly g", "g.xp", f" AND g.week_start = {_THIS_WEEK}"),
+}
+
+
+# each index exists only once the column / table under it does
+_INSTALLED_SQL = """
+    SELECT to_regclass('idx_gamification_summary_xp') IS NOT NULL
+       AND to_regclass('idx_xp_weekly_rank') IS NOT NULL
+       AND to_regclass('idx_class_students_user') IS NOT NULL
+"""
+
+
+def is_installed(conn) -> bool:
+    return bool(conn.execute(text(_INSTALLED_SQL)).scalar())
+
+
+def ensure_schema(engine) -> bool:
+    """
+    Apply SCHEMA unless the catalog already has it; True when it ran. The
+    ALTER TABLE takes an ACCESS EXCLUSIVE lock even when the column
+    exists, so it must not run on every rerun.
+    """
+    with engine.begin() as conn:
+        if is_installed(conn):
+            return False
+        for stmt in SCHEMA:
+            conn.exec_driver_sql(stmt)
+    return True
+
+
+def add_weekly_xp(conn, user_id: int, xp: int) -> None:
+    """Credit XP to this week's row; call inside the transaction that earned it."""
+    if int(xp) > 0:
+        conn.execute(text(_ADD_WEEKLY_SQL), {"u": int(user_id), "xp": int(xp)})
+
+
+def top(bind, k: int = 10, *, weekly: bool = False) -> List[Row]:
+    """Rows (rank, user_id, name, xp), best first, students with XP only."""
+    table, xp, cond = _SOURCES[weekly]
+    return fetch.rows(
+        bind,
+        f"""
+        SELECT RANK() OVER (ORDER BY xp DESC) AS rank, user_id, name, xp
+        FROM (
+            SELECT g.user_id, u.name, {xp} AS xp
+            FROM {table}
+            JOIN users u ON u.user_id = g.user_id AND u.role = 'student'
+            WHERE {xp} > 0{cond}
+            ORDER BY {xp} DESC, g.user_id
+            LIMIT :k
+        ) t
+        ORDER BY xp DESC, user_id
+        """,
+        {"k": int(k)},
+    )
+
+
+def rank_of(bind, user_id: int, *, weekly: bool = False) -> Optional[Row]:
+    """Row (rank, xp) on the global board, or None without XP there."""
+    table, xp, cond = _SOURCES[weekly]
+    return fetch.one(
+        bind,
+        f"""
+        SELECT 1 + (SELECT COUNT(*)
+                    FROM {table}
+                    JOIN users u ON u.user_id = g.user_id AND u.role = 'student'
+                    WHERE {xp} > me.xp{cond}) AS rank,
+               me.xp
+        FROM (SELECT {xp} AS xp FROM {table} WHERE g.user_id = :u{cond}) me
+        WHERE me.xp > 0
+        """,
+        {"u": int(user_id)},
+    )
+
+
+def class_standings(
+    bind, class_id: int, k: int = 10, *, user_id: Optional[int] = None, weekly: bool = False
+) -> List[Row]:
+    """
+    Rows (rank, user_id, name, xp) for the class's top k, then the row
+    for user_id if it ranks below them. Members without XP rank last at 0.
+    """
+    table, xp, cond = _SOURCES[weekly]
+    return fetch.rows(
+        bind,
+        f"""
+        SELECT rank, user_id, name, xp
+        FROM (
+            SELECT RANK() OVER (ORDER BY COALESCE({xp}, 0) DESC) AS rank,
+                   ROW_NUMBER() OVER (ORDER BY COALESCE({xp}, 0) DESC, u.name, u.user_id) AS pos,
+                   u.user_id, u.name, COALESCE({xp}, 0) AS xp
+            FROM class_students cs
+            JOIN users u ON u.user_id = cs.user_id AND u.role = 'student'
+            LEFT JOIN {table} ON g.user_id = cs.user_id{cond}
+            WHERE cs.class_id = :c
+        ) t
+        WHERE pos <= :k OR user_id = :u
+        ORDER BY pos
+        """,
+        {"c": int(class_id), "k": int(k), "u": -1 if user_id is None else int(user_id)},
+    )
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Synonym app XP leaderboards.")
+    sub = p.add_subparsers(dest="command", required=True)
+    t = sub.add_parser("top", help="Global board")
+    t.add_argument("--k", type=int, default=10)
+    t.add_argument("--weekly", action="store_true", help="This week's XP instead of all-time")
+    c = sub.add_parser("class", help="One class's board")
+    c.add_argument("class_id", type=int)
+    c.add_argument("--k", type=int, default=10)
+    c.add_argument("--weekly", action="store_true", help="This week's XP instead of all-time")
+    opts = p.parse_args(argv)
+
+    from shared.db import engine
+
+    if opts.command == "top":
+        board = top(engine, opts.k, weekly=opts.weekly)
+    else:
+        board = class_standings(engine, opts.class_id, opts.k, weekly=opts.weekly)
+    for row in board:
+        print(f"{row.rank:>4}  {row.xp:>7} XP  {row.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+XP level bands for the synonym (legacy) app's gamification.
+
+Kept outside legacy_app.py so batch jobs (shared.class_reports) can
+label levels without importing the Streamlit script.
+"""
+
+from __future__ import annotations
+
+LEVEL_BANDS: list[dict[str, object]] = [
+    {"level": 1, "min": 0,   "max": 99,  "title": "Learner",   "color": "#22c55e"},  # Green
+    {"level": 2, "min": 100, "max": 249, "title": "Achiever",  "color": "#f97316"},  # Orange
+    {"level": 3, "min": 250, "max": 499, "title": "Explorer",  "color": "#3b82f6"},  # Blue
+    {"level": 4, "min": 500, "max": 999, "title": "Champion",  "color": "#8b5cf6"},  # Purple
+    {"level": 5, "min": 1000, "max": None, "title": "Legend", "color": "#fbbf24"},  # Gold
+]
+
+
+def level_for_xp(xp_total: int):
+    xp_total = int(xp_total or 0)
+    for band in LEVEL_BANDS:
+        upper = band["max"]
+        if upper is None or xp_total <= upper:
+            return band
+    return LEVEL_BANDS[-1]
+
+
+def next_level_band(current_band: dict | None):
+    if not current_band:
+        return None
+    for idx, band in enumerate(LEVEL_BANDS):
+        if band["level"] == current_band["level"]:
+            return LEVEL_BANDS[idx + 1] if idx + 1 < len(LEVEL_BANDS) else None
+    return None
+
+
+def level_sql(xp_expr: str) -> str:
+    """SQL CASE expression giving level_for_xp(xp_expr)["level"]."""
+    whens = " ".join(
+        f"WHEN {xp_expr} <= {band['max']} THEN {band['level']}"
+        for band in LEVEL_BANDS
+        if band["max"] is not None
+    )
+    return f"(CASE {whens} ELSE {LEVEL_BANDS[-1]['level']} END)"
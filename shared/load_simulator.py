@@ -0,0 +1,356 @@
+"""
+Classroom load simulator.
+
+Drives the service layer (no Streamlit UI) with many concurrent virtual
+students so we can see how login, lesson loading, answer submission and
+dashboard reads behave when a whole class starts at once.
+
+Usage:
+    python -m shared.load_simulator --accounts students.csv --subject spelling \
+        --course-id 3 --lesson-id 12 --students 60 --questions 20
+
+students.csv needs ``email,password`` columns (optionally ``user_id``).
+Students log in through the spelling student app's check_login (one
+users table for every subject).
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+SUBJECTS = ("spelling", "math", "grammar")
+
+
+# ------------------------------------------------------------
+# FAKE STREAMLIT (services take `st` and only touch session_state)
+# ------------------------------------------------------------
+
+class _SessionState(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        self.pop(name, None)
+
+
+class FakeStreamlit:
+    """Stand-in for the `st` module passed to service functions."""
+
+    def __init__(self):
+        self.session_state = _SessionState()
+
+
+# ------------------------------------------------------------
+# THINK TIME
+# ------------------------------------------------------------
+
+def make_think_time(kind: str, mean_s: float) -> Callable[[random.Random], float]:
+    """
+    Returns a sampler for the pause between two student actions.
+
+    kind: fixed | uniform | exponential | lognormal
+    """
+    if mean_s <= 0:
+        return lambda rng: 0.0
+    if kind == "fixed":
+        return lambda rng: mean_s
+    if kind == "uniform":
+        return lambda rng: rng.uniform(0, 2 * mean_s)
+    if kind == "exponential":
+        return lambda rng: rng.expovariate(1.0 / mean_s)
+    if kind == "lognormal":
+        # sigma=0.6 gives the long right tail real students have
+        sigma = 0.6
+        mu = math.log(mean_s) - sigma * sigma / 2
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown think-time distribution: {kind}")
+
+
+# ------------------------------------------------------------
+# METRICS
+# ------------------------------------------------------------
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class LoadStats:
+    """Thread-safe latency recorder, keyed by operation name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, List[float]] = {}
+        self._errors: Dict[str, int] = {}
+        self._last_error: Dict[str, str] = {}
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+
+    def record(self, op: str, seconds: float, error: Optional[BaseException] = None):
+        with self._lock:
+            self._latencies.setdefault(op, []).append(seconds)
+            if error is not None:
+                self._errors[op] = self._errors.get(op, 0) + 1
+                self._last_error[op] = f"{type(error).__name__}: {error}"
+
+    def summary(self) -> List[Dict[str, Any]]:
+        wall = (self.finished_at or time.perf_counter()) - self.started_at
+        rows: List[Dict[str, Any]] = []
+        with self._lock:
+            for op in sorted(self._latencies):
+                values = sorted(self._latencies[op])
+                count = len(values)
+                rows.append(
+                    {
+                        "operation": op,
+                        "count": count,
+                        "errors": self._errors.get(op, 0),
+                        "throughput_per_s": round(count / wall, 2) if wall > 0 else 0.0,
+                        "p50_ms": round(_percentile(values, 50) * 1000, 1),
+                        "p95_ms": round(_percentile(values, 95) * 1000, 1),
+                        "p99_ms": round(_percentile(values, 99) * 1000, 1),
+                        "max_ms": round(values[-1] * 1000, 1) if values else 0.0,
+                        "last_error": self._last_error.get(op, ""),
+                    }
+                )
+        return rows
+
+
+def _timed(stats: LoadStats, op: str, fn: Callable, *args, **kwargs):
+    t0 = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as exc:
+        stats.record(op, time.perf_counter() - t0, exc)
+        return None
+    stats.record(op, time.perf_counter() - t0)
+    return result
+
+
+# ------------------------------------------------------------
+# OPERATIONS (imported lazily so one broken app does not stop the run)
+# ------------------------------------------------------------
+
+def _misspell(word: str, rng: random.Random) -> str:
+    if len(word) < 2:
+        return word + "x"
+    i = rng.randrange(len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def _run_spelling(st, stats, rng, account, opts, think):
+    from spelling_app.services.spelling_service import load_lessons_progress, record_attempt
+    from spelling_clean_app import get_words_for_course
+
+    user_id = st.session_state.user_id
+    words = _timed(stats, "load_lesson", get_words_for_course, opts.course_id) or []
+    for word_row in words[: opts.questions]:
+        time.sleep(think(rng))
+        word = str(word_row["word"])
+        answer = word if rng.random() < opts.p_correct else _misspell(word, rng)
+        _timed(
+            stats,
+            "record_spelling_attempt",
+            record_attempt,
+            user_id,
+            opts.course_id,
+            opts.lesson_id,
+            int(word_row["word_id"]),
+            answer,
+            answer == word,
+        )
+    _timed(stats, "dashboard", load_lessons_progress, user_id, [opts.lesson_id])
+
+
+def _run_math(st, stats, rng, account, opts, think):
+    from math_app.repository.math_practice_repo import (
+        get_practice_progress,
+        get_questions_for_lesson,
+        record_practice_attempt,
+    )
+
+    user_id = st.session_state.user_id
+    questions = _timed(stats, "load_lesson", get_questions_for_lesson, opts.lesson_id) or []
+    _timed(stats, "practice_progress", get_practice_progress, user_id, opts.lesson_id)
+    for question in questions[: opts.questions]:
+        time.sleep(think(rng))
+        correct = (question.get("correct_option") or "A").upper()
+        choice = correct if rng.random() < opts.p_correct else rng.choice([o for o in "ABCD" if o != correct])
+        _timed(
+            stats,
+            "record_practice_attempt",
+            record_practice_attempt,
+            user_id,
+            opts.lesson_id,
+            question["question_id"],
+            choice,
+            choice == correct,
+        )
+
+
+def _run_grammar(st, stats, rng, account, opts, think):
+    from grammar_app.services.grammar_service import (
+        get_grammar_lesson_questions,
+        get_student_grammar_progress,
+        record_grammar_attempt,
+    )
+
+    user_id = st.session_state.user_id
+    questions = _timed(stats, "load_lesson", get_grammar_lesson_questions, opts.lesson_id) or []
+    for question in questions[: opts.questions]:
+        time.sleep(think(rng))
+        correct = str(question.get("correct_option") or "A")
+        choice = correct if rng.random() < opts.p_correct else "?"
+        _timed(
+            stats,
+            "record_grammar_attempt",
+            record_grammar_attempt,
+            user_id,
+            opts.course_id,
+            opts.lesson_id,
+            int(question["question_id"]),
+            choice,
+        )
+    _timed(stats, "dashboard", get_student_grammar_progress, user_id, opts.course_id)
+
+
+SCENARIOS = {
+    "spelling": _run_spelling,
+    "math": _run_math,
+    "grammar": _run_grammar,
+}
+
+
+def _check_login(st, email: str, password: str) -> bool:
+    from spelling_clean_app import check_login
+
+    return check_login(st, email, password)
+
+
+def _virtual_student(
+    index: int,
+    account: Dict[str, str],
+    opts,
+    stats: LoadStats,
+    start_gate: threading.Event,
+    scenarios: Dict[str, Callable],
+    login: Callable,
+):
+    rng = random.Random((opts.seed or 0) + index)
+    think = make_think_time(opts.think, opts.think_mean)
+    st = FakeStreamlit()
+
+    start_gate.wait()
+    if opts.ramp_up > 0:
+        time.sleep(rng.uniform(0, opts.ramp_up))
+
+    ok = _timed(stats, "login", login, st, account["email"], account["password"])
+    if not ok:
+        if account.get("user_id"):
+            st.session_state.user_id = int(account["user_id"])
+        else:
+            return
+    scenarios[opts.subject](st, stats, rng, account, opts, think)
+
+
+# ------------------------------------------------------------
+# RUNNER
+# ------------------------------------------------------------
+
+def load_accounts(path: str) -> List[Dict[str, str]]:
+    with open(path, newline="", encoding="utf-8") as fh:
+        rows = [
+            {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+            for row in csv.DictReader(fh)
+        ]
+    return [r for r in rows if r.get("email") and r.get("password")]
+
+
+def run_simulation(
+    accounts: List[Dict[str, str]],
+    opts,
+    *,
+    scenarios: Optional[Dict[str, Callable]] = None,
+    login: Optional[Callable] = None,
+) -> LoadStats:
+    """
+    Runs `opts.students` virtual students concurrently (accounts are reused
+    round-robin if there are fewer accounts than students). `scenarios`
+    and `login` default to SCENARIOS and the spelling app's check_login.
+    """
+    if not accounts:
+        raise ValueError("No accounts to simulate with")
+
+    scenarios = scenarios or SCENARIOS
+    login = login or _check_login
+    stats = LoadStats()
+    start_gate = threading.Event()
+    with ThreadPoolExecutor(max_workers=opts.students) as pool:
+        futures = [
+            pool.submit(
+                _virtual_student, i, accounts[i % len(accounts)], opts, stats, start_gate, scenarios, login
+            )
+            for i in range(opts.students)
+        ]
+        stats.started_at = time.perf_counter()
+        start_gate.set()
+        for f in futures:
+            exc = f.exception()
+            if exc is not None:
+                stats.record("student_crash", 0.0, exc)
+    stats.finished_at = time.perf_counter()
+    return stats
+
+
+def format_report(rows: List[Dict[str, Any]]) -> str:
+    header = f"{'operation':<28}{'count':>7}{'err':>6}{'ops/s':>9}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'maxms':>9}"
+    lines = [header, "-" * len(header)]
+    for r in rows:
+        lines.append(
+            f"{r['operation']:<28}{r['count']:>7}{r['errors']:>6}{r['throughput_per_s']:>9}"
+            f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['max_ms']:>9}"
+        )
+        if r["last_error"]:
+            lines.append(f"    last error: {r['last_error']}")
+    return "\n".join(lines)
+
+
+def _parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Simulate a class of students hitting the service layer.")
+    p.add_argument("--accounts", required=True, help="CSV with email,password[,user_id]")
+    p.add_argument("--subject", choices=SUBJECTS, default="spelling")
+    p.add_argument("--lesson-id", type=int, required=True)
+    p.add_argument("--course-id", type=int, default=0, help="Needed for spelling and grammar")
+    p.add_argument("--students", type=int, default=30)
+    p.add_argument("--questions", type=int, default=10)
+    p.add_argument("--p-correct", type=float, default=0.7)
+    p.add_argument("--think", choices=("fixed", "uniform", "exponential", "lognormal"), default="lognormal")
+    p.add_argument("--think-mean", type=float, default=4.0, help="Mean seconds between actions")
+    p.add_argument("--ramp-up", type=float, default=0.0, help="Spread student starts over N seconds")
+    p.add_argument("--seed", type=int, default=None)
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    opts = _parse_args(argv)
+    stats = run_simulation(load_accounts(opts.accounts), opts)
+    print(format_report(stats.summary()))
+
+
+if __name__ == "__main__":
+    main()
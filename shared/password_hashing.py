@@ -0,0 +1,217 @@
+"""
+Shared bcrypt hashing / verification, offloaded to a bounded process pool.
+
+bcrypt is deliberately CPU-heavy. Running it in the Streamlit script
+thread means a class logging in at once stalls every other session in the
+process. All login and registration paths go through here instead:
+
+- hashing and verification run in worker processes (GIL released while waiting)
+- queue depth and timings are tracked for the diagnostics page
+- verification is rate limited per email (sliding window); a rate-limited
+  email raises RateLimited so callers can say "too many attempts" instead
+  of "wrong password"
+
+Env:
+    PASSWORD_POOL_WORKERS       worker processes (default: min(4, cpu count))
+    PASSWORD_POOL_MAX_QUEUE     max in-flight jobs; further callers wait (default 64)
+    LOGIN_RATE_LIMIT            failed attempts per email per window (default 10)
+    LOGIN_RATE_WINDOW_SECONDS   window length (default 300)
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+import bcrypt
+
+POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", "64"))
+RATE_LIMIT = int(os.getenv("LOGIN_RATE_LIMIT", "10"))
+RATE_WINDOW_SECONDS = float(os.getenv("LOGIN_RATE_WINDOW_SECONDS", "300"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(MAX_QUEUE)
+
+_metrics_lock = threading.Lock()
+_metrics: Dict[str, Any] = {
+    "in_flight": 0,
+    "max_in_flight": 0,
+    "hash_calls": 0,
+    "verify_calls": 0,
+    "verify_failures": 0,
+    "rate_limited": 0,
+    "inline_fallbacks": 0,
+    "total_wait_s": 0.0,
+    "max_wait_s": 0.0,
+}
+
+_attempts_lock = threading.Lock()
+_attempts: Dict[str, deque] = {}
+
+
+class RateLimited(Exception):
+    """The email has used up its failed login attempts for the current window."""
+
+
+# ------------------------------------------------------------
+# WORKER FUNCTIONS (top level so they pickle)
+# ------------------------------------------------------------
+
+def _hash_worker(password: str) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+
+def _verify_worker(password: str, stored_hash: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), stored_hash.encode("utf-8"))
+    except ValueError:
+        # empty / malformed hash
+        return False
+
+
+# ------------------------------------------------------------
+# POOL
+# ------------------------------------------------------------
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if POOL_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: forking copies the Streamlit server's threads
+            # and locks (DB pools, the cache listener) into every worker
+            _pool = ProcessPoolExecutor(
+                max_workers=POOL_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _run(fn, *args):
+    """Run fn in the pool, falling back to the calling thread if the pool is unavailable."""
+    t0 = time.perf_counter()
+    _slots.acquire()
+    with _metrics_lock:
+        _metrics["in_flight"] += 1
+        _metrics["max_in_flight"] = max(_metrics["max_in_flight"], _metrics["in_flight"])
+    try:
+        pool = _get_pool()
+        if pool is None:
+            return fn(*args)
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            _reset_pool()
+            with _metrics_lock:
+                _metrics["inline_fallbacks"] += 1
+            return fn(*args)
+    finally:
+        elapsed = time.perf_counter() - t0
+        with _metrics_lock:
+            _metrics["in_flight"] -= 1
+            _metrics["total_wait_s"] += elapsed
+            _metrics["max_wait_s"] = max(_metrics["max_wait_s"], elapsed)
+        _slots.release()
+
+
+# ------------------------------------------------------------
+# RATE LIMITING
+# ------------------------------------------------------------
+
+def is_rate_limited(email: Optional[str]) -> bool:
+    """True if `email` has used up its failed attempts for the current window."""
+    if not email or RATE_LIMIT <= 0:
+        return False
+    key = email.strip().lower()
+    now = time.monotonic()
+    with _attempts_lock:
+        window = _attempts.get(key)
+        if not window:
+            return False
+        while window and now - window[0] > RATE_WINDOW_SECONDS:
+            window.popleft()
+        return len(window) >= RATE_LIMIT
+
+
+def _note_attempt(email: Optional[str]) -> None:
+    if not email or RATE_LIMIT <= 0:
+        return
+    with _attempts_lock:
+        _attempts.setdefault(email.strip().lower(), deque()).append(time.monotonic())
+
+
+def _clear_attempts(email: Optional[str]) -> None:
+    if not email:
+        return
+    with _attempts_lock:
+        _attempts.pop(email.strip().lower(), None)
+
+
+# ------------------------------------------------------------
+# PUBLIC API
+# ------------------------------------------------------------
+
+def hash_password(password: str) -> str:
+    """bcrypt hash (same $2b$ format as passlib's bcrypt.hash)."""
+    with _metrics_lock:
+        _metrics["hash_calls"] += 1
+    return _run(_hash_worker, password or "")
+
+
+def verify_password(password: str, stored_hash: Any, email: Optional[str] = None) -> bool:
+    """
+    Check `password` against `stored_hash` (str or bytes).
+
+    When `email` is given, failed attempts count towards the per-email rate
+    limit and a rate-limited email raises RateLimited without hashing.
+    A successful verification resets the email's counter.
+    """
+    with _metrics_lock:
+        _metrics["verify_calls"] += 1
+
+    if is_rate_limited(email):
+        with _metrics_lock:
+            _metrics["rate_limited"] += 1
+        raise RateLimited(email)
+
+    if isinstance(stored_hash, (bytes, bytearray)):
+        stored_hash = stored_hash.decode("utf-8")
+    if not stored_hash:
+        _note_attempt(email)
+        return False
+
+    ok = _run(_verify_worker, password or "", str(stored_hash))
+    if ok:
+        _clear_attempts(email)
+    else:
+        _note_attempt(email)
+        with _metrics_lock:
+            _metrics["verify_failures"] += 1
+    return ok
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    with _metrics_lock:
+        m = dict(_metrics)
+    jobs = m["hash_calls"] + m["verify_calls"] - m["rate_limited"]
+    m["avg_wait_ms"] = round(m.pop("total_wait_s") * 1000 / jobs, 2) if jobs else 0.0
+    m["max_wait_ms"] = round(m.pop("max_wait_s") * 1000, 2)
+    m["workers"] = POOL_WORKERS
+    m["max_queue"] = MAX_QUEUE
+    return m
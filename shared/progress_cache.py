@@ -0,0 +1,101 @@
+"""
+Per-session cache of lesson progress.
+
+Lesson list pages show progress for every lesson of a course on each
+rerun. A student's progress only changes when that student answers, so
+results are kept in session_state per (subject, user) and dropped when
+an attempt is written: the lesson's entry, or all of the user's when an
+item can count towards several lessons.
+Missing lessons are loaded together in one batched call.
+
+Outside a Streamlit script run (CLI jobs, load simulator threads) nothing
+is cached and every read goes to the loader.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+SESSION_KEY = "_lesson_progress_cache"
+
+# loader(user_id, lesson_ids) -> {lesson_id: progress}
+Loader = Callable[[int, List[int]], Dict[int, Any]]
+
+
+def _session_state():
+    try:
+        import streamlit as st
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except Exception:
+        return None
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    return st.session_state
+
+
+def _entry(subject: str, user_id: int, create: bool) -> Optional[Dict[int, Any]]:
+    session_state = _session_state()
+    if session_state is None:
+        return None
+    cache = session_state.get(SESSION_KEY)
+    if cache is None:
+        if not create:
+            return None
+        cache = session_state[SESSION_KEY] = {}
+    key = (subject, int(user_id))
+    if key not in cache and create:
+        cache[key] = {}
+    return cache.get(key)
+
+
+def get_lessons_progress(
+    subject: str,
+    user_id: int,
+    lesson_ids: Iterable[Any],
+    loader: Loader,
+) -> Dict[int, Any]:
+    """Progress for `lesson_ids`, loading only the lessons not cached yet."""
+    ids = list(dict.fromkeys(int(lid) for lid in lesson_ids))
+    if not ids:
+        return {}
+
+    entry = _entry(subject, user_id, create=True)
+    if entry is None:
+        return loader(int(user_id), ids)
+
+    missing = [lid for lid in ids if lid not in entry]
+    if missing:
+        entry.update(loader(int(user_id), missing))
+    return {lid: entry[lid] for lid in ids if lid in entry}
+
+
+def invalidate_lesson(subject: str, user_id: Any, lesson_id: Any) -> None:
+    """Call after writing an attempt for this user and lesson."""
+    if user_id is None or lesson_id is None:
+        return
+    entry = _entry(subject, int(user_id), create=False)
+    if entry is not None:
+        entry.pop(int(lesson_id), None)
+
+
+def invalidate_user(subject: str, user_id: Any) -> None:
+    """Call after writing an attempt that may count towards any of the user's lessons."""
+    if user_id is None:
+        return
+    session_state = _session_state()
+    if session_state is None:
+        return
+    session_state.get(SESSION_KEY, {}).pop((subject, int(user_id)), None)
+
+
+def clear(subject: Optional[str] = None) -> None:
+    """Drop cached progress for one subject (or all) in this session."""
+    session_state = _session_state()
+    if session_state is None or SESSION_KEY not in session_state:
+        return
+    if subject is None:
+        del session_state[SESSION_KEY]
+        return
+    cache = session_state[SESSION_KEY]
+    for key in [k for k in cache if k[0] == subject]:
+        del cache[key]
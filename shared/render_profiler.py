@@ -0,0 +1,209 @@
+"""
+Per-rerun render profiler for Streamlit page and router functions.
+
+Each profiled rerun records wall time, DB calls and rows fetched, tagged
+by page and user role. Samples are kept in a bounded in-memory ring per
+process.
+
+The session_state size means pickling every value, so it is only taken on
+one outer rerun in RENDER_PROFILER_SIZE_EVERY (default 50; 0 turns it
+off) and never for nested scopes; other samples have session_bytes None.
+
+Disable with RENDER_PROFILER=0.
+"""
+
+from __future__ import annotations
+
+import functools
+import itertools
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from shared.db_instrumentation import current_scope, rerun_scope
+
+ENABLED = os.getenv("RENDER_PROFILER", "1") != "0"
+RING_SIZE = int(os.getenv("RENDER_PROFILER_RING", "2000"))
+SIZE_EVERY = int(os.getenv("RENDER_PROFILER_SIZE_EVERY", "50"))
+
+_lock = threading.Lock()
+_samples: deque = deque(maxlen=RING_SIZE)
+_reruns = itertools.count()
+
+
+# ------------------------------------------------------------
+# SESSION HELPERS
+# ------------------------------------------------------------
+
+def _session_state():
+    try:
+        import streamlit as st
+
+        return st.session_state
+    except Exception:
+        return None
+
+
+def _infer_role(session_state) -> str:
+    if session_state is None:
+        return "unknown"
+    try:
+        auth = session_state.get("auth")
+        if isinstance(auth, dict) and auth.get("role"):
+            return str(auth["role"])
+        if session_state.get("is_logged_in") or session_state.get("student_id"):
+            return "student"
+    except Exception:
+        pass
+    return "anonymous"
+
+
+def _value_size(value: Any) -> int:
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def session_state_size(session_state=None) -> Dict[str, int]:
+    """Approximate serialized size of session_state: (bytes, keys)."""
+    session_state = session_state if session_state is not None else _session_state()
+    if session_state is None:
+        return {"bytes": 0, "keys": 0}
+    try:
+        items = list(session_state.items())
+    except Exception:
+        return {"bytes": 0, "keys": 0}
+    return {"bytes": sum(_value_size(v) for _, v in items), "keys": len(items)}
+
+
+def _measure_size(nested: bool) -> bool:
+    if nested or SIZE_EVERY <= 0:
+        return False
+    return next(_reruns) % SIZE_EVERY == 0
+
+
+# ------------------------------------------------------------
+# PROFILING
+# ------------------------------------------------------------
+
+@contextmanager
+def profiled_rerun(page: str, role: Optional[str] = None):
+    """
+    Profile one rerun of `page`. Nested calls inside an already profiled
+    rerun are recorded too, using the DB counters of the outer scope.
+    """
+    if not ENABLED:
+        yield None
+        return
+
+    outer = current_scope()
+    scope_cm = nullcontext(outer) if outer is not None else rerun_scope(page)
+    with scope_cm as scope:
+        q0, r0, d0 = scope["queries"], scope["rows"], scope["db_seconds"]
+        t0 = time.perf_counter()
+        error = None
+        try:
+            yield scope
+        except Exception as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            wall = time.perf_counter() - t0
+            session_state = _session_state()
+            size = (
+                session_state_size(session_state)
+                if _measure_size(outer is not None)
+                else {"bytes": None, "keys": None}
+            )
+            sample = {
+                "at": datetime.utcnow().isoformat(timespec="seconds"),
+                "page": page,
+                "role": role or _infer_role(session_state),
+                "wall_ms": round(wall * 1000, 2),
+                "db_calls": scope["queries"] - q0,
+                "db_ms": round((scope["db_seconds"] - d0) * 1000, 2),
+                "rows": scope["rows"] - r0,
+                "session_bytes": size["bytes"],
+                "session_keys": size["keys"],
+                "nested": outer is not None,
+                "error": error,
+            }
+            with _lock:
+                _samples.append(sample)
+
+
+def profile_rerun(page: Optional[str] = None, role: Optional[str] = None):
+    """Decorator form of profiled_rerun; page defaults to module.function."""
+
+    def decorator(fn: Callable):
+        page_name = page or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with profiled_rerun(page_name, role):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ------------------------------------------------------------
+# READ SIDE
+# ------------------------------------------------------------
+
+def get_samples() -> List[Dict[str, Any]]:
+    with _lock:
+        return list(_samples)
+
+
+def clear_samples() -> None:
+    with _lock:
+        _samples.clear()
+
+
+def _pct(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+def summarize(samples: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Percentiles per (page, role), slowest p95 first."""
+    samples = samples if samples is not None else get_samples()
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for s in samples:
+        groups.setdefault((s["page"], s["role"]), []).append(s)
+
+    rows = []
+    for (page, role), items in groups.items():
+        walls = sorted(s["wall_ms"] for s in items)
+        calls = sorted(s["db_calls"] for s in items)
+        rows.append(
+            {
+                "page": page,
+                "role": role,
+                "reruns": len(items),
+                "p50_ms": _pct(walls, 50),
+                "p95_ms": _pct(walls, 95),
+                "p99_ms": _pct(walls, 99),
+                "max_ms": walls[-1],
+                "p50_db_calls": _pct(calls, 50),
+                "p95_db_calls": _pct(calls, 95),
+                "avg_rows": round(sum(s["rows"] for s in items) / len(items), 1),
+                "max_session_kb": round(
+                    max((s["session_bytes"] or 0 for s in items), default=0) / 1024, 1
+                ),
+                "errors": sum(1 for s in items if s["error"]),
+            }
+        )
+    rows.sort(key=lambda r: r["p95_ms"], reverse=True)
+    return rows
@@ -0,0 +1,152 @@
+"""
+Process-wide read cache invalidated by dependency tags.
+
+st.cache_data with a TTL serves stale rows until the TTL runs out, and
+st.cache_data.clear() throws away every cached function in the process.
+Here each entry records the tags it was built from, e.g.
+
+    ("courses",)      the course list
+    ("course", 12)    things derived from one course (its lessons, ...)
+    ("lesson", 40)    one lesson's words
+    ("user", 7)       one user's progress
+
+and a write path calls invalidate() with the tags it touched. Only the
+entries carrying one of those tags are dropped; everything else keeps
+being served without a query.
+
+A read racing a write cannot re-insert pre-write rows: every tag has a
+generation counter, a load remembers the generations it started under,
+and its result is only stored if none of them moved meanwhile.
+
+    CACHE.invalidate(("course", 12), ("courses",))
+
+    @memoize(lambda course_id: [("course", course_id)], copy=True)
+    def lessons_df(course_id): ...
+
+Keys are (function, args); arguments must be hashable. Entries live
+until invalidated or evicted (least recently used past max_entries).
+Streamlit re-executes the app script on each rerun but imported modules
+persist, so CACHE is shared by every session of the process.
+"""
+
+from __future__ import annotations
+
+import copy as _copy
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+Tag = Tuple[Hashable, ...]
+
+MAX_ENTRIES = 4096
+
+
+class TaggedCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = int(max_entries)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Tuple[Tag, ...]]]" = OrderedDict()
+        self._by_tag: Dict[Tag, Set[Hashable]] = {}
+        self._generation: Dict[Tag, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key: Hashable, tags: Iterable[Tag], loader: Callable[[], Any]) -> Any:
+        tags = tuple(tags)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            started = [self._generation.get(tag, 0) for tag in tags]
+
+        value = loader()
+
+        with self._lock:
+            if [self._generation.get(tag, 0) for tag in tags] == started:
+                self._store(key, value, tags)
+        return value
+
+    def _store(self, key, value, tags) -> None:
+        self._discard(key)
+        self._entries[key] = (value, tags)
+        for tag in tags:
+            self._by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+
+    def _discard(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def invalidate(self, *tags: Tag) -> int:
+        """Drop entries carrying any of `tags`; returns how many went."""
+        dropped = 0
+        with self._lock:
+            for tag in tags:
+                tag = tuple(tag)
+                self._generation[tag] = self._generation.get(tag, 0) + 1
+                for key in list(self._by_tag.get(tag, ())):
+                    self._discard(key)
+                    dropped += 1
+        return dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            for tag in self._by_tag:
+                self._generation[tag] = self._generation.get(tag, 0) + 1
+            self._entries.clear()
+            self._by_tag.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "tags": len(self._by_tag),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+CACHE = TaggedCache()
+
+
+def memoize(
+    tags: Callable[..., Iterable[Tag]],
+    *,
+    copy: bool = False,
+    cache: Optional[TaggedCache] = None,
+):
+    """
+    Cache fn(*args) under (fn, args) with tags(*args). copy=True hands out
+    a copy on every call (for DataFrames callers may modify), as
+    st.cache_data did.
+    """
+
+    def decorate(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            target = cache or CACHE
+            key = (name, args, tuple(sorted(kwargs.items())))
+            value = target.get_or_load(key, tags(*args, **kwargs), lambda: fn(*args, **kwargs))
+            return _copy.copy(value) if copy else value
+
+        return wrapper
+
+    return decorate
+
+
+def invalidate(*tags: Tag) -> int:
+    return CACHE.invalidate(*tags)
@@ -0,0 +1,295 @@
+"""
+Integer keys for the synonym app's word_stats.
+
+db/migrations/202610_word_stats_word_id.sql gives every headword an id
+(words.headword_id, the lowest word_id spelling it) and adds
+word_stats.word_id, filled by a trigger on every write so code that
+only knows the headword (update_after_attempt) keeps working, and by a
+trigger on words for stats written before their headword was imported. Progress
+queries join lesson_words -> words.headword_id -> word_stats.word_id,
+but only once word_ids_ready() says no resolvable row is still missing
+its word_id; until then stats_match() keeps the headword join, so a
+deploy ahead of the backfill does not hide past progress.
+
+    schema    apply the migration statements (no-op once installed)
+    backfill  fill word_stats.word_id for existing rows, in key order,
+              one short transaction per batch
+    index     CREATE UNIQUE INDEX CONCURRENTLY on (user_id, word_id), plus
+              a partial (headword) index on rows still missing it
+    status    rows still missing a word_id
+
+Usage:
+    python -m shared.word_stats_keys backfill --batch 5000
+    python -m shared.word_stats_keys index
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from shared import fetch
+
+BATCH_ROWS = 5000
+INDEX_NAME = "word_stats_user_word_id"
+MISSING_INDEX_NAME = "word_stats_missing_word_id"
+# how often a process re-asks whether the backfill has finished
+READY_RECHECK_SECONDS = 60.0
+
+SCHEMA = (
+    "ALTER TABLE words      ADD COLUMN IF NOT EXISTS headword_id INTEGER",
+    "ALTER TABLE word_stats ADD COLUMN IF NOT EXISTS word_id     INTEGER",
+    "LOCK TABLE words IN SHARE ROW EXCLUSIVE MODE",
+    """
+    CREATE OR REPLACE FUNCTION headword_word_id(p_headword TEXT)
+    RETURNS INTEGER
+    LANGUAGE sql STABLE AS $$
+        SELECT MIN(COALESCE(headword_id, word_id)) FROM words WHERE headword = p_headword
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION words_set_headword_id()
+    RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.headword_id := COALESCE(headword_word_id(NEW.headword), NEW.word_id);
+        RETURN NEW;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION word_stats_set_word_id()
+    RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF NEW.word_id IS NULL THEN
+            NEW.word_id := headword_word_id(NEW.headword);
+        END IF;
+        RETURN NEW;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS words_headword_id ON words",
+    """
+    CREATE TRIGGER words_headword_id
+        BEFORE INSERT OR UPDATE OF headword ON words
+        FOR EACH ROW EXECUTE FUNCTION words_set_headword_id()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION words_fill_word_stats()
+    RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE word_stats s
+        SET word_id = n.headword_id
+        FROM (SELECT headword, MIN(headword_id) AS headword_id FROM new_words GROUP BY headword) n
+        WHERE s.word_id IS NULL AND s.headword = n.headword;
+        RETURN NULL;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS word_stats_word_id ON word_stats",
+    """
+    CREATE TRIGGER word_stats_word_id
+        BEFORE INSERT OR UPDATE ON word_stats
+        FOR EACH ROW EXECUTE FUNCTION word_stats_set_word_id()
+    """,
+    "DROP TRIGGER IF EXISTS words_word_stats_word_id ON words",
+    """
+    CREATE TRIGGER words_word_stats_word_id
+        AFTER INSERT ON words
+        REFERENCING NEW TABLE AS new_words
+        FOR EACH STATEMENT EXECUTE FUNCTION words_fill_word_stats()
+    """,
+    """
+    UPDATE words w
+    SET headword_id = m.headword_id
+    FROM (SELECT headword, MIN(word_id) AS headword_id FROM words GROUP BY headword) m
+    WHERE m.headword = w.headword AND w.headword_id IS NULL
+    """,
+)
+
+_BATCH_SQL = """
+    WITH batch AS (
+        SELECT user_id, headword
+        FROM word_stats
+        WHERE word_id IS NULL AND (user_id, headword) > (:u, :h)
+        ORDER BY user_id, headword
+        LIMIT :n
+    ), updated AS (
+        UPDATE word_stats ws
+        SET word_id = headword_word_id(ws.headword)
+        FROM batch b
+        WHERE ws.user_id = b.user_id AND ws.headword = b.headword
+        RETURNING ws.user_id, ws.headword, ws.word_id
+    )
+    SELECT COUNT(*)                                     AS n,
+           COUNT(word_id)                               AS resolved,
+           (ARRAY_AGG(user_id ORDER BY user_id DESC, headword DESC))[1]  AS last_user,
+           (ARRAY_AGG(headword ORDER BY user_id DESC, headword DESC))[1] AS last_headword
+    FROM updated
+"""
+
+
+def _engine(engine):
+    if engine is None:
+        from shared.db import engine
+    return engine
+
+
+def is_installed(conn) -> bool:
+    return bool(
+        conn.execute(
+            text("SELECT 1 FROM pg_trigger WHERE tgname = 'words_word_stats_word_id' AND NOT tgisinternal")
+        ).scalar()
+    )
+
+
+_PENDING_SQL = """
+    SELECT EXISTS (
+        SELECT 1 FROM word_stats
+        WHERE word_id IS NULL AND headword_word_id(headword) IS NOT NULL
+    )
+"""
+
+_ready = False
+_ready_checked_at: Optional[float] = None
+
+
+def word_ids_ready(engine=None) -> bool:
+    """
+    True once every word_stats row whose headword has an id carries it.
+    Rows only ever gain a word_id, and the words trigger fills rows whose
+    headword is imported later, so True is remembered for the life of the
+    process; False is re-checked at most every READY_RECHECK_SECONDS.
+    """
+    global _ready, _ready_checked_at
+    if _ready:
+        return True
+    now = time.monotonic()
+    if _ready_checked_at is not None and now - _ready_checked_at < READY_RECHECK_SECONDS:
+        return False
+    _ready_checked_at = now
+    try:
+        # own connection: a failure must not abort the caller's transaction
+        _ready = not fetch.scalar(_engine(engine), _PENDING_SQL)
+    except Exception:
+        _ready = False  # columns/function not installed yet
+    return _ready
+
+
+def stats_match(stats: str = "s", words: str = "w", engine=None) -> str:
+    """
+    Join condition from a word_stats alias to a words-like alias (one
+    with headword and headword_id columns): the integer key once
+    word_ids_ready(), the headword until then. For f-string SQL.
+    """
+    if word_ids_ready(engine):
+        return f"{stats}.word_id = {words}.headword_id"
+    return f"{stats}.headword = {words}.headword"
+
+
+def ensure_schema(engine=None) -> bool:
+    """Apply SCHEMA unless the triggers already exist; True when it ran."""
+    with _engine(engine).begin() as conn:
+        if is_installed(conn):
+            return False
+        for stmt in SCHEMA:
+            conn.exec_driver_sql(stmt)
+    return True
+
+
+def backfill(batch_rows: int = BATCH_ROWS, pause: float = 0.0, engine=None, progress=print) -> Dict[str, int]:
+    """
+    Resolve word_id for existing rows. Walks the primary key so headwords
+    with no words row (left NULL) are visited once; each batch commits on
+    its own, so writers are only ever blocked on one batch of rows.
+    """
+    eng = _engine(engine)
+    last_user, last_headword = -1, ""
+    totals = {"rows": 0, "resolved": 0}
+    while True:
+        with eng.begin() as conn:
+            row = conn.execute(
+                text(_BATCH_SQL), {"u": last_user, "h": last_headword, "n": int(batch_rows)}
+            ).mappings().one()
+        if not row["n"]:
+            break
+        totals["rows"] += int(row["n"])
+        totals["resolved"] += int(row["resolved"])
+        last_user, last_headword = row["last_user"], row["last_headword"]
+        if progress:
+            progress(f"{totals['rows']} rows ({totals['resolved']} resolved), at user {last_user}")
+        if pause:
+            time.sleep(pause)
+    return totals
+
+
+def create_index(engine=None) -> None:
+    """
+    Unique (user_id, word_id) index, and a (headword) index on the rows
+    still without a word_id for the words trigger (small once backfilled),
+    both built without blocking writes.
+    """
+    with _engine(engine).connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql(
+            f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} ON word_stats (user_id, word_id)"
+        )
+        conn.exec_driver_sql(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {MISSING_INDEX_NAME} "
+            "ON word_stats (headword) WHERE word_id IS NULL"
+        )
+
+
+def status(engine=None) -> Dict[str, Optional[int]]:
+    with _engine(engine).connect() as conn:
+        row = conn.execute(
+            text(
+                """
+                SELECT COUNT(*)                                 AS rows,
+                       COUNT(*) FILTER (WHERE word_id IS NULL)  AS missing_word_id,
+                       (SELECT COUNT(*) FROM words WHERE headword_id IS NULL) AS words_missing_id
+                FROM word_stats
+                """
+            )
+        ).mappings().one()
+        out = dict(row)
+        out["installed"] = is_installed(conn)
+        out["indexed"] = bool(
+            conn.execute(text("SELECT to_regclass(:i) IS NOT NULL"), {"i": INDEX_NAME}).scalar()
+        )
+    return out
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Integer keys for word_stats.")
+    sub = p.add_subparsers(dest="command", required=True)
+    sub.add_parser("schema", help="Add columns and triggers")
+    bf = sub.add_parser("backfill", help="Fill word_stats.word_id for existing rows")
+    bf.add_argument("--batch", type=int, default=BATCH_ROWS)
+    bf.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    sub.add_parser("index", help="Build the (user_id, word_id) index concurrently")
+    sub.add_parser("status")
+    opts = p.parse_args(argv)
+
+    if opts.command == "schema":
+        print("installed" if ensure_schema() else "already installed")
+    elif opts.command == "backfill":
+        ensure_schema()
+        print(backfill(opts.batch, opts.pause))
+    elif opts.command == "index":
+        create_index()
+        print(f"{INDEX_NAME} ready")
+    else:
+        print(status())
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,11 @@ if block_path in sys.path:
     sys.path.remove(block_path)
 
 import streamlit as st
+from shared import cache_bus
 from spelling_app.admin_ui import render_spelling_admin
 
 def main():
+    cache_bus.start_listener()
     render_spelling_admin()
 
 if __name__ == "__main__":
@@ -31,18 +31,26 @@ from spelling_app.services.spelling_service import (
     process_csv_upload,
 )
 from spelling_app.services.help_service import get_help_text, save_help_text
+from shared.diagnostics_ui import (
+    render_db_diagnostics,
+    render_password_pool_diagnostics,
+    render_rerun_diagnostics,
+)
+from shared.render_profiler import profile_rerun
 
 # ... (render_student_admin function remains unchanged) ...
 
+@profile_rerun("spelling_admin", role="admin")
 def render_spelling_admin():
     st.header("📘 Spelling Administration")
 
-    tab_registrations, tab_students, tab_courses, tab_upload, tab_help = st.tabs([
+    tab_registrations, tab_students, tab_courses, tab_upload, tab_help, tab_diag = st.tabs([
         "Pending Registrations",
         "Students",
         "Courses",
         "Upload Words (CSV)",
         "Help Text",
+        "Diagnostics",
     ])
 
     # -------------------------------------------
@@ -482,3 +490,12 @@ def render_spelling_admin():
             save_help_text(section_key, new_text)
             st.success("Content updated successfully!")
 
+    # -------------------------------------------
+    # TAB — DIAGNOSTICS
+    # -------------------------------------------
+    with tab_diag:
+        render_db_diagnostics(key_prefix="spelling_admin")
+        st.markdown("---")
+        render_rerun_diagnostics(key_prefix="spelling_admin")
+        st.markdown("---")
+        render_password_pool_diagnostics()
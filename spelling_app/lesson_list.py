@@ -1,7 +1,7 @@
 import streamlit as st
 from spelling_app.services.spelling_service import (
     load_lessons_for_course,
-    get_lesson_progress,
+    get_lessons_progress,
 )
 from shared.auth import get_logged_in_user
 
@@ -26,12 +26,14 @@ def render_lesson_list(course_id: int, course_title: str):
         st.info("No lessons yet in this course.")
         return
 
+    progress_by_lesson = get_lessons_progress(student_id, [lesson["lesson_id"] for lesson in lessons])
+
     for lesson in lessons:
         lid = lesson["lesson_id"]
         title = lesson["title"]
         instructions = lesson.get("instructions", "")
 
-        progress = get_lesson_progress(student_id, lid)
+        progress = progress_by_lesson.get(int(lid), 0)
 
         with st.container():
             st.markdown(f"### {title}")
@@ -1,34 +1,58 @@
 # spelling_app/repository/attempt_repo.py
 
-from shared.db import execute
+from typing import Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from shared import attempt_events
+from shared.attempt_events import AttemptEvent
+
+
+@attempt_events.on_write("spelling_lesson")
+def _write_spelling_attempts(executor, events):
+    """spelling_attempts rows for a batch of lesson events (one statement)."""
+    attempt_events.run(
+        executor,
+        """
+        INSERT INTO spelling_attempts (student_id, item_id, is_correct, attempted_at)
+        SELECT s.*, NOW()
+        FROM UNNEST(%s::INTEGER[], %s::INTEGER[], %s::BOOLEAN[]) AS s
+        """,
+        (
+            [int(e.user_id) for e in events],
+            [int(e.item_id) for e in events],
+            [bool(e.is_correct) for e in events],
+        ),
+    )
 
 
 def log_attempt(
     student_id: int,
     item_id: int,
     is_correct: bool,
+    lesson_id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    typed_answer: Optional[str] = None,
+    response_ms: Optional[int] = None,
 ):
     """
-    Insert a single attempt into spelling_attempts.
-
-    Only stores:
-      - student_id
-      - item_id
-      - is_correct
-      - attempted_at (NOW)
+    Publish a spelling lesson attempt to the attempt event stream.
 
-    Additional metadata (course, lesson, timing, typed answer)
-    can be added later but is intentionally excluded here.
+    The event keeps course, lesson, typed answer and timing;
+    spelling_attempts (written by the consumer above) still only stores
+    student_id, item_id, is_correct and attempted_at.
     """
-
-    return execute(
-        """
-        INSERT INTO spelling_attempts (student_id, item_id, is_correct, attempted_at)
-        VALUES (:student_id, :item_id, :is_correct, NOW());
-        """,
-        {
-            "student_id": student_id,
-            "item_id": item_id,
-            "is_correct": is_correct,
-        },
+    event = AttemptEvent(
+        source="spelling_lesson",
+        user_id=student_id,
+        is_correct=bool(is_correct),
+        item_id=item_id,
+        lesson_id=lesson_id,
+        course_id=course_id,
+        response_ms=response_ms,
+        answer=typed_answer,
     )
+    try:
+        return {"rows_affected": len(attempt_events.publish([event]))}
+    except SQLAlchemyError as e:
+        return {"error": str(e)}
@@ -1,5 +1,5 @@
 from datetime import date
-from passlib.hash import bcrypt
+from shared.password_hashing import hash_password as _pool_hash_password
 
 from shared.db import execute, fetch_all
 from spelling_app.services.user_service import hash_password
@@ -37,7 +37,7 @@ def _extract_user_id(row):
 
 def hash_password(password: str) -> str:
     """Use bcrypt (compatible with the existing login system)."""
-    return bcrypt.hash(password)
+    return _pool_hash_password(password)
 
 
 # ---------------------------------------
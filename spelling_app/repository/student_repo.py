@@ -1,6 +1,9 @@
 from typing import Any, Dict, List, Optional
 
-from shared.db import execute, fetch_all, fetch_one
+from sqlalchemy import text
+
+from shared.bulk_enrollment import apply_links, cross
+from shared.db import engine, execute, fetch_all, fetch_one
 
 
 def _rows_to_dicts(rows: Any) -> List[Dict[str, Any]]:
@@ -27,6 +30,10 @@ def get_pending_spelling_students() -> List[Dict[str, Any]]:
     return _rows_to_dicts(rows)
 
 
+# Word Mastery + Pattern Words
+DEFAULT_SPELLING_COURSES = [1, 9]
+
+
 def approve_spelling_student(pending_id: int, default_password_hash: str) -> bool:
     """
     Approve a pending spelling student safely.
@@ -37,95 +44,107 @@ def approve_spelling_student(pending_id: int, default_password_hash: str) -> boo
     - Forces spelling access
     - Auto-assigns default courses
     """
+    outcomes = approve_spelling_students_bulk([pending_id], default_password_hash)
+    return bool(outcomes) and outcomes[0]["status"] != "not_found"
 
-    # 1️⃣ Fetch pending record
-    pending_rows = fetch_all(
-        """
-        SELECT pending_id, student_name, email
-        FROM pending_spelling_registrations
-        WHERE pending_id = :pid
-        """,
-        {"pid": pending_id},
-    )
-
-    pending_list = _rows_to_dicts(pending_rows)
-    if not pending_list:
-        return False
 
-    pending = pending_list[0]
-    email = pending.get("email")
+def approve_spelling_students_bulk(
+    pending_ids: List[int],
+    default_password_hash: str,
+) -> List[Dict[str, Any]]:
+    """
+    Approve many pending spelling students in one transaction.
 
-    # 2️⃣ Check if user already exists
-    existing_user = fetch_one(
-        """
-        SELECT user_id
-        FROM users
-        WHERE LOWER(email) = LOWER(:email)
-        """,
-        {"email": email},
-    )
+    Set-based: one statement each for reactivating existing users, creating
+    new ones, enrolling in the default courses and clearing the pending rows,
+    whatever the cohort size. Either every id is processed or none is.
 
-    if existing_user:
-        user_id = existing_user[0] if isinstance(existing_user, tuple) else existing_user["user_id"]
-
-        # Update user safely
-        execute(
-            """
-            UPDATE users
-            SET
-                
-                role = 'student',
-                status = 'ACTIVE',
-                is_active = TRUE
-                app_source = 'spelling'
-            WHERE user_id = :uid
-            """,
-            {"uid": user_id},
-        )
+    Returns one dict per requested id, in input order:
+        {"pending_id", "status", "user_id"}
+    status is "created", "reactivated" or "not_found".
+    """
+    ids = list(dict.fromkeys(int(pid) for pid in pending_ids))
+    if not ids:
+        return []
 
-    else:
-        # 3️⃣ Create new user
-        execute(
-            """
-            INSERT INTO users (name, email, password_hash, role, status, class_name, app_source, is_active)
-            VALUES (:name, :email, :phash, 'student', 'ACTIVE', NULL, 'spelling', TRUE)
-            """,
-            {
-                "name": pending.get("student_name"),
-                "email": email,
-                "phash": default_password_hash,
-            },
+    with engine.begin() as conn:
+        pending = conn.execute(
+            text(
+                """
+                SELECT pending_id, LOWER(email) AS email_key
+                FROM pending_spelling_registrations
+                WHERE pending_id = ANY(:ids)
+                FOR UPDATE
+                """
+            ),
+            {"ids": ids},
+        ).fetchall()
+        email_by_pending = {int(r.pending_id): r.email_key for r in pending}
+
+        reactivated = conn.execute(
+            text(
+                """
+                UPDATE users u
+                SET role = 'student',
+                    status = 'ACTIVE',
+                    is_active = TRUE,
+                    app_source = 'spelling'
+                FROM pending_spelling_registrations p
+                WHERE p.pending_id = ANY(:ids)
+                  AND LOWER(u.email) = LOWER(p.email)
+                RETURNING u.user_id, LOWER(u.email) AS email_key
+                """
+            ),
+            {"ids": ids},
+        ).fetchall()
+
+        # Lowest pending_id wins when the same email registered twice
+        created = conn.execute(
+            text(
+                """
+                INSERT INTO users (name, email, password_hash, role, status, class_name, app_source, is_active)
+                SELECT DISTINCT ON (LOWER(p.email))
+                       p.student_name, p.email, :phash, 'student', 'ACTIVE', NULL, 'spelling', TRUE
+                FROM pending_spelling_registrations p
+                WHERE p.pending_id = ANY(:ids)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM users u WHERE LOWER(u.email) = LOWER(p.email)
+                  )
+                ORDER BY LOWER(p.email), p.pending_id
+                RETURNING user_id, LOWER(email) AS email_key
+                """
+            ),
+            {"ids": ids, "phash": default_password_hash},
+        ).fetchall()
+
+        conn.execute(
+            text(
+                """
+                INSERT INTO spelling_enrollments (user_id, course_id)
+                SELECT DISTINCT u.user_id, c.course_id
+                FROM pending_spelling_registrations p
+                JOIN users u ON LOWER(u.email) = LOWER(p.email)
+                CROSS JOIN UNNEST(CAST(:course_ids AS INTEGER[])) AS c(course_id)
+                WHERE p.pending_id = ANY(:ids)
+                ON CONFLICT DO NOTHING
+                """
+            ),
+            {"ids": ids, "course_ids": DEFAULT_SPELLING_COURSES},
         )
 
-        user_row = fetch_one(
-            "SELECT user_id FROM users WHERE LOWER(email)=LOWER(:email)",
-            {"email": email},
-        )
-        user_id = user_row[0] if isinstance(user_row, tuple) else user_row["user_id"]
-
-    # 4️⃣ Auto-assign default courses
-    DEFAULT_COURSES = [1, 9]  # Word Mastery + Pattern Words
-
-    for course_id in DEFAULT_COURSES:
-        execute(
-            """
-            INSERT INTO spelling_enrollments (user_id, course_id)
-            VALUES (:uid, :cid)
-            ON CONFLICT DO NOTHING
-            """,
-            {"uid": user_id, "cid": course_id},
+        conn.execute(
+            text("DELETE FROM pending_spelling_registrations WHERE pending_id = ANY(:ids)"),
+            {"ids": ids},
         )
 
-    # 5️⃣ Remove from pending
-    execute(
-        """
-        DELETE FROM pending_spelling_registrations
-        WHERE pending_id = :pid
-        """,
-        {"pid": pending_id},
-    )
+    user_by_email = {r.email_key: ("reactivated", int(r.user_id)) for r in reactivated}
+    user_by_email.update({r.email_key: ("created", int(r.user_id)) for r in created})
 
-    return True
+    outcomes: List[Dict[str, Any]] = []
+    for pid in ids:
+        status, user_id = user_by_email.get(email_by_pending.get(pid), ("not_found", None))
+        outcomes.append({"pending_id": pid, "status": status, "user_id": user_id})
+    return outcomes
 
 
 def list_registered_spelling_students() -> List[Dict[str, Any]]:
@@ -179,26 +198,37 @@ def assign_courses_to_student(user_id: int, course_ids: List[int]) -> None:
     if not course_ids:
         return
 
-    for course_id in course_ids:
-        execute(
-            """
-            INSERT INTO spelling_enrollments (user_id, course_id)
-            VALUES (:uid, :cid)
-            ON CONFLICT DO NOTHING
-            """,
-            {"uid": user_id, "cid": course_id},
-        )
+    bulk_enroll_spelling([user_id], course_ids, mode="add")
 
 
 def remove_courses_from_student(user_id: int, course_ids: List[int]) -> None:
     if not course_ids:
         return
 
-    for course_id in course_ids:
-        execute(
-            """
-            DELETE FROM spelling_enrollments
-            WHERE user_id = :uid AND course_id = :cid
-            """,
-            {"uid": user_id, "cid": course_id},
+    bulk_enroll_spelling([user_id], course_ids, mode="remove")
+
+
+def bulk_enroll_spelling(
+    user_ids: List[int],
+    course_ids: List[int],
+    mode: str = "add",
+) -> Dict[str, int]:
+    """
+    Students x courses in one statement.
+
+    mode="add"    enroll everyone in every course
+    mode="remove" drop those enrollments
+    mode="sync"   the students end up enrolled in exactly `course_ids`
+
+    Returns {"added", "removed", "kept"}.
+    """
+    with engine.begin() as conn:
+        return apply_links(
+            conn,
+            "spelling_enrollments",
+            cross(user_ids, course_ids),
+            mode=mode,
+            scope_column="user_id",
+            scope_ids=user_ids,
         )
+
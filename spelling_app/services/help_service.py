@@ -1,8 +1,11 @@
 """
 DB-backed help content for Spelling UI.
 Falls back to DEFAULT_SECTIONS when DB has no entry for a key.
+Cached per section until save_help_text (in any app process) publishes a
+change on shared.cache_bus.
 """
 
+from shared import cache_bus, tagged_cache
 from shared.db import fetch_all, execute
 from textwrap import dedent
 
@@ -38,6 +41,7 @@ DEFAULT_SECTIONS = {
 }
 
 
+@tagged_cache.memoize(lambda section_key: [("spelling_help", section_key)])
 def get_help_text(section_key: str) -> str:
     """
     Fetch help text from DB; fallback to defaults.
@@ -65,7 +69,7 @@ def save_help_text(section_key: str, content: str):
     """
     Upsert help text into DB.
     """
-    return execute(
+    result = execute(
         """
         INSERT INTO spelling_help_content (section_key, content)
         VALUES (:k, :c)
@@ -74,3 +78,5 @@ def save_help_text(section_key: str, content: str):
         """,
         {"k": section_key, "c": content},
     )
+    cache_bus.publish("spelling_help", section_key)
+    return result
@@ -1,6 +1,11 @@
+from typing import Any, Dict, Iterable, List, Optional
+
 import pandas as pd
+from spelling_app.repository.attempt_repo import log_attempt
 from spelling_app.repository.course_repo import get_all_spelling_courses
-from shared.db import execute
+from spelling_app.repository.lesson_repo import get_lessons
+from shared import attempt_events, progress_cache
+from shared.db import execute, fetch_all
 
 # ------------------------------------------------------------
 # LOAD SPELLING COURSES
@@ -78,3 +83,96 @@ def process_csv_upload(df: pd.DataFrame, update_mode: str, preview_only: bool, c
         summary.append({"word": word, "pattern": pattern, "pattern_code": pattern_code})
 
     return {"message": "CSV uploaded", "details": summary}
+
+
+def _rows_to_dicts(rows) -> List[Dict[str, Any]]:
+    if isinstance(rows, dict):
+        return []
+    return [dict(r._mapping) if hasattr(r, "_mapping") else dict(r) for r in rows or []]
+
+
+# ------------------------------------------------------------
+# LESSONS + PROGRESS (lesson list page)
+# ------------------------------------------------------------
+
+def load_lessons_for_course(course_id: int):
+    result = get_lessons(course_id)
+    if isinstance(result, dict):
+        return result
+    return _rows_to_dicts(result)
+
+
+def load_lessons_progress(student_id: int, lesson_ids: List[int]) -> Dict[int, int]:
+    """
+    % of each lesson's words the student has spelled correctly at least once,
+    for many lessons in one grouped query.
+    """
+    ids = [int(lid) for lid in lesson_ids]
+    if not ids:
+        return {}
+
+    rows = fetch_all(
+        """
+        SELECT
+            l.lesson_id,
+            COUNT(li.item_id) AS total_items,
+            COUNT(a.item_id) AS correct_items
+        FROM UNNEST(CAST(:lesson_ids AS INTEGER[])) AS l(lesson_id)
+        LEFT JOIN spelling_lesson_items li ON li.lesson_id = l.lesson_id
+        LEFT JOIN (
+            SELECT DISTINCT item_id
+            FROM spelling_attempts
+            WHERE student_id = :sid AND is_correct
+        ) a ON a.item_id = li.item_id
+        GROUP BY l.lesson_id
+        """,
+        {"lesson_ids": ids, "sid": int(student_id)},
+    )
+
+    progress = {lid: 0 for lid in ids}
+    for row in _rows_to_dicts(rows):
+        total = int(row["total_items"] or 0)
+        if total:
+            progress[int(row["lesson_id"])] = round(100 * int(row["correct_items"] or 0) / total)
+    return progress
+
+
+def get_lesson_progress(student_id: int, lesson_id: int) -> int:
+    return load_lessons_progress(student_id, [lesson_id]).get(int(lesson_id), 0)
+
+
+def get_lessons_progress(student_id: int, lesson_ids: Iterable[Any]) -> Dict[int, int]:
+    """Session-cached progress for a lesson list; invalidated per student by record_attempt."""
+    return progress_cache.get_lessons_progress("spelling", student_id, lesson_ids, load_lessons_progress)
+
+
+def record_attempt(
+    user_id: int,
+    course_id: int,
+    lesson_id: int,
+    item_id: int,
+    typed_answer: str,
+    correct: bool,
+    response_ms: Optional[int] = None,
+):
+    """
+    Save a lesson attempt as an attempt event (see attempt_repo.log_attempt);
+    the student's cached spelling progress is dropped once it commits.
+    """
+    return log_attempt(
+        student_id=user_id,
+        item_id=item_id,
+        is_correct=bool(correct),
+        lesson_id=lesson_id,
+        course_id=course_id,
+        typed_answer=typed_answer,
+        response_ms=response_ms,
+    )
+
+
+@attempt_events.on_commit("spelling_lesson")
+def _invalidate_lesson_progress(events):
+    # progress counts an item spelled correctly in any lesson, so every
+    # lesson sharing the item changes: drop all of the student's entries
+    for user_id in {e.user_id for e in events}:
+        progress_cache.invalidate_user("spelling", user_id)
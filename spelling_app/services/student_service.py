@@ -33,13 +33,14 @@ def initialize_session_state(st):
     if "user_name" not in st.session_state:
         st.session_state.user_name = None
 
-import bcrypt
 from sqlalchemy import text
 from shared.db import engine
+from shared.password_hashing import verify_password
 
 def check_login(st, email: str, password: str) -> bool:
     """
     Checks login against the real users table using bcrypt hash verification.
+    Raises RateLimited after too many failed attempts for the email.
     """
     sql = text("SELECT user_id, name, email, password_hash, is_active FROM users WHERE email=:e")
 
@@ -52,13 +53,8 @@ def check_login(st, email: str, password: str) -> bool:
     if not row["is_active"]:
         return False  # User disabled
 
-    stored_hash = row["password_hash"]
-
-    # Convert to bytes for bcrypt
-    if isinstance(stored_hash, str):
-        stored_hash = stored_hash.encode()
-
-    if bcrypt.checkpw(password.encode(), stored_hash):
+    # bcrypt runs in the shared hashing pool (rate limited per email)
+    if verify_password(password, row["password_hash"], email=email):
         # SUCCESS → update session state
         st.session_state.is_logged_in = True
         st.session_state.user_id = row["user_id"]
@@ -1,8 +1,12 @@
 import random
 import datetime
 import streamlit as st
+from sqlalchemy.exc import SQLAlchemyError
 
-from shared.db import execute, fetch_all
+from shared import attempt_events
+from shared.attempt_events import AttemptEvent
+from shared.db import fetch_all
+from shared.render_profiler import profile_rerun
 
 
 def _fetch_spelling_lessons():
@@ -38,6 +42,32 @@ def _fetch_spelling_words(lesson_id: int):
     )
 
 
+ATTEMPT_TYPES = {
+    "spelling_practice": "spelling",
+    "spelling_daily": "spelling_daily",
+    "spelling_missing": "spelling_missing",
+}
+
+
+@attempt_events.on_write(*ATTEMPT_TYPES)
+def _write_practice_attempts(executor, events):
+    attempt_events.run(
+        executor,
+        """
+        INSERT INTO attempts (user_id, lesson_id, word_id, attempt_type, typed_answer, is_correct)
+        SELECT * FROM UNNEST(%s::INTEGER[], %s::INTEGER[], %s::INTEGER[], %s::TEXT[], %s::TEXT[], %s::BOOLEAN[])
+        """,
+        (
+            [e.user_id for e in events],
+            [e.lesson_id for e in events],
+            [e.item_id for e in events],
+            [ATTEMPT_TYPES[e.source] for e in events],
+            [e.answer for e in events],
+            [bool(e.is_correct) for e in events],
+        ),
+    )
+
+
 def _record_attempt(
     user_id: int,
     lesson_id: int,
@@ -48,26 +78,24 @@ def _record_attempt(
     scope: str = "lesson",
 ):
     if scope == "daily":
-        attempt_type = "spelling_daily"
+        source = "spelling_daily"
     elif mode == "missing":
-        attempt_type = "spelling_missing"
+        source = "spelling_missing"
     else:
-        attempt_type = "spelling"
-
-    return execute(
-        """
-        INSERT INTO attempts (user_id, lesson_id, word_id, attempt_type, typed_answer, is_correct)
-        VALUES (:uid, :lid, :wid, :atype, :ans, :correct)
-        """,
-        {
-            "uid": user_id,
-            "lid": lesson_id,
-            "wid": word_id,
-            "ans": typed_answer,
-            "atype": attempt_type,
-            "correct": is_correct,
-        },
+        source = "spelling_practice"
+
+    event = AttemptEvent(
+        source=source,
+        user_id=user_id,
+        is_correct=is_correct,
+        item_id=word_id,
+        lesson_id=lesson_id,
+        answer=typed_answer,
     )
+    try:
+        return {"rows_affected": len(attempt_events.publish([event]))}
+    except SQLAlchemyError as e:
+        return {"error": str(e)}
 
 
 def _generate_mask(word: str) -> str:
@@ -289,6 +317,7 @@ def _session_hud(total_words: int):
     )
 
 
+@profile_rerun("spelling_practice")
 def render_spelling_student(user_id: int | None = None):
     st.title("Student Dashboard")
 
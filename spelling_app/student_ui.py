@@ -10,10 +10,13 @@ from spelling_app.services.student_service import (
     get_available_courses,
     get_dashboard_data,
 )
+from shared import tagged_cache
 from shared.db import fetch_all
 from spelling_app.services.enrollment_service import get_courses_for_student
 from spelling_app.repository.student_repo import get_course_progress_detailed
 from spelling_app.utils.ui_components import render_badge, render_stat_card, render_streak_bar
+from shared.render_profiler import profile_rerun
+from shared.password_hashing import RateLimited
 
 # --- Load Student CSS safely ---
 def inject_student_css():
@@ -26,6 +29,7 @@ def inject_student_css():
 
 # --- Main Application Flow ---
 
+@profile_rerun("spelling_student")
 def render_spelling_student_page():
     """
     Main entry point for the student application.
@@ -74,6 +78,24 @@ def render_spelling_student_page():
         else:
             render_main_student_app()
 
+@tagged_cache.memoize(lambda course_id: [("spelling_course", course_id)], copy=True)
+def _course_words(course_id: int):
+    """Practice words for a course, until an upload publishes ("spelling_course", id)."""
+    words = fetch_all(
+        """
+        SELECT word, pattern, pattern_code
+        FROM spelling_words
+        WHERE course_id = :cid
+        ORDER BY word_id ASC
+        """,
+        {"cid": course_id}
+    )
+
+    # Normalize DB rows
+    if hasattr(words, "all"):
+        return [dict(r._mapping) for r in words.all()]
+    return [dict(r._mapping) for r in words]
+
 # --- Login/Registration Page (Patch 3E) ---
 
 def render_login_page():
@@ -92,11 +114,16 @@ def render_login_page():
             submitted = st.form_submit_button("Login")
 
             if submitted:
-                if check_login(st, email, password):
-                    st.success("Login successful! Redirecting...")
-                    st.experimental_rerun()
+                try:
+                    logged_in = check_login(st, email, password)
+                except RateLimited:
+                    st.error("Too many failed attempts. Please wait a few minutes and try again.")
                 else:
-                    st.error("Invalid email or password.")
+                    if logged_in:
+                        st.success("Login successful! Redirecting...")
+                        st.experimental_rerun()
+                    else:
+                        st.error("Invalid email or password.")
         st.markdown("</div>", unsafe_allow_html=True)
 
         st.markdown("---")
@@ -218,21 +245,7 @@ def render_main_student_app():
             return
 
         # Load all words for this course
-        words = fetch_all(
-            """
-            SELECT word, pattern, pattern_code
-            FROM spelling_words
-            WHERE course_id = :cid
-            ORDER BY word_id ASC
-            """,
-            {"cid": course_id}
-        )
-
-        # Normalize DB rows
-        if hasattr(words, "all"):
-            words = [dict(r._mapping) for r in words.all()]
-        else:
-            words = [dict(r._mapping) for r in words]
+        words = _course_words(int(course_id))
 
         if not words:
             st.warning("No words found for this course.")
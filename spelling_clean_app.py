@@ -4,6 +4,7 @@ import pandas as pd
 from sqlalchemy import text
 from datetime import date
 
+from shared import cache_bus, tagged_cache
 from shared.db import engine, fetch_all, execute
 
 
@@ -50,10 +51,11 @@ def initialize_session_state(st):
 #  AUTHENTICATION
 ###########################################################
 
-import bcrypt
+from shared.password_hashing import RateLimited, verify_password
 
 
 def check_login(st, email: str, password: str) -> bool:
+    """Log the student in; raises RateLimited after too many failed attempts."""
     sql = text(
         """
         SELECT user_id, name, email, password_hash, is_active
@@ -70,11 +72,7 @@ def check_login(st, email: str, password: str) -> bool:
     if not row["is_active"]:
         return False
 
-    stored_hash = row["password_hash"]
-    if isinstance(stored_hash, str):
-        stored_hash = stored_hash.encode()
-
-    if bcrypt.checkpw(password.encode(), stored_hash):
+    if verify_password(password, row["password_hash"], email=email):
         st.session_state.is_logged_in = True
         st.session_state.user_id = row["user_id"]
         st.session_state.user_name = row["name"]
@@ -121,6 +119,7 @@ def get_student_courses(user_id: int):
 #  WORDS FOR PRACTICE
 ###########################################################
 
+@tagged_cache.memoize(lambda course_id: [("spelling_course", int(course_id))], copy=True)
 def get_words_for_course(course_id: int):
     rows = fetch_all(
         """
@@ -158,11 +157,16 @@ def render_login_page():
             submitted = st.form_submit_button("Login")
 
             if submitted:
-                if check_login(st, email, password):
-                    st.success("Login successful!")
-                    st.experimental_rerun()
+                try:
+                    logged_in = check_login(st, email, password)
+                except RateLimited:
+                    st.error("Too many failed attempts. Please wait a few minutes and try again.")
                 else:
-                    st.error("Invalid email or password.")
+                    if logged_in:
+                        st.success("Login successful!")
+                        st.experimental_rerun()
+                    else:
+                        st.error("Invalid email or password.")
 
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -359,6 +363,7 @@ def render_practice_page():
 ###########################################################
 
 def main():
+    cache_bus.start_listener()
     inject_student_css()
     initialize_session_state(st)
 
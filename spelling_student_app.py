@@ -5,6 +5,7 @@ block_path = os.path.join(os.getcwd(), "synonym_legacy")
 if block_path in sys.path:
     sys.path.remove(block_path)
 
+from shared import cache_bus
 from spelling_app.student_ui import render_spelling_student_page
 
 
@@ -14,6 +15,7 @@ def main():
         page_title="WordSprint – Spelling Student",
         layout="wide",
     )
+    cache_bus.start_listener()
     render_spelling_student_page()
 
 
@@ -12,9 +12,10 @@ from datetime import datetime, timedelta
 import secrets
 from typing import Optional, Tuple, Dict
 
-from passlib.hash import bcrypt
 from sqlalchemy import text
 
+from shared.password_hashing import RateLimited, hash_password, verify_password
+
 
 class AuthService:
     def __init__(self, engine):
@@ -97,7 +98,7 @@ class AuthService:
                 INSERT INTO users(name,email,password_hash,role,is_active,expires_at,last_password_change)
                 VALUES (:n,:e,:p,'student',TRUE, CURRENT_TIMESTAMP + INTERVAL '365 days', CURRENT_TIMESTAMP)
                 RETURNING user_id
-            """), {"n": name.strip(), "e": email_lc, "p": bcrypt.hash(password)}).scalar()
+            """), {"n": name.strip(), "e": email_lc, "p": hash_password(password)}).scalar()
 
         return True, f"Student registered (user_id={uid})."
 
@@ -106,7 +107,7 @@ class AuthService:
             row = conn.execute(text("SELECT password_hash FROM users WHERE user_id=:u"), {"u": int(user_id)}).mappings().fetchone()
             if not row:
                 return False, "User not found."
-            if not bcrypt.verify(old_password, row["password_hash"]):
+            if not verify_password(old_password, row["password_hash"]):
                 return False, "Old password is incorrect."
 
             conn.execute(text("""
@@ -114,7 +115,7 @@ class AuthService:
                 SET password_hash=:ph, last_password_change=CURRENT_TIMESTAMP,
                     reset_token_hash=NULL, reset_token_expires_at=NULL
                 WHERE user_id=:u
-            """), {"ph": bcrypt.hash(new_password), "u": int(user_id)})
+            """), {"ph": hash_password(new_password), "u": int(user_id)})
         return True, "Password updated."
 
     def request_password_reset(self, email: str, ttl_minutes: int = 60) -> Tuple[bool, str, Optional[str]]:
@@ -129,7 +130,7 @@ class AuthService:
             return True, "If the email exists, a reset link has been prepared.", None
 
         token = secrets.token_urlsafe(32)
-        token_hash = bcrypt.hash(token)
+        token_hash = hash_password(token)
         with self.engine.begin() as conn:
             conn.execute(text("""
                 UPDATE users
@@ -158,8 +159,11 @@ class AuthService:
                 return False, "Reset link has expired. Please request a new one."
 
             # Verify token
-            if not bcrypt.verify(token, row["reset_token_hash"]):
-                return False, "Invalid reset link."
+            try:
+                if not verify_password(token, row["reset_token_hash"], email=email):
+                    return False, "Invalid reset link."
+            except RateLimited:
+                return False, "Too many failed attempts. Try again later."
 
             # Update password & clear token
             conn.execute(text("""
@@ -169,7 +173,7 @@ class AuthService:
                     reset_token_hash=NULL,
                     reset_token_expires_at=NULL
                 WHERE user_id=:u
-            """), {"ph": bcrypt.hash(new_password), "u": int(user["user_id"])})
+            """), {"ph": hash_password(new_password), "u": int(user["user_id"])})
         return True, "Password has been reset."
 
     # ─────────────────────────────────────────────────────────────────
@@ -280,7 +284,12 @@ class AuthService:
             return False, "Account disabled.", None
         if self.is_locked(user):
             return False, "Too many failed attempts. Try again later.", None
-        if not bcrypt.verify(password, user.get("password_hash") or ""):
+        try:
+            ok = verify_password(password, user.get("password_hash"), email=email)
+        except RateLimited:
+            # not a wrong password: don't count it against the DB lockout
+            return False, "Too many failed attempts. Try again later.", None
+        if not ok:
             try:
                 self.mark_login_failed(user["user_id"])
             except Exception:
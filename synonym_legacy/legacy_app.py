@@ -4,20 +4,27 @@ from datetime import datetime, timedelta, date
 from pathlib import Path
 from functools import lru_cache
 
-from typing import Optional
+from types import MappingProxyType
+from typing import NamedTuple, Optional
 
 import numpy as np
 import pandas as pd
 
 from dotenv import load_dotenv
-from passlib.hash import bcrypt
 from sqlalchemy import create_engine, text
 
 import streamlit as st
 import builtins
 import hashlib
 
+from shared import analytics_snapshot, attempt_events, cache_bus, class_reports, fetch, leaderboards, tagged_cache, word_stats_keys
+from shared.attempt_events import AttemptEvent
+from shared.bulk_enrollment import add_links, cross, remove_links
 from shared.db import execute as sp_execute, fetch_all as sp_fetch_all, engine as sp_engine
+from shared.exports import spooled_export, sqlalchemy_connect, write_query_csv
+from shared.levels import level_for_xp, level_sql, next_level_band
+from shared.password_hashing import RateLimited, hash_password, is_rate_limited, verify_password
+from shared.render_profiler import profile_rerun
 
 # Disable all help renderers (prevents the login_page methods panel)
 try:
@@ -105,15 +112,6 @@ TEACHER_UI_V2 = os.getenv("TEACHER_UI_V2", "0") == "1"
 
 #DEFAULT_LESSON_INSTRUCTION = "Pick every option that matches the meaning of the word."
 
-# Gamification constants (declared early so helper functions can use them)
-LEVEL_BANDS: list[dict[str, object]] = [
-    {"level": 1, "min": 0,   "max": 99,  "title": "Learner",   "color": "#22c55e"},  # Green
-    {"level": 2, "min": 100, "max": 249, "title": "Achiever",  "color": "#f97316"},  # Orange
-    {"level": 3, "min": 250, "max": 499, "title": "Explorer",  "color": "#3b82f6"},  # Blue
-    {"level": 4, "min": 500, "max": 999, "title": "Champion",  "color": "#8b5cf6"},  # Purple
-    {"level": 5, "min": 1000, "max": None, "title": "Legend", "color": "#fbbf24"},  # Gold
-]
-
 
 BADGE_DEFINITIONS = {
     "First Word Hero": {
@@ -382,7 +380,7 @@ def patch_users_table():
                 raw_pwd = ADMIN_PASSWORD if r["role"] == "admin" else DEFAULT_STUDENT_PASSWORD
                 conn.execute(
                     text("UPDATE users SET password_hash=:p WHERE user_id=:u"),
-                    {"p": bcrypt.hash(raw_pwd), "u": r["user_id"]}
+                    {"p": hash_password(raw_pwd), "u": r["user_id"]}
                 )
 
 def patch_courses_table():
@@ -395,6 +393,23 @@ def patch_courses_table():
 def patch_attempts_table():
     with engine.begin() as conn:
         conn.execute(text("ALTER TABLE attempts ADD COLUMN IF NOT EXISTS archived_at TIMESTAMPTZ"))
+        # latest outcome per (user, lesson, headword); backfilled by
+        # db/migrations/202610_lesson_word_outcomes.sql
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS lesson_word_outcomes (
+              user_id      INTEGER     NOT NULL,
+              lesson_id    INTEGER     NOT NULL,
+              headword     TEXT        NOT NULL,
+              is_correct   BOOLEAN,
+              attempted_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+              PRIMARY KEY (user_id, lesson_id, headword)
+            )
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_lesson_word_outcomes_missed
+                ON lesson_word_outcomes (user_id, lesson_id)
+                WHERE is_correct = FALSE
+        """))
 
 def patch_gamification_tables():
     with engine.begin() as conn:
@@ -412,6 +427,28 @@ def patch_gamification_tables():
               UNIQUE (user_id, badge_name)
             )
         """))
+        # per-user totals behind gamification_snapshot; backfilled by
+        # db/migrations/202610_gamification_summary.sql
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS gamification_summary (
+              user_id         INTEGER     PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+              xp_from_words   INTEGER     NOT NULL DEFAULT 0,
+              xp_from_badges  INTEGER     NOT NULL DEFAULT 0,
+              mastered_words  INTEGER     NOT NULL DEFAULT 0,
+              correct_words   INTEGER     NOT NULL DEFAULT 0,
+              answer_streak   INTEGER     NOT NULL DEFAULT 0,
+              login_streak    INTEGER     NOT NULL DEFAULT 0,
+              last_active_day DATE,
+              level           INTEGER     NOT NULL DEFAULT 1,
+              updated_at      TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """))
+
+def patch_word_stats_keys():
+    word_stats_keys.ensure_schema(engine)
+
+def patch_leaderboards():
+    leaderboards.ensure_schema(engine)
 
 # Bootstrap order
 init_db()
@@ -419,51 +456,47 @@ patch_users_table()
 patch_courses_table()
 patch_attempts_table()
 patch_gamification_tables()
+patch_word_stats_keys()
+patch_leaderboards()
+cache_bus.start_listener()
 
 def get_missed_words(user_id: int, lesson_id: int):
     """
     Returns a list of headwords whose latest attempt in this lesson was incorrect.
     Falls back to words with correct_streak=0 (but attempted) if no recent wrongs.
+    One round trip: the latest outcomes come from lesson_word_outcomes (kept
+    current by _write_synonym_attempts); the fallback only runs when that is empty.
     """
-    latest = pd.read_sql(
-        text("""
-            WITH last AS (
-              SELECT headword, MAX(id) AS last_id
-              FROM attempts
-              WHERE user_id=:u AND lesson_id=:l
-              GROUP BY headword
+    return fetch.column(
+        engine,
+        f"""
+            WITH missed AS (
+              SELECT headword
+              FROM lesson_word_outcomes
+              WHERE user_id=:u AND lesson_id=:l AND is_correct = FALSE
+            ), fallback AS (
+              SELECT DISTINCT w.headword
+              FROM lesson_words lw
+              JOIN words w ON w.word_id = lw.word_id
+              JOIN word_stats s ON s.user_id=:u AND {word_stats_keys.stats_match()}
+              WHERE lw.lesson_id = :l
+                AND s.total_attempts > 0
+                AND COALESCE(s.correct_streak, 0) = 0
+                AND NOT EXISTS (SELECT 1 FROM missed)
             )
-            SELECT a.headword
-            FROM attempts a
-            JOIN last ON a.id = last.last_id
-            WHERE a.is_correct = FALSE
-        """),
-        con=engine, params={"u": int(user_id), "l": int(lesson_id)}
+            SELECT headword FROM missed
+            UNION
+            SELECT headword FROM fallback
+            ORDER BY headword
+        """,
+        {"u": int(user_id), "l": int(lesson_id)},
     )
-    missed = set(latest["headword"].tolist())
-
-    if not missed:
-        fallback = pd.read_sql(
-            text("""
-                SELECT DISTINCT w.headword
-                FROM lesson_words lw
-                JOIN words w ON w.word_id = lw.word_id
-                LEFT JOIN word_stats s ON s.user_id=:u AND s.headword = w.headword
-                WHERE lw.lesson_id = :l
-                  AND s.total_attempts > 0
-                  AND COALESCE(s.correct_streak, 0) = 0
-            """),
-            con=engine, params={"u": int(user_id), "l": int(lesson_id)}
-        )
-        missed = set(fallback["headword"].tolist())
-
-    return sorted(missed)
 
 # ─────────────────────────────────────────────────────────────────────
 # DB helpers (CRUD) — Postgres
 # ─────────────────────────────────────────────────────────────────────
 def create_user(name, email, password, role):
-    h = bcrypt.hash(password)
+    h = hash_password(password)
     with engine.begin() as conn:
         user_id = conn.execute(
             text("""INSERT INTO users(name,email,password_hash,role)
@@ -474,7 +507,8 @@ def create_user(name, email, password, role):
         ).scalar()
         if user_id is None:
             user_id = conn.execute(text("SELECT user_id FROM users WHERE email=:e"), {"e": email}).scalar()
-        return user_id
+    cache_bus.publish("students")
+    return user_id
 
 def user_by_email(email):
     with engine.begin() as conn:
@@ -498,6 +532,7 @@ def set_user_active(user_id, active: bool):
     with engine.begin() as conn:
         conn.execute(text("UPDATE users SET is_active=:a WHERE user_id=:u"),
                      {"a": bool(active), "u": user_id})
+    cache_bus.publish("students")
 
 def all_students_df():
     df_users = pd.read_sql(
@@ -555,15 +590,7 @@ def assign_students_to_class(class_id: int, student_ids: list[int]):
     if not student_ids:
         return
     with engine.begin() as conn:
-        for sid in student_ids:
-            conn.execute(
-                text(
-                    """INSERT INTO class_students(class_id,user_id)
-                            VALUES (:c,:s)
-                            ON CONFLICT (class_id,user_id) DO NOTHING"""
-                ),
-                {"c": int(class_id), "s": int(sid)},
-            )
+        add_links(conn, "class_students", cross([class_id], student_ids))
 
 def assign_course_to_students(course_id: int, student_ids: list[int]) -> int:
     """Enroll each student into a course, ignoring existing enrollments."""
@@ -572,32 +599,17 @@ def assign_course_to_students(course_id: int, student_ids: list[int]) -> int:
     if not cleaned:
         return 0
 
-    inserted = 0
     with engine.begin() as conn:
-        for sid in cleaned:
-            result = conn.execute(
-                text(
-                    """INSERT INTO enrollments(user_id, course_id)
-                            VALUES(:u, :c)
-                            ON CONFLICT (user_id, course_id) DO NOTHING"""
-                ),
-                {"u": int(sid), "c": int(course_id)},
-            )
-            if getattr(result, "rowcount", 0):
-                inserted += 1
-
-    return inserted
+        added = add_links(conn, "enrollments", cross(cleaned, [course_id]))
+    cache_bus.publish("course", int(course_id))
+    return added
 
 
 def unassign_students_from_class(class_id: int, student_ids: list[int]):
     if not student_ids:
         return
     with engine.begin() as conn:
-        for sid in student_ids:
-            conn.execute(
-                text("DELETE FROM class_students WHERE class_id=:c AND user_id=:s"),
-                {"c": int(class_id), "s": int(sid)},
-            )
+        remove_links(conn, "class_students", cross([class_id], student_ids))
 
 def set_class_archived(class_id: int, archive: bool):
     with engine.begin() as conn:
@@ -650,33 +662,8 @@ def _format_duration_ms(total_ms: float) -> str:
     return f"{days:.1f} d"
 
 
-def class_student_lesson_snapshot(user_ids: list[int]) -> pd.DataFrame:
-    """Return per-student lesson progress metrics for classroom snapshots."""
-    if not user_ids:
-        return pd.DataFrame(
-            columns=[
-                "user_id",
-                "enrollment_summary",
-                "courses_completed",
-                "lessons_completed",
-                "time_on_lessons",
-                "lesson_score",
-            ]
-        )
-
-    uids = sorted({int(uid) for uid in user_ids if uid is not None})
-    if not uids:
-        return pd.DataFrame(
-            columns=[
-                "user_id",
-                "enrollment_summary",
-                "courses_completed",
-                "lessons_completed",
-                "time_on_lessons",
-                "lesson_score",
-            ]
-        )
-
+def _class_lesson_inputs_sql(uids: list[int]):
+    """Live-SQL inputs for class_student_lesson_snapshot."""
     attempt_clause, attempt_params = _build_in_clause("user_id", uids, "at")
     attempts_sql = text(
         f"""
@@ -766,9 +753,9 @@ def class_student_lesson_snapshot(user_ids: list[int]) -> pd.DataFrame:
                    lw.lesson_id,
                    SUM(CASE WHEN ws.mastered THEN 1 ELSE 0 END) AS mastered_words,
                    SUM(CASE WHEN COALESCE(ws.total_attempts, 0) > 0 THEN 1 ELSE 0 END) AS attempted_words
-            FROM word_stats ws
-            JOIN words w ON w.headword = ws.headword
-            JOIN lesson_words lw ON lw.word_id = w.word_id
+            FROM lesson_words lw
+            JOIN words w ON w.word_id = lw.word_id
+            JOIN word_stats ws ON {word_stats_keys.stats_match("ws")}
             WHERE {master_clause} AND {lesson_filter}
             GROUP BY ws.user_id, lw.lesson_id
             """
@@ -777,6 +764,64 @@ def class_student_lesson_snapshot(user_ids: list[int]) -> pd.DataFrame:
     else:
         master_df = pd.DataFrame(columns=["user_id", "lesson_id", "mastered_words", "attempted_words"])
 
+    return attempts_df, enroll_df, lessons_df, lesson_word_counts, master_df
+
+
+def _class_lesson_inputs_snapshot(uids: list[int]):
+    """Same inputs as _class_lesson_inputs_sql, read from the analytics snapshot."""
+    attempts_df = analytics_snapshot.attempt_totals(uids)
+    enroll_df = analytics_snapshot.enrollment_lessons(uids)
+
+    course_ids = set(int(c) for c in attempts_df["course_id"].tolist() if pd.notna(c))
+    course_ids.update(int(c) for c in enroll_df["course_id"].tolist() if pd.notna(c))
+    lessons_df = analytics_snapshot.lessons_for_courses(course_ids)
+
+    lesson_ids = set(int(lid) for lid in lessons_df["lesson_id"].tolist() if pd.notna(lid))
+    lesson_ids.update(int(lid) for lid in attempts_df["lesson_id"].tolist() if pd.notna(lid))
+    lesson_word_counts = analytics_snapshot.lesson_word_counts(lesson_ids)
+    master_df = analytics_snapshot.lesson_mastery(uids, lesson_ids)
+    return attempts_df, enroll_df, lessons_df, lesson_word_counts, master_df
+
+
+
+def class_student_lesson_snapshot(user_ids: list[int]) -> pd.DataFrame:
+    """Return per-student lesson progress metrics for classroom snapshots."""
+    if not user_ids:
+        return pd.DataFrame(
+            columns=[
+                "user_id",
+                "enrollment_summary",
+                "courses_completed",
+                "lessons_completed",
+                "time_on_lessons",
+                "lesson_score",
+            ]
+        )
+
+    uids = sorted({int(uid) for uid in user_ids if uid is not None})
+    if not uids:
+        return pd.DataFrame(
+            columns=[
+                "user_id",
+                "enrollment_summary",
+                "courses_completed",
+                "lessons_completed",
+                "time_on_lessons",
+                "lesson_score",
+            ]
+        )
+
+    if analytics_snapshot.is_fresh():
+        attempts_df, enroll_df, lessons_df, lesson_word_counts, master_df = _class_lesson_inputs_snapshot(uids)
+    else:
+        attempts_df, enroll_df, lessons_df, lesson_word_counts, master_df = _class_lesson_inputs_sql(uids)
+
+    lesson_course_map = {
+        int(row["lesson_id"]): int(row["course_id"])
+        for _, row in lessons_df.iterrows()
+        if pd.notna(row.get("lesson_id")) and pd.notna(row.get("course_id"))
+    }
+
     if not master_df.empty:
         master_df["course_id"] = master_df["lesson_id"].map(lesson_course_map).astype("Int64")
 
@@ -994,6 +1039,7 @@ def get_classes_for_student(user_id: int, include_archived: bool = True) -> pd.D
     return pd.read_sql(text(sql), con=engine, params={"uid": int(user_id)})
 
 def lesson_words(course_id, lesson_id):
+    """Rows (headword, synonyms, difficulty) of a lesson, in lesson order."""
     sql = """
         SELECT w.headword, w.synonyms, w.difficulty
         FROM lesson_words lw
@@ -1002,101 +1048,204 @@ def lesson_words(course_id, lesson_id):
         WHERE lw.lesson_id = :lid AND l.course_id = :cid
         ORDER BY lw.sort_order
     """
-    return pd.read_sql(text(sql), con=engine, params={"lid": int(lesson_id), "cid": int(course_id)})
+    return fetch.rows(engine, sql, {"lid": int(lesson_id), "cid": int(course_id)})
+
+class LessonWord(NamedTuple):
+    headword: str
+    synonyms: tuple[str, ...]
+    difficulty: int
+
+
+class LessonWordSet:
+    """
+    A lesson's words, read-only: indexed by headword (first row wins, as the
+    old frame lookups did), synonyms pre-split, headwords bucketed by
+    difficulty. Built once per lesson by lesson_word_set() and shared by
+    every rerun and session.
+    """
+
+    __slots__ = ("words", "headwords", "by_headword", "by_difficulty", "_distractors")
+
+    def __init__(self, rows):
+        words, by_headword, by_difficulty, distractors = [], {}, {}, []
+        for r in rows:
+            word = LessonWord(
+                r.headword,
+                tuple(s.strip() for s in str(r.synonyms or "").split(",") if s.strip()),
+                int(r.difficulty) if r.difficulty is not None else 2,
+            )
+            words.append(word)
+            by_headword.setdefault(word.headword, word)
+            by_difficulty.setdefault(word.difficulty, []).append(word.headword)
+            owner = str(word.headword or "").strip()
+            if owner:
+                distractors.append((owner.lower(), owner))
+            distractors.extend((owner.lower(), syn) for syn in word.synonyms)
+        self.words = tuple(words)
+        self.headwords = tuple(w.headword for w in words)
+        self.by_headword = MappingProxyType(by_headword)
+        self.by_difficulty = MappingProxyType({d: tuple(hws) for d, hws in by_difficulty.items()})
+        self._distractors = tuple(distractors)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __contains__(self, headword):
+        return headword in self.by_headword
+
+    def get(self, headword) -> Optional[LessonWord]:
+        return self.by_headword.get(headword)
+
+    def distractors_for(self, headword: str) -> list[str]:
+        """Other words' headwords and synonyms, in lesson order (a new list)."""
+        own = str(headword).strip().lower()
+        return [cand for owner, cand in self._distractors if owner != own]
+
+
+@tagged_cache.memoize(lambda course_id, lesson_id: [("course", int(course_id)), ("lesson", int(lesson_id))])
+def lesson_word_set(course_id: int, lesson_id: int) -> LessonWordSet:
+    return LessonWordSet(lesson_words(course_id, lesson_id))
 
 def mastered_count(user_id, lesson_id):
-    words = pd.read_sql(
-        text("""
-            SELECT w.headword
+    row = fetch.one(
+        engine,
+        f"""
+            SELECT COUNT(*) AS total,
+                   COUNT(DISTINCT s.headword) FILTER (WHERE s.mastered) AS mastered
             FROM lesson_words lw
             JOIN words w ON w.word_id=lw.word_id
+            LEFT JOIN word_stats s ON s.user_id=:u AND {word_stats_keys.stats_match()}
             WHERE lw.lesson_id=:lid
-        """),
-        con=engine, params={"lid": int(lesson_id)}
-    )["headword"].tolist()
-    if not words:
+        """,
+        {"u": int(user_id), "lid": int(lesson_id)},
+    )
+    if not row.total:
         return 0, 0
-    m = pd.read_sql(
-        text("""
-            SELECT COUNT(*) AS c
-            FROM word_stats
-            WHERE user_id=:u AND mastered=TRUE AND headword = ANY(:arr)
-        """),
-        con=engine,
-        params={"u": int(user_id), "arr": words}
-    )["c"].iloc[0]
-    return int(m), len(words)
-
+    return int(row.mastered), int(row.total)
 
-def level_for_xp(xp_total: int):
-    xp_total = int(xp_total or 0)
-    for band in LEVEL_BANDS:
-        upper = band["max"]
-        if upper is None or xp_total <= upper:
-            return band
-    return LEVEL_BANDS[-1]
 
+# gamification_summary holds one row of running totals per user; see
+# db/migrations/202610_gamification_summary.sql. update_after_attempt and
+# grant_badge keep it current, and a missing row is rebuilt from the
+# source tables by the query below.
+ANSWER_STREAK_CAP = 200
 
-def next_level_band(current_band: dict | None):
-    if not current_band:
-        return None
-    for idx, band in enumerate(LEVEL_BANDS):
-        if band["level"] == current_band["level"]:
-            return LEVEL_BANDS[idx + 1] if idx + 1 < len(LEVEL_BANDS) else None
-    return None
+GAMIFICATION_COLUMNS = """
+    xp_from_words, xp_from_badges, mastered_words, correct_words,
+    answer_streak, login_streak, last_active_day, level
+"""
 
+GAMIFICATION_REBUILD_SQL = f"""
+    WITH ws AS (
+        SELECT COALESCE(SUM(xp_points), 0)                  AS xp,
+               COUNT(*) FILTER (WHERE mastered IS TRUE)     AS mastered,
+               COUNT(*) FILTER (WHERE correct_attempts > 0) AS correct
+        FROM word_stats
+        WHERE user_id = :u
+    ), ach AS (
+        SELECT COALESCE(SUM(xp_bonus), 0) AS xp
+        FROM achievements
+        WHERE user_id = :u
+    ), answers AS (
+        SELECT LEAST(COUNT(*), {ANSWER_STREAK_CAP}) AS streak
+        FROM attempts
+        WHERE user_id = :u
+          AND id > COALESCE((SELECT MAX(id) FROM attempts
+                             WHERE user_id = :u AND NOT COALESCE(is_correct, FALSE)), 0)
+    ), days AS (
+        SELECT DISTINCT DATE(ts) AS day
+        FROM attempts
+        WHERE user_id = :u AND ts IS NOT NULL
+    ), runs AS (
+        -- days in the run ending on the latest day all have day + row_number = latest + 1
+        SELECT day + (ROW_NUMBER() OVER (ORDER BY day DESC))::int AS run_key,
+               MAX(day) OVER ()                                   AS last_day
+        FROM days
+    ), logins AS (
+        SELECT MAX(last_day) AS last_day,
+               COUNT(*) FILTER (WHERE run_key = last_day + 1) AS streak
+        FROM runs
+    )
+    INSERT INTO gamification_summary (
+        user_id, {GAMIFICATION_COLUMNS}, updated_at
+    )
+    SELECT :u, ws.xp, ach.xp, ws.mastered, ws.correct,
+           answers.streak, logins.streak, logins.last_day,
+           {level_sql("(ws.xp + ach.xp)")}, now()
+    FROM ws, ach, answers, logins
+    ON CONFLICT (user_id) DO UPDATE SET
+        xp_from_words   = EXCLUDED.xp_from_words,
+        xp_from_badges  = EXCLUDED.xp_from_badges,
+        mastered_words  = EXCLUDED.mastered_words,
+        correct_words   = EXCLUDED.correct_words,
+        answer_streak   = EXCLUDED.answer_streak,
+        login_streak    = EXCLUDED.login_streak,
+        last_active_day = EXCLUDED.last_active_day,
+        level           = EXCLUDED.level,
+        updated_at      = now()
+    RETURNING {GAMIFICATION_COLUMNS}
+"""
 
-def compute_answer_streak(conn, user_id: int, limit: int = 200) -> int:
-    rows = conn.execute(
-        text(
-            """
-            SELECT is_correct
-            FROM attempts
-            WHERE user_id=:u
-            ORDER BY id DESC
-            LIMIT :lim
-            """
-        ),
-        {"u": int(user_id), "lim": int(limit)},
-    ).fetchall()
+# One answer's deltas. attempts.ts defaults to the transaction time, so
+# CURRENT_DATE is the day the rebuild query would see for this attempt.
+GAMIFICATION_ATTEMPT_SQL = f"""
+    UPDATE gamification_summary SET
+        xp_from_words   = xp_from_words + :xp,
+        mastered_words  = mastered_words + :mastered,
+        correct_words   = correct_words + :correct_word,
+        answer_streak   = CASE WHEN :ok THEN LEAST(answer_streak + 1, {ANSWER_STREAK_CAP}) ELSE 0 END,
+        login_streak    = CASE WHEN last_active_day = CURRENT_DATE     THEN login_streak
+                               WHEN last_active_day = CURRENT_DATE - 1 THEN login_streak + 1
+                               ELSE 1 END,
+        last_active_day = CURRENT_DATE,
+        level           = {level_sql("(xp_from_words + :xp + xp_from_badges)")},
+        updated_at      = now()
+    WHERE user_id = :u
+    RETURNING {GAMIFICATION_COLUMNS}
+"""
 
-    streak = 0
-    for row in rows:
-        if row[0]:
-            streak += 1
-        else:
-            break
-    return streak
+GAMIFICATION_BADGE_SQL = f"""
+    UPDATE gamification_summary SET
+        xp_from_badges = xp_from_badges + :xp,
+        level          = {level_sql("(xp_from_words + xp_from_badges + :xp)")},
+        updated_at     = now()
+    WHERE user_id = :u
+"""
 
 
-def compute_login_streak(conn, user_id: int) -> int:
-    rows = conn.execute(
-        text(
-            """
-            SELECT DISTINCT DATE(ts) AS day
-            FROM attempts
-            WHERE user_id=:u
-            ORDER BY day DESC
-            """
-        ),
+def gamification_summary(conn, user_id: int):
+    """The user's summary row, rebuilt from the source tables if missing."""
+    row = conn.execute(
+        text(f"SELECT {GAMIFICATION_COLUMNS} FROM gamification_summary WHERE user_id=:u"),
         {"u": int(user_id)},
-    ).fetchall()
+    ).mappings().fetchone()
+    if row is None:
+        row = conn.execute(text(GAMIFICATION_REBUILD_SQL), {"u": int(user_id)}).mappings().fetchone()
+    return row
 
-    dates = [r[0] for r in rows if r[0] is not None]
-    if not dates:
-        return 0
 
-    streak = 1
-    last_day = dates[0]
-    for day in dates[1:]:
-        if last_day == day:
-            continue
-        if (last_day - day) == timedelta(days=1):
-            streak += 1
-            last_day = day
-        else:
-            break
-    return streak
+def record_attempt_summary(conn, user_id: int, *, is_correct: bool, xp: int, became_mastered: bool, first_correct: bool):
+    """
+    Apply one answer to gamification_summary. Runs after the attempts and
+    word_stats writes, so a rebuild for a missing row already counts it.
+    """
+    row = conn.execute(
+        text(GAMIFICATION_ATTEMPT_SQL),
+        {
+            "u": int(user_id),
+            "xp": int(xp),
+            "mastered": 1 if became_mastered else 0,
+            "correct_word": 1 if first_correct else 0,
+            "ok": bool(is_correct),
+        },
+    ).mappings().fetchone()
+    if row is None:
+        row = conn.execute(text(GAMIFICATION_REBUILD_SQL), {"u": int(user_id)}).mappings().fetchone()
+    leaderboards.add_weekly_xp(conn, user_id, xp)
+    return row
 
 
 def grant_badge(conn, user_id: int, badge_name: str):
@@ -1127,29 +1276,30 @@ def grant_badge(conn, user_id: int, badge_name: str):
             "xp": int(definition.get("xp_bonus", 0)),
         },
     ).mappings().fetchone()
+    if row:
+        conn.execute(
+            text(GAMIFICATION_BADGE_SQL),
+            {"u": int(user_id), "xp": int(row["xp_bonus"] or 0)},
+        )
+        leaderboards.add_weekly_xp(conn, user_id, int(row["xp_bonus"] or 0))
 
     return dict(row) if row else None
 
 
-def evaluate_badges(conn, user_id: int):
+def evaluate_badges(conn, user_id: int, summary=None):
     newly_awarded = []
+    if summary is None:
+        summary = gamification_summary(conn, user_id)
 
     def maybe_award(name: str):
         badge = grant_badge(conn, user_id, name)
         if badge:
             newly_awarded.append(badge)
 
-    correct_words = conn.execute(
-        text("SELECT COUNT(*) FROM word_stats WHERE user_id=:u AND correct_attempts > 0"),
-        {"u": int(user_id)},
-    ).scalar() or 0
-    if correct_words >= 1:
+    if int(summary["correct_words"]) >= 1:
         maybe_award("First Word Hero")
 
-    mastered_total = conn.execute(
-        text("SELECT COUNT(*) FROM word_stats WHERE user_id=:u AND mastered IS TRUE"),
-        {"u": int(user_id)},
-    ).scalar() or 0
+    mastered_total = int(summary["mastered_words"])
     if mastered_total >= 10:
         maybe_award("Ten Words Mastered")
     if mastered_total >= 50:
@@ -1224,8 +1374,7 @@ def evaluate_badges(conn, user_id: int):
             maybe_award("Course Finisher")
             break
 
-    login_streak = compute_login_streak(conn, user_id)
-    if login_streak >= 7:
+    if int(summary["login_streak"]) >= 7:
         maybe_award("Weekly Streaker")
 
     return newly_awarded
@@ -1233,22 +1382,7 @@ def evaluate_badges(conn, user_id: int):
 
 def gamification_snapshot(user_id: int):
     with engine.begin() as conn:
-        xp_words = conn.execute(
-            text("SELECT COALESCE(SUM(xp_points), 0) FROM word_stats WHERE user_id=:u"),
-            {"u": int(user_id)},
-        ).scalar() or 0
-        xp_badges = conn.execute(
-            text("SELECT COALESCE(SUM(xp_bonus), 0) FROM achievements WHERE user_id=:u"),
-            {"u": int(user_id)},
-        ).scalar() or 0
-        mastered_total = conn.execute(
-            text("SELECT COUNT(*) FROM word_stats WHERE user_id=:u AND mastered IS TRUE"),
-            {"u": int(user_id)},
-        ).scalar() or 0
-        correct_words = conn.execute(
-            text("SELECT COUNT(*) FROM word_stats WHERE user_id=:u AND correct_attempts > 0"),
-            {"u": int(user_id)},
-        ).scalar() or 0
+        summary = gamification_summary(conn, user_id)
         badges = conn.execute(
             text(
                 """
@@ -1260,9 +1394,9 @@ def gamification_snapshot(user_id: int):
             ),
             {"u": int(user_id)},
         ).mappings().all()
-        answer_streak = compute_answer_streak(conn, user_id)
-        login_streak = compute_login_streak(conn, user_id)
 
+    xp_words = int(summary["xp_from_words"])
+    xp_badges = int(summary["xp_from_badges"])
     xp_total = int(xp_words) + int(xp_badges)
     current_band = level_for_xp(xp_total)
     next_band = next_level_band(current_band)
@@ -1292,10 +1426,10 @@ def gamification_snapshot(user_id: int):
         "xp_to_next": xp_to_next,
         "progress_pct": progress_pct,
         "badges": [dict(b) for b in badges],
-        "mastered_words": int(mastered_total),
-        "correct_words": int(correct_words),
-        "current_streak": int(answer_streak),
-        "login_streak": int(login_streak),
+        "mastered_words": int(summary["mastered_words"]),
+        "correct_words": int(summary["correct_words"]),
+        "current_streak": int(summary["answer_streak"]),
+        "login_streak": int(summary["login_streak"]),
     }
 
 
@@ -1560,6 +1694,90 @@ def render_gamification_panels(snapshot: dict, highlight: set[str] | None = None
     """
     return sidebar_html, mobile_html
 
+def render_class_ranking(class_id: int, class_name: str, user_id: int, k: int = 5):
+    """Live class leaderboard in the sidebar: top k plus the student's own place."""
+    st.subheader(f"🏆 {class_name}")
+    weekly = st.radio(
+        "Ranking",
+        ["This week", "All time"],
+        horizontal=True,
+        key="class_ranking_period",
+        label_visibility="collapsed",
+    ) == "This week"
+    board = leaderboards.class_standings(engine, class_id, k, user_id=user_id, weekly=weekly)
+    if not board:
+        st.caption("No classmates yet.")
+        return
+    lines = []
+    for pos, row in enumerate(board):
+        if pos == k:  # the student's own row, below the top k
+            lines.append("…")
+        label = html.escape(str(row.name))
+        if row.user_id == int(user_id):
+            label = f"<b>{label} (you)</b>"
+        lines.append(f"{row.rank}. {label} — {int(row.xp)} XP")
+    st.markdown("<br>".join(lines), unsafe_allow_html=True)
+
+@attempt_events.on_write("synonym_quiz")
+def _write_synonym_attempts(executor, events):
+    attempt_events.run(
+        executor,
+        """
+        INSERT INTO attempts(user_id,course_id,lesson_id,headword,is_correct,response_ms,chosen,correct_choice)
+        SELECT * FROM UNNEST(%s::INTEGER[],%s::INTEGER[],%s::INTEGER[],%s::TEXT[],%s::BOOLEAN[],%s::INTEGER[],%s::TEXT[],%s::TEXT[])
+        """,
+        (
+            [e.user_id for e in events],
+            [e.course_id for e in events],
+            [e.lesson_id for e in events],
+            [e.item_key for e in events],
+            [bool(e.is_correct) for e in events],
+            [e.response_ms for e in events],
+            [e.answer for e in events],
+            [(e.extra or {}).get("correct_choice") for e in events],
+        ),
+    )
+    # latest outcome per (user, lesson, headword); last event of a batch wins
+    attempt_events.run(
+        executor,
+        """
+        INSERT INTO lesson_word_outcomes (user_id, lesson_id, headword, is_correct, attempted_at)
+        SELECT DISTINCT ON (u, l, h) u, l, h, c, now()
+        FROM UNNEST(%s::INTEGER[], %s::INTEGER[], %s::TEXT[], %s::BOOLEAN[]) WITH ORDINALITY AS t(u, l, h, c, n)
+        WHERE u IS NOT NULL AND l IS NOT NULL AND h IS NOT NULL
+        ORDER BY u, l, h, n DESC
+        ON CONFLICT (user_id, lesson_id, headword) DO UPDATE SET
+            is_correct   = EXCLUDED.is_correct,
+            attempted_at = EXCLUDED.attempted_at
+        """,
+        (
+            [e.user_id for e in events],
+            [e.lesson_id for e in events],
+            [e.item_key for e in events],
+            [bool(e.is_correct) for e in events],
+        ),
+    )
+
+@attempt_events.on_commit("synonym_quiz")
+def _invalidate_user_progress(events):
+    # a headword can sit in several lessons, so all of the user's entries go
+    tagged_cache.invalidate(*{("user", int(e.user_id)) for e in events})
+
+@attempt_events.on_commit("synonym_quiz")
+def _invalidate_session_gamification(events):
+    # the cached snapshot is only good until this user's next answer
+    owner = st.session_state.get("gamification_user_id")
+    if owner is not None and any(int(e.user_id) == int(owner) for e in events):
+        st.session_state.pop("gamification_user_id", None)
+
+
+def session_gamification(user_id: int):
+    """gamification_snapshot for this session, reused across reruns until the next attempt."""
+    if st.session_state.get("gamification_user_id") != user_id or not st.session_state.get("gamification"):
+        st.session_state.gamification = gamification_snapshot(user_id)
+        st.session_state.gamification_user_id = user_id
+    return st.session_state.gamification
+
 def update_after_attempt(user_id, course_id, lesson_id, headword, is_correct, response_ms, difficulty, chosen, correct_choice):
     xp_awarded = 0
     xp_for_word = 0
@@ -1569,7 +1787,7 @@ def update_after_attempt(user_id, course_id, lesson_id, headword, is_correct, re
         row = conn.execute(
             text(
                 """
-                SELECT correct_streak, streak_count, mastered, xp_points
+                SELECT correct_streak, streak_count, mastered, xp_points, correct_attempts
                 FROM word_stats
                 WHERE user_id=:u AND headword=:h
                 """
@@ -1622,26 +1840,33 @@ def update_after_attempt(user_id, course_id, lesson_id, headword, is_correct, re
             },
         )
 
-        conn.execute(
-            text(
-                """
-                INSERT INTO attempts(user_id,course_id,lesson_id,headword,is_correct,response_ms,chosen,correct_choice)
-                VALUES (:u,:c,:l,:h,:ok,:ms,:ch,:cc)
-                """
-            ),
-            {
-                "u": user_id,
-                "c": course_id,
-                "l": lesson_id,
-                "h": headword,
-                "ok": bool(is_correct),
-                "ms": int(response_ms),
-                "ch": chosen,
-                "cc": correct_choice,
-            },
+        event = AttemptEvent(
+            source="synonym_quiz",
+            user_id=user_id,
+            is_correct=bool(is_correct),
+            lesson_id=lesson_id,
+            course_id=course_id,
+            response_ms=int(response_ms),
+            answer=chosen,
+            item_key=headword,
+            extra={"correct_choice": correct_choice},
         )
+        attempt_events.publish([event], conn)
+        # no cache_bus notify per answer (NOTIFY serialises commits);
+        # _invalidate_user_progress evicts the user in this process, and
+        # sessions stay on one replica
+
+        summary = record_attempt_summary(
+            conn,
+            user_id,
+            is_correct=bool(is_correct),
+            xp=xp_for_word,
+            became_mastered=became_mastered,
+            first_correct=bool(is_correct) and not int((row or {}).get("correct_attempts") or 0),
+        )
+        new_badges = evaluate_badges(conn, user_id, summary)
 
-        new_badges = evaluate_badges(conn, user_id)
+    attempt_events.dispatch_committed([event])
 
     xp_awarded += sum(int(b.get("xp_bonus", 0) or 0) for b in new_badges)
 
@@ -1653,20 +1878,26 @@ def update_after_attempt(user_id, course_id, lesson_id, headword, is_correct, re
     }
 
 def recent_stats(user_id, course_id, lesson_id, n=10):
-    df = pd.read_sql(
-        text("""
+    rows = fetch.rows(
+        engine,
+        """
             SELECT is_correct::int AS is_correct, response_ms
             FROM attempts
             WHERE user_id=:u AND course_id=:c AND lesson_id=:l
             ORDER BY id DESC LIMIT :n
-        """),
-        con=engine, params={"u": user_id, "c": course_id, "l": lesson_id, "n": int(n)}
+        """,
+        {"u": user_id, "c": course_id, "l": lesson_id, "n": int(n)},
     )
-    if df.empty:
+    if not rows:
         return {"accuracy": 0.0, "avg_ms": 15000.0}
-    return {"accuracy": float(df["is_correct"].mean()), "avg_ms": float(df["response_ms"].mean())}
+    correct = [r.is_correct for r in rows if r.is_correct is not None]
+    times = [r.response_ms for r in rows if r.response_ms is not None]
+    return {
+        "accuracy": sum(correct) / len(correct) if correct else float("nan"),
+        "avg_ms": sum(times) / len(times) if times else float("nan"),
+    }
 
-def choose_next_word(user_id, course_id, lesson_id, df_words):
+def choose_next_word(user_id, course_id, lesson_id, words):
     """Adaptive next word (simple rule: recent accuracy & speed)."""
     stats = recent_stats(user_id, course_id, lesson_id, n=10)
     acc, avg = stats["accuracy"], stats["avg_ms"]
@@ -1676,15 +1907,14 @@ def choose_next_word(user_id, course_id, lesson_id, df_words):
         tgt = 1
     else:
         tgt = 2
-    candidates = df_words[df_words["difficulty"] == tgt]["headword"].tolist() or df_words["headword"].tolist()
+    candidates = words.by_difficulty.get(tgt) or words.headwords
     hist = st.session_state.get("asked_history", [])
     pool = [w for w in candidates if w not in hist[-3:]] or candidates
     return random.choice(pool)
 
 def build_question_payload(
-    headword: str,
-    synonyms_str: str,
-    lesson_df: pd.DataFrame | None = None,
+    word: LessonWord,
+    lesson: LessonWordSet | None = None,
 ):
     """Construct a multiple-choice payload for the active headword.
 
@@ -1694,7 +1924,8 @@ def build_question_payload(
     to ensure six options are always presented.
     """
 
-    syn_list = [s.strip() for s in str(synonyms_str).split(",") if s.strip()]
+    headword = word.headword
+    syn_list = list(word.synonyms)
     correct = syn_list[:2] if len(syn_list) >= 2 else syn_list[:1]
  #   if len(correct) == 1:
  #       correct = [correct[0], f"{correct[0]} (close)"]
@@ -1702,22 +1933,9 @@ def build_question_payload(
     seen_lower = {c.lower() for c in correct}
 
     distractors: list[str] = []
-    if lesson_df is not None and not lesson_df.empty:
-        candidates: list[str] = []
-        for _, row in lesson_df.iterrows():
-            other_headword = str(row.get("headword", "")).strip()
-            if other_headword.lower() == headword.lower():
-                continue
-
-            # Add the other headword and its synonyms as potential distractors.
-            if other_headword:
-                candidates.append(other_headword)
-
-            other_synonyms = [
-                s.strip() for s in str(row.get("synonyms", "")).split(",") if s.strip()
-            ]
-            candidates.extend(other_synonyms)
-
+    if lesson:
+        # Other words' headwords and synonyms are the potential distractors.
+        candidates = lesson.distractors_for(headword)
         random.shuffle(candidates)
         for cand in candidates:
             cand_l = cand.lower()
@@ -1863,11 +2081,14 @@ def _hide_default_h1_and_set(title_text: str):
 # ─────────────────────────────────────────────────────────────────────
 # Teacher UI V2 helpers (caching + CRUD)
 # ─────────────────────────────────────────────────────────────────────
-@st.cache_data(ttl=10)
+# Cached until a write below invalidates the matching tags (shared.tagged_cache):
+# ("courses",) the list, ("course", id) its lessons and enrollments,
+# ("lessons",) every lesson list, ("lesson", id) its words, ("students",) accounts.
+@tagged_cache.memoize(lambda: [("courses",)], copy=True)
 def td2_get_courses():
     return pd.read_sql(text("SELECT course_id, title, description FROM courses ORDER BY title"), con=engine)
 
-@st.cache_data(ttl=10)
+@tagged_cache.memoize(lambda course_id: [("course", int(course_id)), ("lessons",)], copy=True)
 def td2_get_lessons(course_id: int):
     df = pd.read_sql(
         text(
@@ -1881,7 +2102,7 @@ def td2_get_lessons(course_id: int):
     )
     return df
 
-@st.cache_data(ttl=10)
+@tagged_cache.memoize(lambda: [("students",)], copy=True)
 def td2_get_active_students():
     return pd.read_sql(text("""
         SELECT user_id, name, email FROM users
@@ -1889,7 +2110,7 @@ def td2_get_active_students():
         ORDER BY name
     """), con=engine)
 
-@st.cache_data(ttl=10)
+@tagged_cache.memoize(lambda course_id: [("course", int(course_id)), ("students",)], copy=True)
 def td2_get_enrollments_for_course(course_id: int):
     return pd.read_sql(text("""
         SELECT E.user_id, U.name, U.email
@@ -1897,34 +2118,41 @@ def td2_get_enrollments_for_course(course_id: int):
         WHERE E.course_id=:c ORDER BY U.name
     """), con=engine, params={"c": int(course_id)})
 
-@st.cache_data(ttl=10)
-def td2_get_lesson_words_export(course_id: int, lesson_id: int):
-    return pd.read_sql(
-        text(
-            """
-            SELECT
-              L.lesson_id,
-              L.title         AS lesson_title,
-              L.sort_order    AS lesson_sort_order,
-              COALESCE(L.instructions, '') AS lesson_instructions,
-              LW.sort_order   AS word_sort_order,
-              W.word_id,
-              W.headword,
-              W.synonyms,
-              W.difficulty
-            FROM lessons L
-            JOIN lesson_words LW ON LW.lesson_id = L.lesson_id
-            JOIN words W        ON W.word_id    = LW.word_id
-            WHERE L.course_id = :cid AND L.lesson_id = :lid
-            ORDER BY LW.sort_order, W.headword
-            """
-        ),
-        con=engine,
-        params={"cid": int(course_id), "lid": int(lesson_id)},
+TD2_LESSON_WORDS_EXPORT_SQL = """
+    SELECT
+      L.lesson_id,
+      L.title         AS lesson_title,
+      L.sort_order    AS lesson_sort_order,
+      COALESCE(L.instructions, '') AS lesson_instructions,
+      LW.sort_order   AS word_sort_order,
+      W.word_id,
+      W.headword,
+      W.synonyms,
+      W.difficulty
+    FROM lessons L
+    JOIN lesson_words LW ON LW.lesson_id = L.lesson_id
+    JOIN words W        ON W.word_id    = LW.word_id
+    WHERE L.course_id = %s AND L.lesson_id = %s
+    ORDER BY LW.sort_order, W.headword
+"""
+
+def td2_write_lesson_words_csv(out, course_id: int, lesson_id: int, gzip: bool = False) -> int:
+    """Stream a lesson's words as CSV onto `out`; returns rows written."""
+    return write_query_csv(
+        out,
+        TD2_LESSON_WORDS_EXPORT_SQL,
+        (int(course_id), int(lesson_id)),
+        connect=sqlalchemy_connect(engine),
+        gzip=gzip,
     )
 
-def td2_invalidate():
-    st.cache_data.clear()
+def td2_invalidate(*tags):
+    """
+    Drop cached reads depending on any of `tags`, e.g. ("course", 3), here
+    and in every other app process (shared.cache_bus). Call after commit.
+    """
+    for tag in tags:
+        cache_bus.publish(tag[0], tag[1] if len(tag) > 1 else None)
 
 def td2_save_course_edits(df):
     with engine.begin() as conn:
@@ -2076,6 +2304,8 @@ def td2_import_course_csv(course_id: int, df_csv: pd.DataFrame,
             pos_by_lid[lid] += 1
             words_imported += 1
 
+    touched = set(pos_by_lid) | set(lids_to_clear if refresh else ())
+    td2_invalidate(("course", int(course_id)), *[("lesson", int(lid)) for lid in touched])
     return words_imported, lessons_created
 
 # ─────────────────────────────────────────────────────────────────────
@@ -2224,7 +2454,9 @@ def sp_create_spelling_course(title: str, description: str, sort_order: int | No
     columns_sql = ", ".join(insert_cols)
     values_sql = ", ".join([f":{c}" for c in insert_cols])
     query = f"INSERT INTO courses ({columns_sql}) VALUES ({values_sql})"
-    return sp_execute(query, params)
+    result = sp_execute(query, params)
+    td2_invalidate(("courses",))
+    return result
 
 
 def sp_create_spelling_lesson(course_id: int, title: str, instructions: str, sort_order: int | None):
@@ -2248,7 +2480,9 @@ def sp_create_spelling_lesson(course_id: int, title: str, instructions: str, sor
     columns_sql = ", ".join(insert_cols)
     values_sql = ", ".join([f":{c}" for c in insert_cols])
     query = f"INSERT INTO lessons ({columns_sql}) VALUES ({values_sql})"
-    return sp_execute(query, params)
+    result = sp_execute(query, params)
+    td2_invalidate(("course", int(course_id)), ("lessons",))
+    return result
 
 
 def sp_update_spelling_lesson(lesson_id: int, title: str, instructions: str, sort_order: int | None):
@@ -2273,15 +2507,19 @@ def sp_update_spelling_lesson(lesson_id: int, title: str, instructions: str, sor
 
     pk = sp_lesson_pk_column()
     query = f"UPDATE lessons SET {', '.join(sets)} WHERE {pk} = :lid"
-    return sp_execute(query, params)
+    result = sp_execute(query, params)
+    td2_invalidate(("lessons",), ("lesson", int(lesson_id)))
+    return result
 
 
 def sp_delete_spelling_lesson(lesson_id: int):
     pk = sp_lesson_pk_column()
-    return sp_execute(
+    result = sp_execute(
         f"DELETE FROM lessons WHERE {pk} = :lid",
         {"lid": int(lesson_id)},
     )
+    td2_invalidate(("lessons",), ("lesson", int(lesson_id)))
+    return result
 
 
 def sp_spelling_word_count(lesson_id: int) -> int:
@@ -2367,7 +2605,7 @@ def teacher_create_ui():
                 with engine.begin() as conn:
                     conn.execute(text("INSERT INTO courses(title, description) VALUES(:t,:d)"),
                                  {"t": title.strip(), "d": desc.strip()})
-                td2_invalidate()
+                td2_invalidate(("courses",))
                 st.success("Course created.")
                 st.rerun()
             else:
@@ -2397,7 +2635,7 @@ def teacher_create_ui():
                             INSERT INTO lessons(course_id, title, sort_order, instructions)
                             VALUES(:c,:t,:o,:i)
                         """), {"c": int(cid), "t": lt.strip(), "o": int(so), "i": instr.strip()})
-                    td2_invalidate()
+                    td2_invalidate(("course", int(cid)))
                     st.success("Lesson created.")
                     st.rerun()
                 else:
@@ -2514,7 +2752,7 @@ def teacher_manage_ui():
             )
             if st.button("Save course edits", key="td2_save_courses"):
                 td2_save_course_edits(edited)
-                td2_invalidate()
+                td2_invalidate(("courses",))
                 st.success("Courses updated.")
                 st.rerun()
 
@@ -2526,7 +2764,7 @@ def teacher_manage_ui():
                 if st.button("Delete course", type="secondary", key="td2_course_delete_btn"):
                     if confirm.strip().upper() == "DELETE":
                         td2_delete_course(cid_del)
-                        td2_invalidate()
+                        td2_invalidate(("courses",), ("course", int(cid_del)))
                         st.success("Course deleted.")
                         st.rerun()
                     else:
@@ -2566,7 +2804,7 @@ def teacher_manage_ui():
                 )
                 if st.button("Save lesson edits", key="td2_save_lessons"):
                     td2_save_lesson_edits(cid_sel, edited_l)
-                    td2_invalidate()
+                    td2_invalidate(("course", int(cid_sel)))
                     st.success("Lessons updated.")
                     st.rerun()
 
@@ -2582,7 +2820,7 @@ def teacher_manage_ui():
                     if st.button("Delete lesson", type="secondary", key="td2_lesson_delete_btn"):
                         if confirm_l.strip().upper() == "DELETE":
                             td2_delete_lesson(lid_del)
-                            td2_invalidate()
+                            td2_invalidate(("course", int(cid_sel)), ("lesson", int(lid_del)))
                             st.success("Lesson deleted.")
                             st.rerun()
                         else:
@@ -2612,7 +2850,7 @@ def teacher_manage_ui():
                             else:
                                 df_csv.columns = [c.lower().strip() for c in df_csv.columns]
                                 n = td2_import_words_csv(int(lid_target), df_csv, replace)
-                                td2_invalidate()
+                                td2_invalidate(("lesson", int(lid_target)))
                                 st.success(f"Imported {n} words.")
                                 st.rerun()
                         except Exception as e:
@@ -2632,14 +2870,14 @@ def teacher_manage_ui():
                 )
 
                 if lid_download is not None:
-                    df_export = td2_get_lesson_words_export(int(cid_sel), int(lid_download))
+                    export = spooled_export(td2_write_lesson_words_csv, int(cid_sel), int(lid_download))
                     lesson_title = dfl_download.loc[dfl_download["lesson_id"] == lid_download, "title"].values[0]
                     safe_title = re.sub(r"[^A-Za-z0-9_-]+", "_", lesson_title.strip()) or f"lesson_{int(lid_download)}"
 
-                    if df_export.empty:
+                    if not export.rows:
                         st.info("The selected lesson has no words to export yet.")
                     else:
-                        csv_bytes = df_export.to_csv(index=False).encode("utf-8")
+                        csv_bytes = export.read()
                         st.caption(
                             "Includes lesson metadata, word order, headwords, synonyms, and difficulty levels from the database."
                         )
@@ -2689,7 +2927,7 @@ def teacher_manage_ui():
                             ),
                             {"u": int(sid_assign), "c": int(cid_assign)},
                         )
-                    td2_invalidate()
+                    td2_invalidate(("course", int(cid_assign)))
                     st.success("Enrolled.")
 
             st.markdown("**Currently enrolled**")
@@ -2712,7 +2950,7 @@ def teacher_manage_ui():
                                 text("DELETE FROM enrollments WHERE user_id=:u AND course_id=:c"),
                                 {"u": int(sid), "c": int(cid_assign)},
                             )
-                    td2_invalidate()
+                    td2_invalidate(("course", int(cid_assign)))
                     st.success("Removed.")
                     st.rerun()
 
@@ -2769,7 +3007,6 @@ def teacher_manage_ui():
                             roster["user_id"].tolist(),
                         )
                         if assigned:
-                            td2_invalidate()
                             st.success(
                                 f"Assigned course to {assigned} student{'s' if assigned != 1 else ''}."
                             )
@@ -2856,6 +3093,7 @@ def teacher_manage_ui():
                                 st.warning("Lesson deleted.")
                                 st.rerun()
 
+@profile_rerun("teacher_dashboard_v2", role="admin")
 def render_teacher_dashboard_v2():
     """Render the teacher dashboard experience using the v2 helper routines."""
 
@@ -3034,7 +3272,13 @@ def login_form():
             st.sidebar.error("User not found."); return
         if not u["is_active"]:
             st.sidebar.error("Account disabled."); return
-        if not bcrypt.verify(pwd, u["password_hash"]):
+        if is_rate_limited(u["email"]):
+            st.sidebar.error("Too many failed attempts. Please wait a few minutes."); return
+        try:
+            ok = verify_password(pwd, u["password_hash"], email=u["email"])
+        except RateLimited:
+            st.sidebar.error("Too many failed attempts. Please wait a few minutes."); return
+        if not ok:
             st.sidebar.error("Wrong password."); return
 
         # Role enforcement
@@ -3279,38 +3523,30 @@ def course_progress(user_id: int, course_id: int):
     - Otherwise show attempted% (attempted/total).
     Returns: (mastered_count, total_words, percent_int)
     """
-    all_words = pd.read_sql(
-        text("""
-            SELECT w.headword
-            FROM lessons L
-            JOIN lesson_words lw ON lw.lesson_id = L.lesson_id
-            JOIN words w ON w.word_id = lw.word_id
-            WHERE L.course_id = :c
-        """),
-        con=engine, params={"c": int(course_id)}
-    )["headword"].tolist()
-
-    total = len(set(all_words))
-    if total == 0:
-        return (0, 0, 0)
-
     df_row = pd.read_sql(
-        text("""
+        text(f"""
+            WITH course_words AS (
+              SELECT DISTINCT w.headword_id, w.headword
+              FROM lessons L
+              JOIN lesson_words lw ON lw.lesson_id = L.lesson_id
+              JOIN words w ON w.word_id = lw.word_id
+              WHERE L.course_id = :c
+            )
             SELECT
-              SUM(CASE WHEN mastered THEN 1 ELSE 0 END) AS mastered_count,
-              SUM(CASE WHEN total_attempts > 0 THEN 1 ELSE 0 END) AS attempted_count
-            FROM word_stats
-            WHERE user_id = :u AND headword = ANY(:arr)
+              COUNT(*) AS total,
+              SUM(CASE WHEN s.mastered THEN 1 ELSE 0 END) AS mastered_count,
+              SUM(CASE WHEN s.total_attempts > 0 THEN 1 ELSE 0 END) AS attempted_count
+            FROM course_words cw
+            LEFT JOIN word_stats s ON s.user_id = :u AND {word_stats_keys.stats_match("s", "cw")}
         """),
-        con=engine, params={"u": int(user_id), "arr": list(set(all_words))}
+        con=engine, params={"u": int(user_id), "c": int(course_id)}
     )
 
-    if df_row.empty:
-        mastered = 0
-        attempted = 0
-    else:
-        mastered  = int(df_row.iloc[0]["mastered_count"]  or 0)
-        attempted = int(df_row.iloc[0]["attempted_count"] or 0)
+    total = int(df_row.iloc[0]["total"] or 0) if not df_row.empty else 0
+    if total == 0:
+        return (0, 0, 0)
+    mastered  = int(df_row.iloc[0]["mastered_count"]  or 0)
+    attempted = int(df_row.iloc[0]["attempted_count"] or 0)
 
     basis = mastered if mastered > 0 else attempted
     percent = int(round(100 * min(basis, total) / total))
@@ -3574,11 +3810,12 @@ if st.session_state["auth"]["role"] == "admin":
                             elif action == "Delete":
                                 conn.execute(text("DELETE FROM users WHERE user_id=:u AND role='student'"), {"u": sid})
                             elif action == "Reset Password":
-                                new_hash = bcrypt.hash("Learn123!")
+                                new_hash = hash_password("Learn123!")
                                 conn.execute(
                                     text("UPDATE users SET password_hash=:p WHERE user_id=:u AND role='student'"),
                                     {"p": new_hash, "u": sid},
                                 )
+                    cache_bus.publish("students")
                     st.success(f"{action} applied to {len(selected_ids)} student(s).")
                     st.rerun()
             else:
@@ -3718,11 +3955,65 @@ if st.session_state["auth"]["role"] == "admin":
                 available_columns = [c for c in columns_order if c in display_df.columns]
                 st.dataframe(display_df[available_columns], use_container_width=True)
 
+                if analytics_snapshot.is_fresh():
+                    snap_at = analytics_snapshot.refreshed_at()
+                    st.markdown("#### Weakest words in this class")
+                    st.caption(f"From the analytics snapshot taken {snap_at:%Y-%m-%d %H:%M} UTC.")
+                    weak_df = analytics_snapshot.weak_words(roster_df["user_id"].tolist())
+                    if weak_df.empty:
+                        st.info("Not enough attempts yet.")
+                    else:
+                        weak_df = weak_df.assign(accuracy=(weak_df["accuracy"] * 100).round(1))
+                        st.dataframe(
+                            weak_df.rename(
+                                columns={
+                                    "headword": "Word",
+                                    "students": "Students",
+                                    "total_attempts": "Attempts",
+                                    "correct_attempts": "Correct",
+                                    "accuracy": "Accuracy %",
+                                }
+                            ),
+                            use_container_width=True,
+                            hide_index=True,
+                        )
+
+                st.markdown("#### End-of-term report")
+                st.caption("Every student's progress as CSV and HTML, bundled in one zip.")
+                report_key = f"class_report_{int(selected_class)}"
+                if st.button("Build class report", key=f"{report_key}_build"):
+                    report_bar = st.progress(0.0, text="Collecting metrics…")
+
+                    def _report_progress(done, total, message):
+                        report_bar.progress(min(done / total, 1.0) if total else 1.0, text=message)
+
+                    report_file = spooled_export(
+                        class_reports.build_class_report,
+                        int(selected_class),
+                        progress=_report_progress,
+                    )
+                    class_name = classes_overview.loc[classes_overview["class_id"] == selected_class, "name"].values[0]
+                    st.session_state[report_key] = (
+                        class_reports.report_filename(class_name),
+                        report_file.rows,
+                        report_file.read(),
+                    )
+                built_report = st.session_state.get(report_key)
+                if built_report:
+                    report_name, report_students, report_bytes = built_report
+                    st.download_button(
+                        f"⬇️ Download report ({report_students} students)",
+                        data=report_bytes,
+                        file_name=report_name,
+                        mime="application/zip",
+                        key=f"{report_key}_download",
+                    )
+
 # Student experience
 if st.session_state["auth"]["role"] == "student":
     _hide_default_h1_and_set("welcome to English Learning made easy - Student login")
 
-    st.session_state.gamification = gamification_snapshot(USER_ID)
+    session_gamification(USER_ID)
     recent_badge_names = set(st.session_state.get("badges_recent", []))
     sidebar_card, mobile_card = render_gamification_panels(st.session_state.gamification, recent_badge_names)
 
@@ -3891,39 +4182,48 @@ if st.session_state["auth"]["role"] == "student":
                     )
                 )
 
+        active_classes = student_classes[~student_classes["is_archived"].astype(bool)]
+        if not active_classes.empty:
+            render_class_ranking(
+                int(active_classes.iloc[0]["class_id"]),
+                str(active_classes.iloc[0]["name"]),
+                USER_ID,
+            )
+
     lessons = course_lessons.get(int(selected_course_id), pd.DataFrame()) if selected_course_id else pd.DataFrame()
 
 # ─────────────────────────────────────────────────────────────────────
 # Helper for lesson progress (canonical — keep only ONE copy in file)
 # ─────────────────────────────────────────────────────────────────────
-from sqlalchemy import text as sa_text
-
-@st.cache_data(ttl=5)
+@tagged_cache.memoize(lambda user_id, lesson_id: [("user", int(user_id)), ("lesson", int(lesson_id))])
 def lesson_progress(user_id: int, lesson_id: int):
     """
     One-shot, portable computation of lesson progress.
     Returns: (total_words, mastered_count, attempted_count)
     """
-    sql = sa_text("""
+    row = fetch.one(
+        engine,
+        f"""
         SELECT
-          COUNT(DISTINCT w.headword) AS total,
+          COUNT(DISTINCT w.headword_id) AS total,
           SUM(CASE WHEN s.mastered IS TRUE THEN 1 ELSE 0 END) AS mastered_count,
           SUM(CASE WHEN COALESCE(s.total_attempts,0) > 0 THEN 1 ELSE 0 END) AS attempted_count
         FROM lesson_words lw
         JOIN words w ON w.word_id = lw.word_id
         LEFT JOIN word_stats s
                ON s.user_id = :u
-              AND s.headword = w.headword
+              AND {word_stats_keys.stats_match()}
         WHERE lw.lesson_id = :l
-    """)
-    df = pd.read_sql(sql, con=engine, params={"u": int(user_id), "l": int(lesson_id)})
+        """,
+        {"u": int(user_id), "l": int(lesson_id)},
+    )
 
-    if df.empty:
+    if row is None:
         return 0, 0, 0
 
-    total     = int(df.iloc[0]["total"] or 0)
-    mastered  = int(df.iloc[0]["mastered_count"] or 0)
-    attempted = int(df.iloc[0]["attempted_count"] or 0)
+    total     = int(row.total or 0)
+    mastered  = int(row.mastered_count or 0)
+    attempted = int(row.attempted_count or 0)
     if total <= 0:
         return 0, 0, 0
     return total, mastered, attempted
@@ -4143,7 +4443,7 @@ def render_q_header(
 # ─────────────────────────────────────────────────────────────────────
 # Navigation helper: go back to the previous served word
 # ─────────────────────────────────────────────────────────────────────
-def _go_back_to_prev_word(lid: int, words_df: pd.DataFrame):
+def _go_back_to_prev_word(lid: int, words):
     """
     Loads the most recent word from asked_history (if any) as the active question,
     resets the form state, and decrements the visible question counter.
@@ -4157,19 +4457,14 @@ def _go_back_to_prev_word(lid: int, words_df: pd.DataFrame):
     st.session_state.active_word = prev
     st.session_state.q_started_at = time.time()
 
-    row_prev = words_df[words_df["headword"] == prev]
-    if row_prev.empty:
+    word_prev = words.get(prev)
+    if word_prev is None:
         # If the word vanished (lesson edited), just pick the next available one
         st.warning("Previous word is no longer in this lesson. Showing the next available word.")
-        st.session_state.active_word = choose_next_word(USER_ID, cid, lid, words_df)
-        row_prev = words_df[words_df["headword"] == st.session_state.active_word]
-
-    row_prev = row_prev.iloc[0]
-    st.session_state.qdata = build_question_payload(
-        st.session_state.active_word,
-        row_prev["synonyms"],
-        lesson_df=words_df,
-    )
+        st.session_state.active_word = choose_next_word(USER_ID, cid, lid, words)
+        word_prev = words.get(st.session_state.active_word)
+
+    st.session_state.qdata = build_question_payload(word_prev, lesson=words)
     st.session_state.grid_for_word = st.session_state.active_word
     st.session_state.grid_keys = [
         f"opt_{st.session_state.active_word}_{i}"
@@ -4245,12 +4540,12 @@ if st.session_state["auth"]["role"] == "student":
     q_now = st.session_state.q_index_per_lesson.get(int(lid), 1)
 
 
-    words_df = lesson_words(int(cid), int(lid))
-    if words_df.empty:
+    words = lesson_word_set(int(cid), int(lid))
+    if not words:
         st.info("This lesson has no words yet.")
         st.stop()
 
-    # ensure history state (must NOT be inside the 'words_df.empty' block)
+    # ensure history state (must NOT be inside the 'no words' block)
     if "asked_history" not in st.session_state:
         st.session_state.asked_history = []
 
@@ -4258,13 +4553,17 @@ if st.session_state["auth"]["role"] == "student":
     new_word_needed = ("active_word" not in st.session_state) or (st.session_state.get("active_lid") != lid)
     if new_word_needed:
         st.session_state.active_lid = lid
-        st.session_state.active_word = choose_next_word(USER_ID, cid, lid, words_df)
+        st.session_state.active_word = choose_next_word(USER_ID, cid, lid, words)
         st.session_state.q_started_at = time.time()
-        row_init = words_df[words_df["headword"] == st.session_state.active_word].iloc[0]
+        # Words missed last time in this lesson are served first
+        from collections import deque
+        st.session_state.review_queue = deque(
+            hw for hw in get_missed_words(USER_ID, int(lid))
+            if hw in words and hw != st.session_state.active_word
+        )
         st.session_state.qdata = build_question_payload(
-            st.session_state.active_word,
-            row_init["synonyms"],
-            lesson_df=words_df,
+            words.get(st.session_state.active_word),
+            lesson=words,
         )
         st.session_state.grid_for_word = st.session_state.active_word
         st.session_state.grid_keys = [
@@ -4285,15 +4584,13 @@ if st.session_state["auth"]["role"] == "student":
     active = st.session_state.active_word
 
 # Harden lookup in case lesson changed mid-session
-    filtered = words_df[words_df["headword"] == active]
-    if filtered.empty:
-        st.session_state.active_word = choose_next_word(USER_ID, cid, lid, words_df)
+    row = words.get(active)
+    if row is None:
+        st.session_state.active_word = choose_next_word(USER_ID, cid, lid, words)
         st.session_state.q_started_at = time.time()
-        row_init = words_df[words_df["headword"] == st.session_state.active_word].iloc[0]
         st.session_state.qdata = build_question_payload(
-            st.session_state.active_word,
-            row_init["synonyms"],
-            lesson_df=words_df,
+            words.get(st.session_state.active_word),
+            lesson=words,
         )
         st.session_state.grid_for_word = st.session_state.active_word
         st.session_state.grid_keys = [
@@ -4307,8 +4604,6 @@ if st.session_state["auth"]["role"] == "student":
         st.session_state.answered = False
         st.session_state.eval = None
         st.rerun()
-    else:
-        row = filtered.iloc[0]
 
     qdata = st.session_state.qdata
     choices = qdata["choices"]
@@ -4398,7 +4693,7 @@ if st.session_state["auth"]["role"] == "student":
         # any earlier question without needing to answer the current one.
         # st.markdown("<div class='quiz-actions'>", unsafe_allow_html=True)
         # if st.button("◀ Back", key="btn_back_form"):
-        #     _go_back_to_prev_word(lid, words_df)
+        #     _go_back_to_prev_word(lid, words)
         # st.markdown("</div>", unsafe_allow_html=True)
 
         # Always persist selection each render
@@ -4423,7 +4718,7 @@ if st.session_state["auth"]["role"] == "student":
                 active,
                 is_correct,
                 int(elapsed_ms),
-                int(row["difficulty"]),
+                int(row.difficulty),
                 ", ".join(sorted(picked_set)),
                 correct_choice_for_log,
             )
@@ -4435,7 +4730,7 @@ if st.session_state["auth"]["role"] == "student":
             st.session_state.badge_details_recent = result.get("new_badges", [])
             if result.get("new_badges"):
                 celebrate_badges(result["new_badges"])
-            st.session_state.gamification = gamification_snapshot(USER_ID)
+            session_gamification(USER_ID)
 
             st.session_state.answered = True
             st.session_state.eval = {
@@ -4577,10 +4872,10 @@ if st.session_state.get("answered") and st.session_state.get("eval"):
     # ───────────────────────────────────────────────────────────────
     st.markdown("<div class='quiz-actions'>", unsafe_allow_html=True)
     if st.button("◀ Back", key="btn_back_feedback"):
-        _go_back_to_prev_word(lid, words_df)
+        _go_back_to_prev_word(lid, words)
     if st.button("Next ▶", key="btn_next_feedback", type="primary"):
         lesson_entries = st.session_state.scorecards.get(int(lid), [])
-        total_questions = int(total_q or len(words_df))
+        total_questions = int(total_q or len(words))
         restart_needed = total_questions > 0 and len(lesson_entries) >= total_questions
 
         if restart_needed:
@@ -4594,8 +4889,7 @@ if st.session_state.get("answered") and st.session_state.get("eval"):
                 from collections import deque
                 st.session_state.review_queue = deque()
             st.session_state.q_index_per_lesson[int(lid)] = 1
-            available_words = set(words_df["headword"].tolist())
-            next_word = first_word if first_word in available_words else choose_next_word(USER_ID, cid, lid, words_df)
+            next_word = first_word if first_word in words else choose_next_word(USER_ID, cid, lid, words)
         else:
             st.session_state.asked_history.append(st.session_state.active_word)
 
@@ -4603,7 +4897,7 @@ if st.session_state.get("answered") and st.session_state.get("eval"):
             if st.session_state.review_queue:
                 next_word = st.session_state.review_queue.popleft()
             else:
-                next_word = choose_next_word(USER_ID, cid, lid, words_df)
+                next_word = choose_next_word(USER_ID, cid, lid, words)
 
             st.session_state.q_index_per_lesson[int(lid)] = \
                 st.session_state.q_index_per_lesson.get(int(lid), 1) + 1
@@ -4611,12 +4905,7 @@ if st.session_state.get("answered") and st.session_state.get("eval"):
         # Load next word
         st.session_state.active_word = next_word
         st.session_state.q_started_at = time.time()
-        next_row = words_df[words_df["headword"] == next_word].iloc[0]
-        st.session_state.qdata = build_question_payload(
-            next_word,
-            next_row["synonyms"],
-            lesson_df=words_df,
-        )
+        st.session_state.qdata = build_question_payload(words.get(next_word), lesson=words)
         st.session_state.grid_for_word = next_word
         st.session_state.grid_keys = [
             f"opt_{next_word}_{i}"
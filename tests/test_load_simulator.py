@@ -0,0 +1,49 @@
+from shared import load_simulator
+
+
+def _opts(*extra):
+    return load_simulator._parse_args(
+        ["--accounts", "unused.csv", "--lesson-id", "1", "--students", "6", "--questions", "3",
+         "--think", "fixed", "--think-mean", "0", "--seed", "7", *extra]
+    )
+
+
+def _login(st, email, password):
+    if password != "secret":
+        return False
+    st.session_state.user_id = int(email.split("@")[0][1:])
+    return True
+
+
+def _answer_scenario(st, stats, rng, account, opts, think):
+    for _ in range(opts.questions):
+        load_simulator._timed(stats, "answer", lambda: st.session_state.user_id)
+
+
+def test_run_simulation_with_stub_scenario():
+    accounts = [{"email": f"s{i}@example.com", "password": "secret"} for i in range(3)]
+
+    stats = load_simulator.run_simulation(
+        accounts, _opts(), scenarios={"spelling": _answer_scenario}, login=_login
+    )
+
+    rows = {r["operation"]: r for r in stats.summary()}
+    assert "student_crash" not in rows
+    assert rows["login"]["count"] == 6 and rows["login"]["errors"] == 0
+    assert rows["answer"]["count"] == 18 and rows["answer"]["errors"] == 0
+
+
+def test_failed_login_falls_back_to_csv_user_id():
+    accounts = [
+        {"email": "s1@example.com", "password": "wrong", "user_id": "41"},
+        {"email": "s2@example.com", "password": "wrong"},
+    ]
+
+    stats = load_simulator.run_simulation(
+        accounts, _opts("--students", "2"), scenarios={"spelling": _answer_scenario}, login=_login
+    )
+
+    rows = {r["operation"]: r for r in stats.summary()}
+    assert rows["login"]["count"] == 2
+    # only the account with a user_id goes on to answer
+    assert rows["answer"]["count"] == 3